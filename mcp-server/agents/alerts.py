@@ -1,7 +1,10 @@
 # agents/alerts.py
 
-import os
-import google.generativeai as genai
+import json
+import asyncio
+
+from agents.llm import generate_content_async, get_llm
+from agents.tracing import traced
 
 
 # =====================================
@@ -16,6 +19,7 @@ class AlertRecommendationAgent:
     # ----------------------------
     # Generate Alerts (Rule-based)
     # ----------------------------
+    @traced("alerts.compute")
     def generate_alerts(self, expense_analysis: dict):
         alerts = []
 
@@ -100,8 +104,8 @@ class AlertRecommendationAgent:
     # ----------------------------
     # Gemini Recommendations PER ALERT
     # ----------------------------
-    def generate_recommendations(self, alert: dict, expense_analysis: dict):
-        prompt = f"""
+    def recommendations_prompt(self, alert: dict, expense_analysis: dict):
+        return f"""
 You are acting as a personal CFO.
 
 Generate EXACTLY 2 actionable recommendations
@@ -125,17 +129,133 @@ Rules:
 
 Return only the 2 recommendations, one per line.
 """
+
+    @staticmethod
+    def parse_recommendations(text: str):
+        recs = [
+            line.strip()
+            for line in text.split("\n")
+            if line.strip()
+        ]
+        return recs[:2]
+
+    def generate_recommendations(self, alert: dict, expense_analysis: dict):
         try:
-            response = self.llm_model.generate_content(prompt)
-            recs = [
-                line.strip()
-                for line in response.text.split("\n")
-                if line.strip()
-            ]
-            return recs[:2]
+            response = self.llm_model.generate_content(
+                self.recommendations_prompt(alert, expense_analysis)
+            )
+            return self.parse_recommendations(response.text)
         except Exception:
             return ["Review this spending pattern", "Set a corrective budget limit"]
 
+    async def agenerate_recommendations(self, alert: dict, expense_analysis: dict):
+        try:
+            response = await generate_content_async(
+                self.llm_model, self.recommendations_prompt(alert, expense_analysis)
+            )
+            return self.parse_recommendations(response.text)
+        except Exception:
+            return ["Review this spending pattern", "Set a corrective budget limit"]
+
+    # ----------------------------
+    # Gemini Recommendations for ALL alerts (one call)
+    # ----------------------------
+    def batch_recommendations_prompt(self, alerts: list, expense_analysis: dict):
+        compact_alerts = [
+            {
+                "alert_id": alert["alert_id"],
+                "type": alert["type"],
+                "message": alert["message"],
+                "severity": alert["severity"]
+            }
+            for alert in alerts
+        ]
+        return f"""
+You are acting as a personal CFO.
+
+Generate EXACTLY 2 actionable recommendations
+for EACH of the following financial alerts.
+
+Alerts (JSON):
+{json.dumps(compact_alerts, ensure_ascii=False)}
+
+User Expense Context:
+- Total Expense: {expense_analysis['total_expense']}
+- Top Categories: {expense_analysis['top_3_categories']}
+- Average Transaction Value: {expense_analysis['average_transaction_value']}
+
+Rules:
+- One sentence per recommendation
+- Concrete financial action
+- No generic advice
+- No numbering or headings
+
+Return ONLY a JSON object mapping each alert_id to a list of its
+2 recommendations, e.g. {{"A1": ["...", "..."]}}
+"""
+
+    @staticmethod
+    def parse_batch_recommendations(text: str, alerts: list):
+        """
+        Parse {alert_id: [rec, rec]}; alerts with a missing or empty
+        entry are left out so the caller can fall back for them.
+        """
+        cleaned = text.replace("```json", "").replace("```", "").strip()
+        data = json.loads(cleaned)
+
+        parsed = {}
+        for alert in alerts:
+            recs = data.get(alert["alert_id"]) if isinstance(data, dict) else None
+            if not isinstance(recs, list):
+                continue
+            recs = [str(r).strip() for r in recs if str(r).strip()]
+            if recs:
+                parsed[alert["alert_id"]] = recs[:2]
+        return parsed
+
+    def generate_all_recommendations(self, alerts: list, expense_analysis: dict):
+        if not alerts:
+            return {}
+
+        try:
+            response = self.llm_model.generate_content(
+                self.batch_recommendations_prompt(alerts, expense_analysis)
+            )
+            parsed = self.parse_batch_recommendations(response.text, alerts)
+        except Exception as e:
+            print("Gemini batch recommendation error:", e)
+            parsed = {}
+
+        for alert in alerts:
+            if alert["alert_id"] not in parsed:
+                parsed[alert["alert_id"]] = self.generate_recommendations(
+                    alert, expense_analysis
+                )
+        return parsed
+
+    async def agenerate_all_recommendations(self, alerts: list, expense_analysis: dict):
+        if not alerts:
+            return {}
+
+        try:
+            response = await generate_content_async(
+                self.llm_model,
+                self.batch_recommendations_prompt(alerts, expense_analysis)
+            )
+            parsed = self.parse_batch_recommendations(response.text, alerts)
+        except Exception as e:
+            print("Gemini batch recommendation error:", e)
+            parsed = {}
+
+        missing = [alert for alert in alerts if alert["alert_id"] not in parsed]
+        fallbacks = await asyncio.gather(*(
+            self.agenerate_recommendations(alert, expense_analysis)
+            for alert in missing
+        ))
+        for alert, recs in zip(missing, fallbacks):
+            parsed[alert["alert_id"]] = recs
+        return parsed
+
     # ----------------------------
     # Run Agent
     # ----------------------------
@@ -146,10 +266,26 @@ Return only the 2 recommendations, one per line.
 
         alerts = self.generate_alerts(expense_analysis)
 
+        recommendations = self.generate_all_recommendations(alerts, expense_analysis)
         for alert in alerts:
-            alert["recommendations"] = self.generate_recommendations(
-                alert, expense_analysis
-            )
+            alert["recommendations"] = recommendations[alert["alert_id"]]
+
+        output = {"alerts": alerts}
+        self.context["alerts_and_recommendations"] = output
+        return output
+
+    async def arun(self):
+        expense_analysis = self.context.get("expense_analysis")
+        if not expense_analysis:
+            raise ValueError("Expense analysis not found in MCP context")
+
+        alerts = self.generate_alerts(expense_analysis)
+
+        recommendations = await self.agenerate_all_recommendations(
+            alerts, expense_analysis
+        )
+        for alert in alerts:
+            alert["recommendations"] = recommendations[alert["alert_id"]]
 
         output = {"alerts": alerts}
         self.context["alerts_and_recommendations"] = output
@@ -163,15 +299,25 @@ Return only the 2 recommendations, one per line.
 def run_alerts(state: dict):
     """
     Entry point used by server.py.
-    Receives the shared MCP STATE and returns alerts + recommendations.
+    Receives the user's MCP session state and returns alerts + recommendations.
     """
 
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    gemini_model = genai.GenerativeModel("models/gemini-2.0-flash")
-
     agent = AlertRecommendationAgent(
         context=state,
-        llm_model=gemini_model
+        llm_model=get_llm("alerts")
     )
 
     return agent.run()
+
+
+async def arun_alerts(state: dict):
+    """
+    Async entry point used by server.py.
+    """
+
+    agent = AlertRecommendationAgent(
+        context=state,
+        llm_model=get_llm("alerts")
+    )
+
+    return await agent.arun()
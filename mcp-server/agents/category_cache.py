@@ -0,0 +1,269 @@
+# agents/category_cache.py
+
+import os
+import re
+import time
+import atexit
+import sqlite3
+import threading
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+CATEGORY_CACHE_PATH = os.getenv(
+    "CATEGORY_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "category_cache.sqlite3")
+)
+CATEGORY_CACHE_MAX_ENTRIES = int(os.getenv("CATEGORY_CACHE_MAX_ENTRIES", "50000"))
+CATEGORY_CACHE_TTL_SECONDS = int(os.getenv("CATEGORY_CACHE_TTL_SECONDS", str(90 * 24 * 3600)))
+
+# Hits whose last_used is held in memory before being written in one
+# batch (LRU order only needs to be roughly current)
+CATEGORY_CACHE_TOUCH_FLUSH = int(os.getenv("CATEGORY_CACHE_TOUCH_FLUSH", "1000"))
+
+# Keys per SELECT ... IN (...); stays under SQLite's variable limit
+_LOOKUP_CHUNK = 500
+
+
+# ----------------------------
+# Description Normalization
+# ----------------------------
+
+_DATE_RE = re.compile(r"\b\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}\b")
+_VPA_RE = re.compile(r"\b[a-z0-9][a-z0-9._]*@[a-z][a-z0-9]*")
+_VPA_HANDLE_RE = re.compile(r"@[a-z0-9.]+")
+_NUMERIC_ID_RE = re.compile(r"\b[a-z]*\d{4,}[a-z0-9]*\b")
+_NON_ALPHA_RE = re.compile(r"[^a-z]+")
+
+
+def normalize_description(description) -> str:
+    """
+    Reduce a bank narration to its merchant-identifying part, e.g.
+    "UPI/SWIGGY/412345678901/swiggy@ybl 03-01-2025" -> "upi swiggy swiggy swiggy@ybl".
+    UPI VPAs are kept whole so person-to-person payments to different
+    payees (often phone-number VPAs) do not collapse to "upi payment".
+    """
+    text = str(description or "").lower()
+    vpas = list(dict.fromkeys(_VPA_RE.findall(text)))
+    text = _DATE_RE.sub(" ", text)
+    text = _VPA_HANDLE_RE.sub(" ", text)
+    text = _NUMERIC_ID_RE.sub(" ", text)
+    text = _NON_ALPHA_RE.sub(" ", text)
+    return " ".join(text.split() + vpas)
+
+
+# =====================================
+# Persistent Merchant → Category Cache
+# =====================================
+
+class CategoryCache:
+    """
+    SQLite-backed cache keyed on normalized descriptions. Entries put
+    with a `user_id` (e.g. a user's own corrections) are only seen by
+    that user and take precedence over shared entries.
+    Entries expire after `ttl_seconds`; once `max_entries` is exceeded
+    the least recently used entries are evicted. Lookups only read:
+    last_used for hits is kept in memory and written on the next
+    put, every CATEGORY_CACHE_TOUCH_FLUSH hits, or on close().
+    """
+
+    def __init__(
+        self,
+        path: str = CATEGORY_CACHE_PATH,
+        max_entries: int = CATEGORY_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = CATEGORY_CACHE_TTL_SECONDS
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # merchant_key -> last_used not yet written
+        self._touched = {}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS category_cache (
+                merchant_key TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_category_cache_last_used "
+            "ON category_cache(last_used)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(description, user_id=None) -> str:
+        key = normalize_description(description)
+        if key and user_id is not None:
+            return f"{user_id}|{key}"
+        return key
+
+    def get(self, description, user_id=None):
+        return self.get_many([description], user_id)[0]
+
+    def get_many(self, descriptions, user_id=None) -> list:
+        """
+        Categories aligned with `descriptions` (None on a miss), read
+        with one query per _LOOKUP_CHUNK keys. The user's own entry
+        wins over the shared one.
+        """
+        candidates = []
+        for description in descriptions:
+            shared = self._key(description)
+            if not shared:
+                candidates.append(())
+            elif user_id is None:
+                candidates.append((shared,))
+            else:
+                candidates.append((self._key(description, user_id), shared))
+
+        keys = list({key for keys in candidates for key in keys})
+        now = time.time()
+        found = {}
+
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start:start + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT merchant_key, category, updated_at FROM category_cache "
+                    f"WHERE merchant_key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                found.update(
+                    (key, category) for key, category, updated_at in rows
+                    if now - updated_at <= self.ttl_seconds
+                )
+
+            results = []
+            for keys in candidates:
+                key = next((k for k in keys if k in found), None)
+                if key is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    self._touched[key] = now
+                    results.append(found[key])
+
+            if len(self._touched) >= CATEGORY_CACHE_TOUCH_FLUSH:
+                self._flush_touched()
+                self._conn.commit()
+
+        return results
+
+    def _flush_touched(self):
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE category_cache SET last_used = MAX(last_used, ?) WHERE merchant_key = ?",
+            [(used, key) for key, used in self._touched.items()]
+        )
+        self._touched.clear()
+
+    def flush(self):
+        """Write pending last_used updates."""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def put(self, description, category: str, user_id=None):
+        self.put_many([(description, category)], user_id)
+
+    def put_many(self, pairs, user_id=None):
+        now = time.time()
+        rows = {}
+        for description, category in pairs:
+            key = self._key(description, user_id)
+            if key and category:
+                rows[key] = (key, category, now, now)
+
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO category_cache (merchant_key, category, updated_at, last_used)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(merchant_key) DO UPDATE SET
+                    category = excluded.category,
+                    updated_at = excluded.updated_at,
+                    last_used = excluded.last_used
+                """,
+                list(rows.values())
+            )
+            self._flush_touched()
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl_seconds
+        cur = self._conn.execute(
+            "DELETE FROM category_cache WHERE updated_at < ?", (cutoff,)
+        )
+        self.evictions += max(cur.rowcount, 0)
+
+        count = self._conn.execute("SELECT COUNT(*) FROM category_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            cur = self._conn.execute(
+                """
+                DELETE FROM category_cache WHERE merchant_key IN (
+                    SELECT merchant_key FROM category_cache
+                    ORDER BY last_used ASC
+                    LIMIT ?
+                )
+                """,
+                (overflow,)
+            )
+            self.evictions += max(cur.rowcount, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM category_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+# ----------------------------
+# Process-wide Instance
+# ----------------------------
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_category_cache() -> CategoryCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CategoryCache()
+                atexit.register(_cache.close)
+    return _cache
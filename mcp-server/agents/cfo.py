@@ -1,7 +1,33 @@
 # agents/cfo.py
 
 import os
-import google.generativeai as genai
+import json
+import asyncio
+
+from agents.llm import generate_content_async, stream_content_async, get_llm
+from agents.tracing import traced
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+# One structured-output call for summary + action plan instead of two
+CFO_STRUCTURED_OUTPUT = os.getenv("CFO_STRUCTURED_OUTPUT", "1") == "1"
+
+CFO_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "executive_summary": {"type": "string"},
+        "next_month_action_plan": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["executive_summary", "next_month_action_plan"]
+}
+
+CFO_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": CFO_SUMMARY_SCHEMA
+}
 
 
 # ----------------------------
@@ -43,8 +69,8 @@ class CFOSummaryAgent:
         else:
             return "Critical"
 
-    def generate_executive_summary(self, context_block):
-        prompt = f"""
+    def executive_summary_prompt(self, context_block):
+        return f"""
 You are an Autonomous CFO addressing a young professional.
 
 Write a concise executive financial summary (4–5 sentences).
@@ -54,14 +80,9 @@ No bullet points, no numbers, no technical jargon.
 Context:
 {context_block}
 """
-        try:
-            response = self.llm_model.generate_content(prompt)
-            return response.text.strip()
-        except Exception:
-            return "Executive summary temporarily unavailable."
 
-    def generate_action_plan(self, context_block):
-        prompt = f"""
+    def action_plan_prompt(self, context_block):
+        return f"""
 You are an Autonomous CFO.
 
 Based on the financial context below, generate EXACTLY 5
@@ -78,18 +99,150 @@ Context:
 
 Return only the 5 actions, one per line.
 """
+
+    @staticmethod
+    def compact_context(context_block):
+        """
+        What the model needs from the context, serialized once:
+        headline expense figures (no per-category table), alert
+        messages, and the goal without milestones.
+        """
+        expense = context_block["expense_summary"]
+        goal = context_block["goal_plan"]
+
+        compact = {
+            "health_score": context_block["health_score"],
+            "verdict": context_block["verdict"],
+            "expenses": {
+                key: expense.get(key)
+                for key in (
+                    "total_expense", "expense_count", "top_3_categories",
+                    "average_transaction_value", "highest_single_expense", "ai_insights"
+                )
+            },
+            "alerts": [
+                {"severity": a["severity"], "message": a["message"]}
+                for a in context_block["alerts"]
+            ],
+            "goal": {
+                key: goal.get(key)
+                for key in (
+                    "goal", "required_monthly_saving",
+                    "estimated_monthly_surplus", "feasibility"
+                )
+            }
+        }
+        return json.dumps(compact, separators=(",", ":"), default=str)
+
+    def combined_prompt(self, compact_block):
+        return f"""
+You are an Autonomous CFO addressing a young professional.
+
+Using the financial context below, return a JSON object with:
+
+- "executive_summary": a concise executive financial summary
+  (4–5 sentences). Tone: confident, supportive, professional.
+  No bullet points, no numbers, no technical jargon.
+- "next_month_action_plan": EXACTLY 5 clear and actionable
+  next-month actions, one sentence each, concrete and practical,
+  no generic advice, no numbering.
+
+Context:
+{compact_block}
+"""
+
+    @classmethod
+    def parse_combined(cls, text: str):
+        """(executive_summary, action_plan) from the JSON reply, or None."""
+        try:
+            data = json.loads(text.strip().removeprefix("```json").removesuffix("```"))
+            summary = data["executive_summary"].strip()
+            actions = [str(a).strip() for a in data["next_month_action_plan"] if str(a).strip()]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+        if not summary or not actions:
+            return None
+        return summary, actions[:5]
+
+    def generate_combined(self, context_block):
+        try:
+            response = self.llm_model.generate_content(
+                self.combined_prompt(self.compact_context(context_block)),
+                generation_config=CFO_GENERATION_CONFIG
+            )
+            return self.parse_combined(response.text)
+        except Exception:
+            return None
+
+    async def agenerate_combined(self, context_block):
+        try:
+            response = await generate_content_async(
+                self.llm_model,
+                self.combined_prompt(self.compact_context(context_block)),
+                generation_config=CFO_GENERATION_CONFIG
+            )
+            return self.parse_combined(response.text)
+        except Exception:
+            return None
+
+    @staticmethod
+    def parse_action_plan(text: str):
+        actions = [
+            line.strip()
+            for line in text.split("\n")
+            if line.strip()
+        ]
+        return actions[:5]
+
+    def generate_executive_summary(self, context_block):
         try:
-            response = self.llm_model.generate_content(prompt)
-            actions = [
-                line.strip()
-                for line in response.text.split("\n")
-                if line.strip()
-            ]
-            return actions[:5]
+            response = self.llm_model.generate_content(
+                self.executive_summary_prompt(context_block)
+            )
+            return response.text.strip()
+        except Exception:
+            return "Executive summary temporarily unavailable."
+
+    async def _agenerate_text(self, prompt, field, on_text=None) -> str:
+        if on_text is None:
+            response = await generate_content_async(self.llm_model, prompt)
+            return response.text
+
+        async def forward(delta):
+            await on_text(field, delta)
+
+        return await stream_content_async(self.llm_model, prompt, forward)
+
+    async def agenerate_executive_summary(self, context_block, on_text=None):
+        try:
+            text = await self._agenerate_text(
+                self.executive_summary_prompt(context_block), "executive_summary", on_text
+            )
+            return text.strip()
+        except Exception:
+            return "Executive summary temporarily unavailable."
+
+    def generate_action_plan(self, context_block):
+        try:
+            response = self.llm_model.generate_content(
+                self.action_plan_prompt(context_block)
+            )
+            return self.parse_action_plan(response.text)
         except Exception:
             return ["Action plan temporarily unavailable"]
 
-    def run(self):
+    async def agenerate_action_plan(self, context_block, on_text=None):
+        try:
+            text = await self._agenerate_text(
+                self.action_plan_prompt(context_block), "next_month_action_plan", on_text
+            )
+            return self.parse_action_plan(text)
+        except Exception:
+            return ["Action plan temporarily unavailable"]
+
+    @traced("cfo.compute")
+    def build_context(self):
         expense_analysis = self.context.get("expense_analysis")
         alerts_data = self.context.get("alerts_and_recommendations", {})
         goal_plan = self.context.get("goal_plan")
@@ -111,21 +264,58 @@ Return only the 5 actions, one per line.
             "alerts": alerts,
             "goal_plan": goal_plan
         }
+        return context_block
 
-        executive_summary = self.generate_executive_summary(context_block)
-        action_plan = self.generate_action_plan(context_block)
-
+    def finalize(self, context_block, executive_summary, action_plan):
         output = {
-            "financial_health_score": health_score,
-            "financial_verdict": verdict,
+            "financial_health_score": context_block["health_score"],
+            "financial_verdict": context_block["verdict"],
             "executive_summary": executive_summary,
-            "top_risks": [a["message"] for a in alerts if a["severity"] == "High"],
+            "top_risks": [
+                a["message"] for a in context_block["alerts"]
+                if a["severity"] == "High"
+            ],
             "next_month_action_plan": action_plan
         }
 
         self.context["cfo_summary"] = output
         return output
 
+    def run(self):
+        context_block = self.build_context()
+
+        if CFO_STRUCTURED_OUTPUT:
+            combined = self.generate_combined(context_block)
+            if combined is not None:
+                return self.finalize(context_block, *combined)
+
+        executive_summary = self.generate_executive_summary(context_block)
+        action_plan = self.generate_action_plan(context_block)
+
+        return self.finalize(context_block, executive_summary, action_plan)
+
+    async def arun(self, on_text=None):
+        """
+        With `on_text`, both generations are streamed as they run:
+        `await on_text(field, delta)` where field is "executive_summary"
+        or "next_month_action_plan". Streaming keeps the two text calls,
+        since partial JSON is not useful to show; otherwise one
+        structured call is tried first.
+        """
+        context_block = self.build_context()
+
+        if CFO_STRUCTURED_OUTPUT and on_text is None:
+            combined = await self.agenerate_combined(context_block)
+            if combined is not None:
+                return self.finalize(context_block, *combined)
+
+        executive_summary, action_plan = await asyncio.gather(
+            self.agenerate_executive_summary(context_block, on_text),
+            self.agenerate_action_plan(context_block, on_text)
+        )
+
+        return self.finalize(context_block, executive_summary, action_plan)
+
 
 # ----------------------------
 # MCP-Callable Wrapper
@@ -133,16 +323,25 @@ Return only the 5 actions, one per line.
 def run_cfo_summary(state: dict):
     """
     This function is what server.py calls.
-    It receives the shared MCP STATE and returns the CFO summary.
+    It receives the user's MCP session state and returns the CFO summary.
     """
 
-    # Configure Gemini once
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    gemini_model = genai.GenerativeModel("models/gemini-2.0-flash")
-
     agent = CFOSummaryAgent(
         context=state,
-        llm_model=gemini_model
+        llm_model=get_llm("cfo")
     )
 
     return agent.run()
+
+
+async def arun_cfo_summary(state: dict, on_text=None):
+    """
+    Async entry point used by server.py.
+    """
+
+    agent = CFOSummaryAgent(
+        context=state,
+        llm_model=get_llm("cfo")
+    )
+
+    return await agent.arun(on_text)
@@ -1,31 +1,34 @@
 # agents/chatbot.py
 
+import os
+import json
 import pandas as pd
 
+from agents.llm import generate_content_async, stream_content_async
+from agents.retrieval import get_transaction_index, build_chat_context
+from agents.query_engine import answer_question
+from agents.tracing import traced, increment
+
+# Let the model reword engine answers (numbers stay the engine's)
+CHAT_LLM_PHRASING = os.getenv("CHAT_LLM_PHRASING", "0") == "1"
+
 class FinanceChatAgent:
     def __init__(self, context: dict, llm_model):
         self.context = context
         self.llm = llm_model
 
-    def build_context(self, df: pd.DataFrame):
-        compact_rows = df[[
-            "date", "description", "amount", "category"
-        ]].head(200).to_dict(orient="records")
-
-        return {
-            "total_transactions": len(df),
-            "rows_sample": compact_rows
-        }
-
-    def run(self, question: str):
-        df = self.context.get("categorized_transactions")
+    @traced("chat.compute")
+    def build_context(self, df: pd.DataFrame, question: str):
+        """
+        Totals plus only the rows relevant to `question`, within the
+        chat token budget. The index is kept on the session so it is
+        built once per upload, not per question.
+        """
+        index = get_transaction_index(self.context, df)
+        return build_chat_context(index, question)
 
-        if df is None or df.empty:
-            return "No transaction data is available yet. Please upload a statement first."
-
-        context = self.build_context(df)
-
-        prompt = f"""
+    def build_prompt(self, question: str, context: dict):
+        return f"""
 You are a personal finance assistant.
 
 Answer the user's question using ONLY the data provided below.
@@ -35,16 +38,89 @@ User Question:
 {question}
 
 Transactions & Summary:
-{context}
+{json.dumps(context, default=str)}
 
 Rules:
 - Use only the provided data
 - Do not invent numbers
 - If the answer cannot be derived, say so clearly
 """
-        
+
+    def build_phrasing_prompt(self, question: str, result: dict):
+        return f"""
+You are a personal finance assistant.
+
+Rephrase the computed answer below as a short, friendly reply to the
+user's question. Keep every number exactly as given.
+
+User Question:
+{question}
+
+Computed Answer:
+{result["answer"]}
+"""
+
+    def answer_directly(self, df: pd.DataFrame, question: str):
+        """Engine result for plain aggregation questions, else None."""
+        result = answer_question(get_transaction_index(self.context, df), question)
+        increment("chat_answers_total", path="engine" if result else "llm")
+        return result
+
+    def run(self, question: str):
+        df = self.context.get("categorized_transactions")
+
+        if df is None or df.empty:
+            return "No transaction data is available yet. Please upload a statement first."
+
+        result = self.answer_directly(df, question)
+        if result:
+            if not CHAT_LLM_PHRASING:
+                return result["answer"]
+            try:
+                response = self.llm.generate_content(self.build_phrasing_prompt(question, result))
+                return response.text.strip()
+            except Exception:
+                return result["answer"]
+
+        prompt = self.build_prompt(question, self.build_context(df, question))
+
         try:
             response = self.llm.generate_content(prompt)
             return response.text.strip()
         except Exception:
             return "Unable to answer the question at the moment."
+
+    async def _agenerate(self, prompt, on_text=None) -> str:
+        if on_text is None:
+            response = await generate_content_async(self.llm, prompt)
+            return response.text.strip()
+        text = await stream_content_async(self.llm, prompt, on_text)
+        return text.strip()
+
+    async def arun(self, question: str, on_text=None):
+        """
+        Answer `question`. With `on_text`, the answer is also streamed:
+        `await on_text(delta)` is called as text is produced.
+        """
+        df = self.context.get("categorized_transactions")
+
+        if df is None or df.empty:
+            return "No transaction data is available yet. Please upload a statement first."
+
+        result = self.answer_directly(df, question)
+        if result:
+            if not CHAT_LLM_PHRASING:
+                if on_text is not None:
+                    await on_text(result["answer"])
+                return result["answer"]
+            try:
+                return await self._agenerate(self.build_phrasing_prompt(question, result), on_text)
+            except Exception:
+                return result["answer"]
+
+        prompt = self.build_prompt(question, self.build_context(df, question))
+
+        try:
+            return await self._agenerate(prompt, on_text)
+        except Exception:
+            return "Unable to answer the question at the moment."
@@ -1,8 +1,11 @@
 # agents/expense.py
 
-import os
 import pandas as pd
-import google.generativeai as genai
+
+from agents.ingestion import transaction_nature, ensure_transaction_nature
+from agents.llm import generate_content_async, get_llm
+from agents.rollup import monthly_totals, TRANSFER_CATEGORIES
+from agents.tracing import traced
 
 
 # ----------------
@@ -14,6 +17,96 @@ def to_native(value):
     return value
 
 
+def _native_date(value):
+    if value is None or pd.isna(value):
+        return None
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+# ----------------------------
+# Numeric Core (pure)
+# ----------------------------
+
+@traced("expense.compute")
+def analyze_expenses(df: pd.DataFrame) -> dict:
+    """
+    Expense analysis of any transaction frame (one upload or a
+    multi-upload history) without touching `df` or calling the LLM.
+
+    A single groupby over (nature, category) gives per-category sum,
+    count and the row of the largest amount; everything else is
+    derived from that table. Rows without a numeric amount are
+    ignored. "ai_insights" is left as None.
+    """
+    frame = pd.DataFrame({
+        "nature": transaction_nature(df),
+        "category": df["category"].fillna("Others").astype("category"),
+        "amount": pd.to_numeric(df["amount"], errors="coerce")
+    })
+    # Unparseable amounts (NaN after ingest) count toward nothing;
+    # an all-NaN group would also break idxmax
+    frame = frame.dropna(subset=["amount"])
+
+    groups = frame.groupby(["nature", "category"], observed=True)["amount"]
+    by_group = groups.agg(["sum", "size"])
+    by_group["largest_row"] = groups.idxmax()
+
+    # Only REAL expenses (exclude transfers)
+    if "Expense" in by_group.index.get_level_values("nature"):
+        expense = by_group.xs("Expense", level="nature")
+        expense = expense[~expense.index.isin(TRANSFER_CATEGORIES)]
+    else:
+        expense = by_group.iloc[0:0]
+
+    if expense.empty:
+        return {
+            "total_expense": 0,
+            "expense_count": 0,
+            "category_wise_spending": {},
+            "top_3_categories": [],
+            "average_transaction_value": 0,
+            "highest_single_expense": None,
+            "ai_insights": ["No expense transactions found"]
+        }
+
+    expense = expense.sort_values("sum", ascending=False)
+
+    total_expense = round(float(expense["sum"].sum()), 2)
+    expense_count = int(expense["size"].sum())
+    avg_expense = round(total_expense / expense_count, 2)
+
+    category_spend = dict(zip(expense.index.astype(str).tolist(), expense["sum"].tolist()))
+
+    top_3_categories = [
+        {"category": cat, "amount": amt}
+        for cat, amt in list(category_spend.items())[:3]
+    ]
+
+    # Largest row across the per-category maxima
+    largest = expense["largest_row"].dropna()
+    highest_single_expense = None
+    if not largest.empty:
+        row = df.loc[frame.loc[largest.tolist(), "amount"].idxmax()]
+        highest_single_expense = {
+            "amount": to_native(frame.at[row.name, "amount"]),
+            "category": row["category"],
+            "description": row["description"],
+            "date": _native_date(row.get("date"))
+        }
+
+    return {
+        "total_expense": total_expense,
+        "expense_count": expense_count,
+        "category_wise_spending": category_spend,
+        "top_3_categories": top_3_categories,
+        "average_transaction_value": avg_expense,
+        "highest_single_expense": highest_single_expense,
+        "ai_insights": None
+    }
+
+
 # =====================================
 # Expense Analysis Agent
 # =====================================
@@ -23,8 +116,8 @@ class ExpenseAnalysisAgent:
         self.context = context
         self.llm_model = llm_model
 
-    def generate_ai_insights(self, summary: dict, category_percentages: dict):
-        prompt = f"""
+    def insights_prompt(self, summary: dict, category_percentages: dict):
+        return f"""
 You are acting as a personal CFO for a young professional.
 
 Generate EXACTLY 3 high-impact financial insights.
@@ -47,129 +140,94 @@ Category Percentage Breakdown:
 
 Return ONLY the 3 insights, one per line. Don't use $, use Rupees symbol instead.
 """
+
+    @staticmethod
+    def parse_insights(text: str):
+        insights = [
+            line.strip()
+            for line in text.split("\n")
+            if line.strip()
+        ]
+        return insights[:3]
+
+    def generate_ai_insights(self, summary: dict, category_percentages: dict):
         try:
-            response = self.llm_model.generate_content(prompt)
-            insights = [
-                line.strip()
-                for line in response.text.split("\n")
-                if line.strip()
-            ]
-            return insights[:3]
+            response = self.llm_model.generate_content(
+                self.insights_prompt(summary, category_percentages)
+            )
+            return self.parse_insights(response.text)
         except Exception as e:
             print("Gemini insight error:", e)
             return ["AI insights temporarily unavailable"]
 
-    def run(self):
+    async def agenerate_ai_insights(self, summary: dict, category_percentages: dict):
+        try:
+            response = await generate_content_async(
+                self.llm_model, self.insights_prompt(summary, category_percentages)
+            )
+            return self.parse_insights(response.text)
+        except Exception as e:
+            print("Gemini insight error:", e)
+            return ["AI insights temporarily unavailable"]
+
+    def compute(self):
+        """
+        Numeric part of the analysis. Returns (analysis, insight_inputs);
+        insight_inputs is None when there is nothing to ask the LLM.
+        """
         df = self.context.get("categorized_transactions")
         if df is None or df.empty:
             raise ValueError("No categorized transactions found in MCP context")
 
-        # ----------------------------
-        # Ensure transaction_nature exists
-        # ----------------------------
-        if "transaction_nature" not in df.columns:
-            if "transaction_type" in df.columns:
-                df["transaction_nature"] = df["transaction_type"].map({
-                    "Debit": "Expense",
-                    "Credit": "Income"
-                }).fillna("Expense")
-            else:
-                df["transaction_nature"] = df["amount"].apply(
-                    lambda x: "Income" if x > 0 else "Expense"
-                )
-
-        # ----------------------------
-        # Only REAL expenses (exclude transfers)
-        # ----------------------------
-        expense_df = df[
-            (df["transaction_nature"] == "Expense") &
-            (~df["category"].isin(["Peer Transfer", "Self Transfer"]))
-        ].copy()
-
-        if expense_df.empty:
-            analysis = {
-                "total_expense": 0,
-                "expense_count": 0,
-                "category_wise_spending": {},
-                "top_3_categories": [],
-                "average_transaction_value": 0,
-                "highest_single_expense": None,
-                "ai_insights": ["No expense transactions found"]
-            }
-            self.context["expense_analysis"] = analysis
-            return analysis
-
-        # ----------------------------
-        # Core Calculations
-        # ----------------------------
-        total_expense = to_native(round(expense_df["amount"].sum(), 2))
-        expense_count = int(len(expense_df))
-        avg_expense = to_native(round(total_expense / expense_count, 2))
+        # Later agents (goal planning) read transaction_nature off the frame
+        ensure_transaction_nature(df)
 
-        # ----------------------------
-        # Category-wise Spending
-        # ----------------------------
-        category_spend = (
-            expense_df.groupby("category")["amount"]
-            .sum()
-            .sort_values(ascending=False)
-            .to_dict()
-        )
-        category_spend = {k: to_native(v) for k, v in category_spend.items()}
+        analysis = analyze_expenses(df)
+        if analysis["expense_count"] == 0:
+            return analysis, None
 
-        # ----------------------------
-        # Category Percentages
-        # ----------------------------
+        total_expense = analysis["total_expense"]
         category_percentages = {
             k: round((v / total_expense) * 100, 1)
-            for k, v in category_spend.items()
+            for k, v in analysis["category_wise_spending"].items()
         }
 
         # ----------------------------
-        # Top 3 Categories
-        # ----------------------------
-        top_3_categories = [
-            {"category": cat, "amount": amt}
-            for cat, amt in list(category_spend.items())[:3]
-        ]
-
-        # ----------------------------
-        # Highest Single Expense
-        # ----------------------------
-        max_row = expense_df.loc[expense_df["amount"].idxmax()]
-        highest_single_expense = {
-            "amount": to_native(max_row["amount"]),
-            "category": max_row["category"],
-            "description": max_row["description"],
-            "date": max_row.get("date")
-        }
-
-        # ----------------------------
-        # Gemini Insights
+        # Gemini Insights (filled in by run / arun)
         # ----------------------------
         summary_for_llm = {
             "total_expense": total_expense,
-            "expense_count": expense_count,
-            "top_3_categories": top_3_categories,
-            "average_transaction_value": avg_expense
+            "expense_count": analysis["expense_count"],
+            "top_3_categories": analysis["top_3_categories"],
+            "average_transaction_value": analysis["average_transaction_value"]
         }
 
-        ai_insights = self.generate_ai_insights(
-            summary_for_llm, category_percentages
-        )
-
         # ----------------------------
-        # Final Output (JSON-safe)
+        # Month-by-month trend (from the rollup, when loaded)
         # ----------------------------
-        analysis = {
-            "total_expense": total_expense,
-            "expense_count": expense_count,
-            "category_wise_spending": category_spend,
-            "top_3_categories": top_3_categories,
-            "average_transaction_value": avg_expense,
-            "highest_single_expense": highest_single_expense,
-            "ai_insights": ai_insights
-        }
+        rollup = self.context.get("monthly_rollup")
+        if rollup is not None and not rollup.empty:
+            totals = monthly_totals(rollup)
+            analysis["monthly_expense_trend"] = {
+                month.strftime("%Y-%m"): round(float(amount), 2)
+                for month, amount in totals["expense"].items()
+            }
+            analysis["average_monthly_expense"] = round(float(totals["expense"].mean()), 2)
+
+        return analysis, (summary_for_llm, category_percentages)
+
+    def run(self):
+        analysis, insight_inputs = self.compute()
+        if insight_inputs is not None:
+            analysis["ai_insights"] = self.generate_ai_insights(*insight_inputs)
+
+        self.context["expense_analysis"] = analysis
+        return analysis
+
+    async def arun(self):
+        analysis, insight_inputs = self.compute()
+        if insight_inputs is not None:
+            analysis["ai_insights"] = await self.agenerate_ai_insights(*insight_inputs)
 
         self.context["expense_analysis"] = analysis
         return analysis
@@ -182,15 +240,25 @@ Return ONLY the 3 insights, one per line. Don't use $, use Rupees symbol instead
 def run_expense_analysis(state: dict):
     """
     Entry point used by server.py.
-    Receives the shared MCP STATE and returns expense analysis.
+    Receives the user's MCP session state and returns expense analysis.
     """
 
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    gemini_model = genai.GenerativeModel("models/gemini-2.0-flash")
-
     agent = ExpenseAnalysisAgent(
         context=state,
-        llm_model=gemini_model
+        llm_model=get_llm("expense")
     )
 
     return agent.run()
+
+
+async def arun_expense_analysis(state: dict):
+    """
+    Async entry point used by server.py.
+    """
+
+    agent = ExpenseAnalysisAgent(
+        context=state,
+        llm_model=get_llm("expense")
+    )
+
+    return await agent.arun()
@@ -1,7 +1,8 @@
 # agents/goal.py
 
-import os
-import google.generativeai as genai
+from agents.llm import generate_content_async, get_llm
+from agents.rollup import monthly_averages
+from agents.tracing import traced
 
 
 # =====================================
@@ -13,8 +14,8 @@ class GoalPlanningAgent:
         self.context = context
         self.llm_model = llm_model
 
-    def generate_ai_advice(self, goal_summary: dict):
-        prompt = f"""
+    def advice_prompt(self, goal_summary: dict):
+        return f"""
 You are acting as a personal CFO.
 
 Based on the financial goal and current situation below,
@@ -31,34 +32,63 @@ Goal Summary:
 
 Return only the 3 recommendations, one per line.
 """
+
+    @staticmethod
+    def parse_advice(text: str):
+        advice = [
+            line.strip()
+            for line in text.split("\n")
+            if line.strip()
+        ]
+        return advice[:3]
+
+    def generate_ai_advice(self, goal_summary: dict):
         try:
-            response = self.llm_model.generate_content(prompt)
-            advice = [
-                line.strip()
-                for line in response.text.split("\n")
-                if line.strip()
-            ]
-            return advice[:3]
+            response = self.llm_model.generate_content(self.advice_prompt(goal_summary))
+            return self.parse_advice(response.text)
         except Exception:
             return ["Goal advice temporarily unavailable"]
 
-    def run(self, goal_amount: float, goal_purpose: str, time_period_months: int):
+    async def agenerate_ai_advice(self, goal_summary: dict):
+        try:
+            response = await generate_content_async(
+                self.llm_model, self.advice_prompt(goal_summary)
+            )
+            return self.parse_advice(response.text)
+        except Exception:
+            return ["Goal advice temporarily unavailable"]
+
+    @traced("goal.compute")
+    def compute(self, goal_amount: float, goal_purpose: str, time_period_months: int):
+        """
+        Numeric part of the plan. Returns (plan, goal_summary); the
+        plan's recommendations are filled in by run / arun.
+        """
         expense_analysis = self.context.get("expense_analysis")
         transactions = self.context.get("categorized_transactions")
+        rollup = self.context.get("monthly_rollup")
+
+        if rollup is not None and not rollup.empty:
+            # ----------------------------
+            # Monthly averages from the rollup (recent months)
+            # ----------------------------
+            averages = monthly_averages(rollup)
+            monthly_expense = averages["monthly_expense"]
+            monthly_income = averages["monthly_income"]
+        else:
+            if not expense_analysis or transactions is None:
+                raise ValueError("Required data not found in MCP context")
 
-        if not expense_analysis or transactions is None:
-            raise ValueError("Required data not found in MCP context")
-
-        # ----------------------------
-        # Estimate Monthly Expenses
-        # ----------------------------
-        monthly_expense = expense_analysis["total_expense"]
+            # ----------------------------
+            # Estimate Monthly Expenses
+            # ----------------------------
+            monthly_expense = expense_analysis["total_expense"]
 
-        # ----------------------------
-        # Estimate Monthly Income
-        # ----------------------------
-        income_df = transactions[transactions["transaction_nature"] == "Income"]
-        monthly_income = income_df["amount"].sum()
+            # ----------------------------
+            # Estimate Monthly Income
+            # ----------------------------
+            income_df = transactions[transactions["transaction_nature"] == "Income"]
+            monthly_income = income_df["amount"].sum()
 
         # ----------------------------
         # Monthly Surplus
@@ -105,8 +135,6 @@ Return only the 3 recommendations, one per line.
             "feasibility": feasibility
         }
 
-        recommendations = self.generate_ai_advice(goal_summary)
-
         # ----------------------------
         # Final Output
         # ----------------------------
@@ -120,9 +148,22 @@ Return only the 3 recommendations, one per line.
             "estimated_monthly_surplus": round(monthly_surplus, 2),
             "feasibility": feasibility,
             "milestones": milestones,
-            "recommendations": recommendations
+            "recommendations": None
         }
 
+        return plan, goal_summary
+
+    def run(self, goal_amount: float, goal_purpose: str, time_period_months: int):
+        plan, goal_summary = self.compute(goal_amount, goal_purpose, time_period_months)
+        plan["recommendations"] = self.generate_ai_advice(goal_summary)
+
+        self.context["goal_plan"] = plan
+        return plan
+
+    async def arun(self, goal_amount: float, goal_purpose: str, time_period_months: int):
+        plan, goal_summary = self.compute(goal_amount, goal_purpose, time_period_months)
+        plan["recommendations"] = await self.agenerate_ai_advice(goal_summary)
+
         self.context["goal_plan"] = plan
         return plan
 
@@ -134,15 +175,12 @@ Return only the 3 recommendations, one per line.
 def run_goal_planner(state: dict, amount: float, purpose: str, months: int):
     """
     Entry point used by server.py.
-    Receives the shared MCP STATE and user goal parameters.
+    Receives the user's MCP session state and user goal parameters.
     """
 
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    gemini_model = genai.GenerativeModel("models/gemini-2.0-flash")
-
     agent = GoalPlanningAgent(
         context=state,
-        llm_model=gemini_model
+        llm_model=get_llm("goal")
     )
 
     return agent.run(
@@ -150,3 +188,20 @@ def run_goal_planner(state: dict, amount: float, purpose: str, months: int):
         goal_purpose=purpose,
         time_period_months=months
     )
+
+
+async def arun_goal_planner(state: dict, amount: float, purpose: str, months: int):
+    """
+    Async entry point used by server.py.
+    """
+
+    agent = GoalPlanningAgent(
+        context=state,
+        llm_model=get_llm("goal")
+    )
+
+    return await agent.arun(
+        goal_amount=amount,
+        goal_purpose=purpose,
+        time_period_months=months
+    )
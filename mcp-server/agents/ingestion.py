@@ -1,10 +1,18 @@
 # agents/ingestion.py
 
 import os
+import re
 import json
+import hashlib
+import asyncio
+import httpx
 import requests
 import pandas as pd
-import google.generativeai as genai
+
+from agents.category_cache import get_category_cache
+from agents.pdf_parser import parse_pdf_locally
+from agents.llm import generate_content_async, get_llm
+from agents.tracing import traced, increment
 
 
 # ----------------------------
@@ -12,7 +20,6 @@ import google.generativeai as genai
 # ----------------------------
 
 UNSTRACT_API_KEY = os.getenv("UNSTRACT_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 UNSTRACT_URL = (
     "https://us-central.unstract.com/deployment/api/org_rFEveiPBC1hw3ZTw/hisaab_1767987931608/"
@@ -63,20 +70,63 @@ CATEGORIES = [
 # Unstract PDF Parser
 # ----------------------------
 
-def parse_pdf_with_unstract(pdf_path: str) -> pd.DataFrame:
+UNSTRACT_HTTP_TIMEOUT = float(os.getenv("UNSTRACT_HTTP_TIMEOUT", "330"))
+
+
+def _unstract_request():
     headers = {
         "Authorization": f"Bearer {UNSTRACT_API_KEY}"
     }
+    data = {
+        "timeout": 300,
+        "include_metadata": "False",
+        "include_metrics": "False"
+    }
+    return headers, data
+
+
+def _unstract_result_to_df(result: dict) -> pd.DataFrame:
+    raw_json_string = (
+        result["message"]["result"][0]
+        ["result"]["output"]["Hisaab_1"]
+        .replace("```json", "")
+        .replace("```", "")
+        .strip()
+    )
+
+    transactions = json.loads(raw_json_string)
+    return pd.DataFrame(transactions)
+
+
+@traced("http.unstract")
+def parse_pdf_with_unstract(pdf_path: str) -> pd.DataFrame:
+    headers, data = _unstract_request()
 
     with open(pdf_path, "rb") as f:
         files = {"files": f}
-        data = {
-            "timeout": 300,
-            "include_metadata": "False",
-            "include_metrics": "False"
-        }
 
         response = requests.post(
+            UNSTRACT_URL,
+            headers=headers,
+            files=files,
+            data=data,
+            timeout=UNSTRACT_HTTP_TIMEOUT
+        )
+
+    response.raise_for_status()
+    return _unstract_result_to_df(response.json())
+
+
+@traced("http.unstract")
+async def aparse_pdf_with_unstract(pdf_path: str) -> pd.DataFrame:
+    headers, data = _unstract_request()
+
+    with open(pdf_path, "rb") as f:
+        content = f.read()
+    files = {"files": (os.path.basename(pdf_path), content, "application/pdf")}
+
+    async with httpx.AsyncClient(timeout=UNSTRACT_HTTP_TIMEOUT) as client:
+        response = await client.post(
             UNSTRACT_URL,
             headers=headers,
             files=files,
@@ -84,26 +134,315 @@ def parse_pdf_with_unstract(pdf_path: str) -> pd.DataFrame:
         )
 
     response.raise_for_status()
-    result = response.json()
+    return _unstract_result_to_df(response.json())
 
-    raw_json_string = (
-        result["message"]["result"][0]
-        ["result"]["output"]["Hisaab_1"]
-        .replace("```json", "")
-        .replace("```", "")
-        .strip()
+
+# ----------------------------
+# Statement Parsing (local first)
+# ----------------------------
+
+def statement_hash(pdf_path: str) -> str:
+    """SHA-256 of the PDF bytes; identifies re-uploads of the same file."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@traced("ingestion.parse")
+def parse_statement_pdf(pdf_path: str) -> pd.DataFrame:
+    """
+    Known bank layouts are parsed locally; anything else goes to
+    Unstract. Either way the result has the canonical dtypes.
+    """
+    df = parse_pdf_locally(pdf_path)
+    if df is None:
+        print("Parsing PDF via Unstract...")
+        df = parse_pdf_with_unstract(pdf_path)
+    return normalize_transactions(df)
+
+
+@traced("ingestion.parse")
+async def aparse_statement_pdf(pdf_path: str) -> pd.DataFrame:
+    df = await asyncio.to_thread(parse_pdf_locally, pdf_path)
+    if df is None:
+        print("Parsing PDF via Unstract...")
+        df = await aparse_pdf_with_unstract(pdf_path)
+    return normalize_transactions(df)
+
+
+# ----------------------------
+# Date Parsing
+# ----------------------------
+
+def parse_statement_dates(values) -> pd.Series:
+    """
+    Parse statement dates to datetime64. ISO dates are read as-is;
+    anything else is parsed day-first (Indian bank format, 03/01/2025
+    is 3 January). Unparseable values become NaT.
+    """
+    values = pd.Series(values)
+    parsed = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    rest = parsed.isna() & values.notna()
+    if rest.any():
+        parsed[rest] = pd.to_datetime(
+            values[rest], errors="coerce", format="mixed", dayfirst=True
+        )
+    return parsed
+
+
+# ----------------------------
+# Canonical Transaction Schema
+# ----------------------------
+
+_TRANSACTION_TYPE_ALIASES = {
+    "debit": "Debit",
+    "dr": "Debit",
+    "credit": "Credit",
+    "cr": "Credit"
+}
+
+_AMOUNT_JUNK_RE = r"[₹,\s]|INR|Rs\.?"
+
+
+def parse_amounts(values) -> pd.Series:
+    """float64 amounts; strings like "₹1,250.00" are cleaned first."""
+    values = pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype("string").str.replace(_AMOUNT_JUNK_RE, "", regex=True)
+    return pd.to_numeric(values, errors="coerce").astype("float64")
+
+
+def to_category_dtype(values) -> pd.Series:
+    """
+    Categorical over CATEGORIES. Labels outside the list (e.g. older
+    manual corrections) are kept as extra categories, not dropped.
+    """
+    values = pd.Series(values, dtype=object)
+    extras = sorted(set(values.dropna().unique()) - set(CATEGORIES))
+    return values.astype(pd.CategoricalDtype(CATEGORIES + extras))
+
+
+def canonical_transaction_types(values) -> pd.Series:
+    """"Debit" / "Credit" for known labels (dr, CR, credit ...), else NaN."""
+    return pd.Series(values).astype("string").str.strip().str.lower().map(_TRANSACTION_TYPE_ALIASES)
+
+
+def normalize_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerce a transaction frame to the canonical schema, in place:
+    date → datetime64[ns], amount → float64, category → Categorical.
+    transaction_type keeps the bank's own label (stripped) and the
+    derived transaction_nature holds the normalized direction.
+    Columns that are absent stay absent.
+    """
+    if "date" in df.columns:
+        df["date"] = parse_statement_dates(df["date"]).astype("datetime64[ns]")
+    if "amount" in df.columns:
+        df["amount"] = parse_amounts(df["amount"])
+    if "transaction_type" in df.columns:
+        df["transaction_type"] = df["transaction_type"].astype("string").str.strip()
+        df["transaction_nature"] = _nature_from_types(df["transaction_type"])
+    if "category" in df.columns:
+        df["category"] = to_category_dtype(df["category"])
+    return df
+
+
+# ----------------------------
+# Transaction Fingerprints (dedup)
+# ----------------------------
+
+def transaction_fingerprints(df: pd.DataFrame) -> pd.Series:
+    """
+    Stable per-row key: normalized date, amount, description and
+    type, plus the row's occurrence number among identical rows, so
+    two genuine same-day payments stay distinct while the same rows
+    from an overlapping statement collide.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+
+    raw_dates = df["date"].astype(str)
+    # Missing dates (NaT after normalize_transactions) stay missing
+    # through astype(str), so they fall back to ""
+    dates = parse_statement_dates(df["date"]).dt.strftime("%Y-%m-%d").fillna(raw_dates).fillna("")
+    amounts = pd.to_numeric(df["amount"], errors="coerce").map("{:.2f}".format)
+    descriptions = df["description"].fillna("").astype(str).str.lower().str.split().str.join(" ")
+    # Canonical labels, so "DR" and "Debit" rows match what is stored
+    types = (
+        canonical_transaction_types(df["transaction_type"]).astype(object).fillna("")
+        if "transaction_type" in df.columns
+        else pd.Series("", index=df.index)
     )
 
-    transactions = json.loads(raw_json_string)
-    return pd.DataFrame(transactions)
+    keys = dates + "|" + amounts + "|" + descriptions + "|" + types
+    keys = keys + "|" + keys.groupby(keys).cumcount().astype(str)
+    return keys.map(lambda key: hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+
+def drop_known_transactions(df: pd.DataFrame, known_fingerprints=None) -> pd.DataFrame:
+    """
+    Add the `fingerprint` column and drop rows already stored for the
+    user, before they reach categorization.
+    """
+    df["fingerprint"] = transaction_fingerprints(df)
+    if not known_fingerprints:
+        return df
+
+    known = df["fingerprint"].isin(known_fingerprints)
+    if known.any():
+        print(f"Skipping {int(known.sum())} transactions already ingested")
+    return df[~known].reset_index(drop=True)
+
+
+# ----------------------------
+# Income / Expense Nature
+# ----------------------------
+
+NATURE_DTYPE = pd.CategoricalDtype(["Expense", "Income"])
+
+
+def _nature_from_types(types) -> pd.Series:
+    """Credit labels are Income; debit, unknown and missing are Expense."""
+    nature = canonical_transaction_types(types).map({
+        "Debit": "Expense",
+        "Credit": "Income"
+    }).fillna("Expense")
+    return nature.astype(NATURE_DTYPE)
+
+
+def transaction_nature(df: pd.DataFrame) -> pd.Series:
+    """
+    Expense / Income per row (categorical): from transaction_type when
+    present, else positive amounts are Income. Does not modify `df`.
+    """
+    if "transaction_nature" in df.columns:
+        return df["transaction_nature"].astype(NATURE_DTYPE)
+
+    if "transaction_type" in df.columns:
+        return _nature_from_types(df["transaction_type"])
+
+    amount = pd.to_numeric(df["amount"], errors="coerce")
+    nature = pd.Series("Expense", index=df.index).mask(amount > 0, "Income")
+    return nature.astype(NATURE_DTYPE)
+
+
+def ensure_transaction_nature(df: pd.DataFrame):
+    if "transaction_nature" not in df.columns:
+        df["transaction_nature"] = transaction_nature(df)
+    return df
+
+
+# ----------------------------
+# Rule-based Pre-classifier (Tier 1)
+# ----------------------------
+
+# (category, keyword pattern, confidence). Order matters when two
+# patterns match at the same position: the earlier entry wins, so
+# more specific merchants are listed before generic keywords.
+MERCHANT_RULES = [
+    ("Cash Withdrawal", r"atm|cash\s*wdl|cash\s*withdrawal|nwd|atw", 0.95),
+    ("Self Transfer", r"self\s*transfer|to\s*self|own\s*account", 0.9),
+    ("Investments", r"sip|mutual\s*fund|zerodha|groww|upstox|kuvera|coin\s*by\s*zerodha|indian\s*clearing\s*corp|nse\s*clearing", 0.9),
+    ("Insurance", r"lic\s*of\s*india|policybazaar|insurance|hdfc\s*life|icici\s*pru", 0.9),
+    ("Rent", r"house\s*rent|nobroker|rent", 0.85),
+    ("Internet", r"airtel\s*(?:xstream|fiber|broadband)|jio\s*fiber|act\s*fibernet|hathway|broadband", 0.9),
+    ("Mobile Recharge", r"jio|airtel|vodafone|vi\s*prepaid|bsnl|recharge", 0.85),
+    ("Fuel", r"indian\s*oil|iocl|bharat\s*petroleum|bpcl|hpcl|hp\s*petrol|nayara|petrol|diesel|fuel", 0.95),
+    ("Bills & Utilities", r"electricity|bescom|msedcl|tata\s*power|adani\s*electricity|bbps|water\s*bill|gas\s*bill|indane|bharat\s*gas", 0.9),
+    ("Groceries", r"swiggy\s*instamart|instamart|bigbasket|blinkit|zepto|dmart|jiomart|grofers|reliance\s*fresh", 0.9),
+    ("Food & Dining", r"swiggy|zomato|dominos|mcdonald|kfc|starbucks|restaurant", 0.9),
+    ("Transport", r"uber|ola\s*cabs|rapido|fastag|metro", 0.85),
+    ("Travel", r"irctc|makemytrip|goibibo|cleartrip|redbus|indigo|air\s*india", 0.9),
+    ("Online Shopping", r"amazon|flipkart|myntra|ajio|meesho|nykaa", 0.85),
+    ("Entertainment", r"netflix|spotify|hotstar|prime\s*video|bookmyshow|pvr", 0.9),
+    ("Pharmacy", r"pharmeasy|netmeds|1mg|apollo\s*pharmacy|medplus", 0.9),
+    ("Medical", r"hospital|clinic|diagnostic", 0.8),
+    ("Education", r"udemy|coursera|byju|university|college|school\s*fee", 0.8),
+]
+
+RULE_CONFIDENCE_THRESHOLD = float(os.getenv("RULE_CONFIDENCE_THRESHOLD", "0.8"))
+
+# Confidence reported for labels that did not come from a rule
+CACHE_CONFIDENCE = 0.9
+LLM_BATCH_CONFIDENCE = 0.7
+LLM_SINGLE_CONFIDENCE = 0.6
+
+_MERCHANT_RULES_RE = re.compile(
+    "|".join(
+        rf"(?P<r{i}>\b(?:{pattern})\b)"
+        for i, (_, pattern, _) in enumerate(MERCHANT_RULES)
+    ),
+    re.IGNORECASE
+)
+
+# Rows resolved per tier, across the process lifetime
+CATEGORIZATION_TIER_STATS = {
+    "rules": 0,
+    "cache": 0,
+    "llm": 0,
+    "unresolved": 0
+}
+
+
+def _count_tier(tier: str):
+    CATEGORIZATION_TIER_STATS[tier] += 1
+    increment("categorization_tier_total", tier=tier)
+
+
+def classify_with_rules(description):
+    """
+    Return (category, confidence) for the first merchant keyword
+    found in the description, or (None, 0.0) when nothing matches.
+    """
+    match = _MERCHANT_RULES_RE.search(str(description or ""))
+    if match is None:
+        return None, 0.0
+
+    category, _, confidence = MERCHANT_RULES[int(match.lastgroup[1:])]
+    return category, confidence
+
+
+def get_tier_hit_rates() -> dict:
+    total = sum(CATEGORIZATION_TIER_STATS.values())
+    return {
+        tier: round(count / total, 3) if total else 0.0
+        for tier, count in CATEGORIZATION_TIER_STATS.items()
+    }
+
+
+def _pre_classify_many(descriptions: list, user_id=None) -> list:
+    """
+    Resolve descriptions without the LLM (cache, then rules), aligned
+    with `descriptions`: a result dict, or None if the LLM is needed.
+    The cache holds the user's own corrections, so it is checked
+    before the generic keyword rules; it is read in one batch.
+    """
+    cached = get_category_cache().get_many(descriptions, user_id)
+
+    results = []
+    for description, category in zip(descriptions, cached):
+        if category is not None:
+            _count_tier("cache")
+            results.append({"category": category, "tier": "cache", "confidence": CACHE_CONFIDENCE})
+            continue
+
+        category, confidence = classify_with_rules(description)
+        if category is not None and confidence >= RULE_CONFIDENCE_THRESHOLD:
+            _count_tier("rules")
+            results.append({"category": category, "tier": "rules", "confidence": confidence})
+        else:
+            results.append(None)
+    return results
 
 
 # ----------------------------
 # Gemini Categorizer
 # ----------------------------
 
-def categorize_transaction_gemini(description: str, gemini_model) -> str:
-    prompt = f"""
+def _single_prompt(description: str) -> str:
+    return f"""
 You are a financial transaction classifier.
 
 Transaction description:
@@ -114,13 +453,234 @@ Choose ONLY ONE category from this list:
 
 Return ONLY the category name.
 """
+
+
+def _classify_with_gemini(description: str, gemini_model):
+    """
+    Single-row Gemini call. Returns a label from CATEGORIES,
+    or None if the call failed or returned an unknown label.
+    """
     try:
-        response = gemini_model.generate_content(prompt)
+        response = gemini_model.generate_content(_single_prompt(description))
         category = response.text.strip()
-        return category if category in CATEGORIES else "Others"
+        return category if category in CATEGORIES else None
     except Exception as e:
         print("Gemini error:", e)
-        return "Others"
+        return None
+
+
+async def _aclassify_with_gemini(description: str, gemini_model):
+    try:
+        response = await generate_content_async(
+            gemini_model, _single_prompt(description)
+        )
+        category = response.text.strip()
+        return category if category in CATEGORIES else None
+    except Exception as e:
+        print("Gemini error:", e)
+        return None
+
+
+# ----------------------------
+# Gemini Batch Categorizer
+# ----------------------------
+
+CATEGORIZATION_BATCH_SIZE = int(os.getenv("CATEGORIZATION_BATCH_SIZE", "50"))
+
+
+def _parse_batch_categories(text: str, batch_size: int) -> dict:
+    """
+    Parse a batch response into {index: category}.
+    Entries with an unknown index or a label outside CATEGORIES are dropped.
+    """
+    cleaned = text.replace("```json", "").replace("```", "").strip()
+    items = json.loads(cleaned)
+
+    parsed = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            idx = int(item.get("index"))
+        except (TypeError, ValueError):
+            continue
+        category = str(item.get("category", "")).strip()
+        if 0 <= idx < batch_size and category in CATEGORIES:
+            parsed[idx] = category
+    return parsed
+
+
+def _batch_prompt(batch: list) -> str:
+    numbered = [
+        {"index": i, "description": str(desc)}
+        for i, desc in enumerate(batch)
+    ]
+    return f"""
+You are a financial transaction classifier.
+
+Classify EVERY transaction below into ONLY ONE category from this list:
+{CATEGORIES}
+
+Transactions (JSON):
+{json.dumps(numbered, ensure_ascii=False)}
+
+Return ONLY a JSON array with one object per transaction, in the form:
+[{{"index": 0, "category": "<category name>"}}]
+"""
+
+
+def _record_batch(batch, batch_rows, parsed, fallbacks, results):
+    """
+    Merge batch labels and single-row fallbacks into `results`
+    and teach the cache every label the LLM produced.
+    """
+    learned = []
+    for i, desc in enumerate(batch):
+        if i in parsed:
+            category, confidence = parsed[i], LLM_BATCH_CONFIDENCE
+        else:
+            category, confidence = fallbacks.get(i), LLM_SINGLE_CONFIDENCE
+
+        if category is None:
+            _count_tier("unresolved")
+            result = {"category": "Others", "tier": "unresolved", "confidence": 0.0}
+        else:
+            _count_tier("llm")
+            learned.append((desc, category))
+            result = {"category": category, "tier": "llm", "confidence": confidence}
+        results[batch_rows[i]] = result
+
+    get_category_cache().put_many(learned)
+
+
+@traced("ingestion.categorize")
+def categorize_descriptions(
+    descriptions: list,
+    gemini_model,
+    batch_size: int = CATEGORIZATION_BATCH_SIZE,
+    user_id=None
+) -> list:
+    """
+    Tiered categorization: the category cache (`user_id`'s own
+    entries first), then keyword rules, then one Gemini call per
+    chunk of the remaining descriptions. Rows missing from (or
+    invalid in) a batch response fall back to a single-row call.
+
+    Returns a list of {"category", "tier", "confidence"} dicts
+    aligned with `descriptions`.
+    """
+    results = _pre_classify_many(descriptions, user_id)
+    pending = [i for i, result in enumerate(results) if result is None]
+
+    for start in range(0, len(pending), batch_size):
+        batch_rows = pending[start:start + batch_size]
+        batch = [descriptions[row] for row in batch_rows]
+
+        try:
+            response = gemini_model.generate_content(_batch_prompt(batch))
+            parsed = _parse_batch_categories(response.text, len(batch))
+        except Exception as e:
+            print("Gemini batch error:", e)
+            parsed = {}
+
+        fallbacks = {
+            i: _classify_with_gemini(desc, gemini_model)
+            for i, desc in enumerate(batch)
+            if i not in parsed
+        }
+        _record_batch(batch, batch_rows, parsed, fallbacks, results)
+
+    return results
+
+
+@traced("ingestion.categorize")
+async def acategorize_descriptions(
+    descriptions: list,
+    gemini_model,
+    batch_size: int = CATEGORIZATION_BATCH_SIZE,
+    user_id=None
+) -> list:
+    """
+    Async categorize_descriptions: chunks are sent concurrently,
+    bounded by the global LLM concurrency limit. Cache reads and
+    writes (SQLite) run in a worker thread, off the event loop.
+    """
+    results = await asyncio.to_thread(_pre_classify_many, descriptions, user_id)
+    pending = [i for i, result in enumerate(results) if result is None]
+
+    async def run_batch(batch_rows):
+        batch = [descriptions[row] for row in batch_rows]
+
+        try:
+            response = await generate_content_async(
+                gemini_model, _batch_prompt(batch)
+            )
+            parsed = _parse_batch_categories(response.text, len(batch))
+        except Exception as e:
+            print("Gemini batch error:", e)
+            parsed = {}
+
+        missing = [i for i in range(len(batch)) if i not in parsed]
+        singles = await asyncio.gather(*(
+            _aclassify_with_gemini(batch[i], gemini_model) for i in missing
+        ))
+        await asyncio.to_thread(
+            _record_batch, batch, batch_rows, parsed, dict(zip(missing, singles)), results
+        )
+
+    await asyncio.gather(*(
+        run_batch(pending[start:start + batch_size])
+        for start in range(0, len(pending), batch_size)
+    ))
+    return results
+
+
+def assign_categories(df: pd.DataFrame, descriptions: list, results: list) -> pd.DataFrame:
+    """
+    Map per-description results (as returned by categorize_descriptions)
+    back onto every row of `df` as category / category_confidence.
+    """
+    category_map = {
+        desc: result["category"]
+        for desc, result in zip(descriptions, results)
+    }
+    confidence_map = {
+        desc: result["confidence"]
+        for desc, result in zip(descriptions, results)
+    }
+    df["category"] = to_category_dtype(df["description"].map(category_map).fillna("Others"))
+    df["category_confidence"] = df["description"].map(confidence_map).fillna(0.0)
+    return df
+
+
+# ----------------------------
+# Chunked (Streaming) Categorization
+# ----------------------------
+
+INGESTION_CHUNK_SIZE = int(os.getenv("INGESTION_CHUNK_SIZE", "500"))
+
+# Categorized chunks allowed to wait for the DB writer before the
+# categorizer blocks (backpressure)
+INGESTION_QUEUE_CHUNKS = int(os.getenv("INGESTION_QUEUE_CHUNKS", "2"))
+
+
+async def aiter_categorized_chunks(
+    df: pd.DataFrame,
+    gemini_model,
+    chunk_size: int = INGESTION_CHUNK_SIZE,
+    start_row: int = 0,
+    user_id=None
+):
+    """
+    Categorize `df` in row chunks of `chunk_size`, starting at
+    `start_row`. Yields (end_row, chunk) so callers can persist and
+    checkpoint each chunk before the next one is classified.
+    """
+    for start in range(start_row, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size].copy()
+        descriptions = chunk["description"].dropna().unique().tolist()
+        results = await acategorize_descriptions(descriptions, gemini_model, user_id=user_id)
+        yield start + len(chunk), assign_categories(chunk, descriptions, results)
 
 
 # =====================================
@@ -132,14 +692,10 @@ class DataIngestionCategorizationAgent:
         self.context = context
         self.llm_model = llm_model
 
-    def run(self, pdf_path: str):
-        print("Parsing PDF via Unstract...")
-        df = parse_pdf_with_unstract(pdf_path)
-
-        print("Categorizing transactions with LLM...")
-        df["category"] = df["description"].apply(
-            lambda x: categorize_transaction_gemini(x, self.llm_model)
-        )
+    def apply_categories(self, df: pd.DataFrame, descriptions: list, results: list):
+        assign_categories(df, descriptions, results)
+        print("Category cache:", get_category_cache().stats())
+        print("Categorization tier hit rates:", get_tier_hit_rates())
 
         self.context["raw_transactions"] = df
         self.context["categorized_transactions"] = df
@@ -147,23 +703,55 @@ class DataIngestionCategorizationAgent:
         print("Ingestion & Categorization Completed")
         return df
 
+    def run(self, pdf_path: str, known_fingerprints=None):
+        df = drop_known_transactions(parse_statement_pdf(pdf_path), known_fingerprints)
+
+        print("Categorizing transactions with LLM...")
+        # Repeated merchant strings are classified once per statement
+        unique_descriptions = df["description"].dropna().unique().tolist()
+        results = categorize_descriptions(
+            unique_descriptions, self.llm_model, user_id=self.context.get("user_id")
+        )
+        return self.apply_categories(df, unique_descriptions, results)
+
+    async def arun(self, pdf_path: str, known_fingerprints=None):
+        df = drop_known_transactions(await aparse_statement_pdf(pdf_path), known_fingerprints)
+
+        print("Categorizing transactions with LLM...")
+        unique_descriptions = df["description"].dropna().unique().tolist()
+        results = await acategorize_descriptions(
+            unique_descriptions, self.llm_model, user_id=self.context.get("user_id")
+        )
+        return self.apply_categories(df, unique_descriptions, results)
+
 
 # =====================================
 # MCP-Callable Wrapper
 # =====================================
 
-def run_ingestion(state: dict, pdf_path: str):
+def run_ingestion(state: dict, pdf_path: str, known_fingerprints=None):
     """
     Entry point used by server.py.
-    Receives the shared MCP STATE and a PDF path.
+    Receives the user's MCP session state and a PDF path; rows whose
+    fingerprint is in `known_fingerprints` are dropped before categorization.
     """
 
-    genai.configure(api_key=GEMINI_API_KEY)
-    gemini_model = genai.GenerativeModel("models/gemini-2.0-flash")
+    agent = DataIngestionCategorizationAgent(
+        context=state,
+        llm_model=get_llm("ingestion")
+    )
+
+    return agent.run(pdf_path, known_fingerprints)
+
+
+async def arun_ingestion(state: dict, pdf_path: str, known_fingerprints=None):
+    """
+    Async entry point used by server.py.
+    """
 
     agent = DataIngestionCategorizationAgent(
         context=state,
-        llm_model=gemini_model
+        llm_model=get_llm("ingestion")
     )
 
-    return agent.run(pdf_path)
+    return await agent.arun(pdf_path, known_fingerprints)
@@ -0,0 +1,427 @@
+# agents/llm.py
+
+import os
+import time
+import random
+import asyncio
+import threading
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from agents.tracing import span, current_span, increment, observe
+from agents.response_cache import (
+    ResponseCache,
+    CachedResponse,
+    prompt_key,
+    LLM_RESPONSE_CACHE_ENABLED
+)
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.0-flash")
+
+# Upper bound on Gemini calls in flight across all async tools
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+
+# Requests per minute across the process; 0 disables the limiter
+LLM_RATE_LIMIT_RPM = float(os.getenv("LLM_RATE_LIMIT_RPM", "1000"))
+
+# Agents whose prompts are served from the response cache by default
+LLM_CACHED_AGENTS = set(
+    os.getenv("LLM_CACHED_AGENTS", "expense,alerts,goal,cfo,milestone").split(",")
+)
+
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+    TimeoutError,
+    ConnectionError
+)
+
+
+# ----------------------------
+# Concurrency Limit (async)
+# ----------------------------
+
+_semaphores = {}
+
+
+def _llm_semaphore() -> asyncio.Semaphore:
+    # One semaphore per event loop; asyncio primitives are loop-bound
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+async def generate_content_async(llm_model, prompt, **kwargs):
+    """
+    Await `llm_model.generate_content_async` under the global
+    concurrency limit.
+    """
+    async with _llm_semaphore():
+        return await llm_model.generate_content_async(prompt, **kwargs)
+
+
+async def stream_content_async(llm_model, prompt, on_text, **kwargs):
+    """
+    Stream `llm_model`'s answer under the global concurrency limit,
+    awaiting `on_text(delta)` for each chunk. Returns the full text.
+    """
+    async with _llm_semaphore():
+        return await llm_model.generate_content_stream_async(prompt, on_text, **kwargs)
+
+
+def _chunk_text(chunk) -> str:
+    try:
+        return chunk.text
+    except ValueError:
+        # Chunks without text parts (safety / finish metadata)
+        return ""
+
+
+# ----------------------------
+# Rate Limiter (token bucket)
+# ----------------------------
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token; return how long the caller must wait for it."""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+def _backoff_delay(attempt: int) -> float:
+    # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+    ceiling = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+# =====================================
+# LLM Gateway
+# =====================================
+
+class LLMGateway:
+    """
+    Owns the process-wide Gemini model and wraps every call with
+    timeouts, jittered retries, rate limiting, an optional
+    prompt-hash response cache and per-agent token / latency
+    accounting.
+    """
+
+    def __init__(self, model=None, model_name: str = GEMINI_MODEL, response_cache=None):
+        if model is None:
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            model = genai.GenerativeModel(model_name)
+
+        if response_cache is None and LLM_RESPONSE_CACHE_ENABLED:
+            response_cache = ResponseCache()
+
+        self.model = model
+        self.model_name = model_name
+        self.rate_limiter = RateLimiter(LLM_RATE_LIMIT_RPM)
+        self.response_cache = response_cache
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def for_agent(self, agent: str, use_cache: bool = False) -> "AgentLLM":
+        return AgentLLM(self, agent, use_cache=use_cache)
+
+    # ----------------------------
+    # Accounting
+    # ----------------------------
+    def _agent_stats(self, agent: str) -> dict:
+        return self._stats.setdefault(agent, {
+            "calls": 0,
+            "errors": 0,
+            "retries": 0,
+            "cache_hits": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "latency_ms_total": 0.0,
+            "latency_ms_max": 0.0
+        })
+
+    def _record(self, agent: str, started: float, response=None, retries=0, error=False):
+        latency_ms = (time.perf_counter() - started) * 1000
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = (getattr(usage, "prompt_token_count", 0) or 0) if usage is not None else 0
+        output_tokens = (getattr(usage, "candidates_token_count", 0) or 0) if usage is not None else 0
+
+        with self._stats_lock:
+            s = self._agent_stats(agent)
+            s["calls"] += 1
+            s["retries"] += retries
+            s["latency_ms_total"] += latency_ms
+            s["latency_ms_max"] = max(s["latency_ms_max"], latency_ms)
+            if error:
+                s["errors"] += 1
+            s["prompt_tokens"] += prompt_tokens
+            s["output_tokens"] += output_tokens
+
+        increment("llm_calls_total", agent=agent)
+        increment("llm_retries_total", retries, agent=agent)
+        increment("llm_tokens_total", prompt_tokens, agent=agent, kind="prompt")
+        increment("llm_tokens_total", output_tokens, agent=agent, kind="output")
+        observe("llm_latency_ms", latency_ms, agent=agent)
+        if error:
+            increment("llm_errors_total", agent=agent)
+        current_span().set(
+            retries=retries,
+            prompt_tokens=prompt_tokens,
+            output_tokens=output_tokens,
+            error=error
+        )
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                agent: {
+                    **s,
+                    "latency_ms_avg": round(s["latency_ms_total"] / s["calls"], 3) if s["calls"] else 0.0
+                }
+                for agent, s in self._stats.items()
+            }
+
+    def _request_kwargs(self, kwargs: dict) -> dict:
+        kwargs.setdefault("request_options", {"timeout": LLM_TIMEOUT_SECONDS})
+        return kwargs
+
+    # ----------------------------
+    # Response Cache
+    # ----------------------------
+    def _cache_lookup(self, agent: str, prompt, kwargs: dict, use_cache: bool):
+        """
+        Returns (key, cached_response). key is None when the call
+        must not be cached (cache disabled, bypassed, or streaming).
+        """
+        if not use_cache or self.response_cache is None or kwargs.get("stream"):
+            return None, None
+
+        key = prompt_key(self.model_name, prompt, kwargs)
+        text = self.response_cache.get(key)
+        if text is None:
+            return key, None
+
+        with self._stats_lock:
+            self._agent_stats(agent)["cache_hits"] += 1
+        increment("llm_cache_hits_total", agent=agent)
+        current_span().set(cache_hit=True)
+        return key, CachedResponse(text)
+
+    def _cache_store(self, key, response):
+        if key is None:
+            return
+        try:
+            self.response_cache.put(key, response.text)
+        except Exception:
+            # Blocked / empty candidates have no text; just don't cache
+            pass
+
+    # ----------------------------
+    # Calls
+    # ----------------------------
+    def generate(self, agent: str, prompt, use_cache: bool = False, **kwargs):
+        with span("llm.generate", agent=agent, model=self.model_name):
+            return self._generate(agent, prompt, use_cache, **kwargs)
+
+    async def agenerate(self, agent: str, prompt, use_cache: bool = False, **kwargs):
+        with span("llm.generate", agent=agent, model=self.model_name):
+            return await self._agenerate(agent, prompt, use_cache, **kwargs)
+
+    def _generate(self, agent: str, prompt, use_cache: bool = False, **kwargs):
+        kwargs = self._request_kwargs(kwargs)
+        key, cached = self._cache_lookup(agent, prompt, kwargs, use_cache)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            wait = self.rate_limiter.reserve()
+            if wait:
+                time.sleep(wait)
+            try:
+                response = self.model.generate_content(prompt, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == LLM_MAX_RETRIES:
+                    self._record(agent, started, retries=attempt, error=True)
+                    raise
+                print(f"Gemini retry {attempt + 1} ({agent}):", e)
+                time.sleep(_backoff_delay(attempt))
+            except Exception:
+                self._record(agent, started, retries=attempt, error=True)
+                raise
+            else:
+                self._record(agent, started, response, retries=attempt)
+                self._cache_store(key, response)
+                return response
+
+    async def _agenerate(self, agent: str, prompt, use_cache: bool = False, **kwargs):
+        kwargs = self._request_kwargs(kwargs)
+        key, cached = self._cache_lookup(agent, prompt, kwargs, use_cache)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            wait = self.rate_limiter.reserve()
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                response = await self.model.generate_content_async(prompt, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == LLM_MAX_RETRIES:
+                    self._record(agent, started, retries=attempt, error=True)
+                    raise
+                print(f"Gemini retry {attempt + 1} ({agent}):", e)
+                await asyncio.sleep(_backoff_delay(attempt))
+            except Exception:
+                self._record(agent, started, retries=attempt, error=True)
+                raise
+            else:
+                self._record(agent, started, response, retries=attempt)
+                self._cache_store(key, response)
+                return response
+
+
+    async def astream(self, agent: str, prompt, on_text, **kwargs) -> str:
+        """
+        generate_content_async(stream=True), awaiting `on_text(delta)`
+        as chunks arrive. Retries only cover opening the stream; once
+        text has been sent a failure is raised to the caller. Streamed
+        calls bypass the response cache.
+        """
+        with span("llm.stream", agent=agent, model=self.model_name) as llm_span:
+            kwargs = self._request_kwargs(kwargs)
+            kwargs["stream"] = True
+            started = time.perf_counter()
+
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                wait = self.rate_limiter.reserve()
+                if wait:
+                    await asyncio.sleep(wait)
+                try:
+                    response = await self.model.generate_content_async(prompt, **kwargs)
+                except RETRYABLE_ERRORS as e:
+                    if attempt == LLM_MAX_RETRIES:
+                        self._record(agent, started, retries=attempt, error=True)
+                        raise
+                    print(f"Gemini retry {attempt + 1} ({agent}):", e)
+                    await asyncio.sleep(_backoff_delay(attempt))
+                except Exception:
+                    self._record(agent, started, retries=attempt, error=True)
+                    raise
+                else:
+                    break
+
+            parts = []
+            try:
+                async for chunk in response:
+                    text = _chunk_text(chunk)
+                    if not text:
+                        continue
+                    if not parts:
+                        first_token_ms = (time.perf_counter() - started) * 1000
+                        observe("llm_first_token_ms", first_token_ms, agent=agent)
+                        llm_span.set(first_token_ms=round(first_token_ms, 3))
+                    parts.append(text)
+                    await on_text(text)
+            except Exception:
+                self._record(agent, started, retries=attempt, error=True)
+                raise
+
+            self._record(agent, started, response, retries=attempt)
+            return "".join(parts)
+
+
+class AgentLLM:
+    """
+    Per-agent view of the gateway. Exposes the same
+    generate_content / generate_content_async methods as a
+    GenerativeModel, so agents take it as their `llm_model`.
+
+    `use_cache` sets whether identical prompts are served from the
+    response cache; pass use_cache=False on a call to bypass it.
+    """
+
+    def __init__(self, gateway: LLMGateway, agent: str, use_cache: bool = False):
+        self.gateway = gateway
+        self.agent = agent
+        self.use_cache = use_cache
+
+    def generate_content(self, prompt, use_cache=None, **kwargs):
+        if use_cache is None:
+            use_cache = self.use_cache
+        return self.gateway.generate(self.agent, prompt, use_cache=use_cache, **kwargs)
+
+    async def generate_content_async(self, prompt, use_cache=None, **kwargs):
+        if use_cache is None:
+            use_cache = self.use_cache
+        return await self.gateway.agenerate(self.agent, prompt, use_cache=use_cache, **kwargs)
+
+    async def generate_content_stream_async(self, prompt, on_text, **kwargs):
+        return await self.gateway.astream(self.agent, prompt, on_text, **kwargs)
+
+
+# ----------------------------
+# Process-wide Gateway
+# ----------------------------
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+def set_gateway(gateway: LLMGateway):
+    """Swap the process-wide gateway (e.g. to wrap a stub model)."""
+    global _gateway
+    with _gateway_lock:
+        _gateway = gateway
+
+
+def get_llm(agent: str, use_cache: bool = None) -> AgentLLM:
+    if use_cache is None:
+        use_cache = agent in LLM_CACHED_AGENTS
+    return get_gateway().for_agent(agent, use_cache=use_cache)
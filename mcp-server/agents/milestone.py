@@ -1,25 +1,19 @@
+from agents.llm import generate_content_async
+
+
 class MilestoneAdjustmentAgent:
     def __init__(self, llm_model):
         self.llm_model = llm_model
 
-    def generate_adjusted_recommendations(
+    def adjustment_prompt(
         self,
         saved_amount: float,
         expected_amount: float,
+        performance: str,
         current_recommendations: list,
         expense_summary: dict
     ):
-        delta = saved_amount - expected_amount
-
-        if abs(delta) < expected_amount * 0.05:
-            return {
-                "status": "On Track",
-                "recommendations": current_recommendations
-            }
-
-        performance = "Ahead" if delta > 0 else "Behind"
-
-        prompt = f"""
+        return f"""
 You are an Autonomous CFO.
 
 The user had a saving target of ₹{expected_amount} but actually saved ₹{saved_amount}.
@@ -42,6 +36,35 @@ Rules:
 Return only the 3 lines.
 """
 
+    @staticmethod
+    def performance(saved_amount: float, expected_amount: float):
+        delta = saved_amount - expected_amount
+
+        if abs(delta) < expected_amount * 0.05:
+            return "On Track"
+
+        return "Ahead" if delta > 0 else "Behind"
+
+    def generate_adjusted_recommendations(
+        self,
+        saved_amount: float,
+        expected_amount: float,
+        current_recommendations: list,
+        expense_summary: dict
+    ):
+        performance = self.performance(saved_amount, expected_amount)
+
+        if performance == "On Track":
+            return {
+                "status": performance,
+                "recommendations": current_recommendations
+            }
+
+        prompt = self.adjustment_prompt(
+            saved_amount, expected_amount, performance,
+            current_recommendations, expense_summary
+        )
+
         try:
             response = self.llm_model.generate_content(prompt)
             lines = [line.strip() for line in response.text.split("\n") if line.strip()]
@@ -55,6 +78,46 @@ Return only the 3 lines.
                 "recommendations": current_recommendations
             }
 
+    async def agenerate_adjusted_recommendations(
+        self,
+        saved_amount: float,
+        expected_amount: float,
+        current_recommendations: list,
+        expense_summary: dict
+    ):
+        performance = self.performance(saved_amount, expected_amount)
+
+        if performance == "On Track":
+            return {
+                "status": performance,
+                "recommendations": current_recommendations
+            }
+
+        prompt = self.adjustment_prompt(
+            saved_amount, expected_amount, performance,
+            current_recommendations, expense_summary
+        )
+
+        try:
+            response = await generate_content_async(self.llm_model, prompt)
+            lines = [line.strip() for line in response.text.split("\n") if line.strip()]
+            return {
+                "status": performance,
+                "recommendations": lines[:3]
+            }
+        except Exception:
+            return {
+                "status": performance,
+                "recommendations": current_recommendations
+            }
+
+    def updated_plan(self, goal_plan, result):
+        return {
+            **goal_plan,
+            "milestone_status": result["status"],
+            "recommendations": result["recommendations"]
+        }
+
     def run(self, saved_amount, expected_amount, goal_plan, expense_analysis):
         current_recs = goal_plan.get("recommendations", [])
 
@@ -65,10 +128,16 @@ Return only the 3 lines.
             expense_analysis
         )
 
-        updated_plan = {
-            **goal_plan,
-            "milestone_status": result["status"],
-            "recommendations": result["recommendations"]
-        }
+        return self.updated_plan(goal_plan, result)
+
+    async def arun(self, saved_amount, expected_amount, goal_plan, expense_analysis):
+        current_recs = goal_plan.get("recommendations", [])
+
+        result = await self.agenerate_adjusted_recommendations(
+            saved_amount,
+            expected_amount,
+            current_recs,
+            expense_analysis
+        )
 
-        return updated_plan
+        return self.updated_plan(goal_plan, result)
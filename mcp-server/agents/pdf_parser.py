@@ -0,0 +1,142 @@
+# agents/pdf_parser.py
+
+import os
+import re
+from abc import ABC, abstractmethod
+import pandas as pd
+import pdfplumber
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+LOCAL_PDF_PARSER_ENABLED = os.getenv("LOCAL_PDF_PARSER_ENABLED", "1") == "1"
+
+# Same columns the Unstract extractor returns
+STATEMENT_COLUMNS = ["date", "description", "amount", "transaction_type"]
+
+# Narrow gap so words in tightly kerned statements stay separated
+PDF_TEXT_X_TOLERANCE = 1.5
+
+
+# ----------------------------
+# Text Extraction
+# ----------------------------
+
+def extract_pdf_pages(pdf_path: str) -> list:
+    """Text of every page; image-only (scanned) pages come back empty."""
+    with pdfplumber.open(pdf_path) as pdf:
+        return [
+            page.extract_text(x_tolerance=PDF_TEXT_X_TOLERANCE) or ""
+            for page in pdf.pages
+        ]
+
+
+def _parse_amount(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+# =====================================
+# Bank Layout Templates
+# =====================================
+
+class StatementTemplate(ABC):
+    """
+    One statement layout. `matches` looks at the first page's text;
+    `parse` turns all page texts into rows with STATEMENT_COLUMNS.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def matches(self, first_page: str) -> bool:
+        ...
+
+    @abstractmethod
+    def parse(self, pages: list) -> list:
+        ...
+
+
+class GooglePayTemplate(StatementTemplate):
+    """
+    Google Pay "Transaction statement" export:
+
+        01 Dec, 2025 Paid to ZOMATO LIMITED ₹396
+        11:51 PM UPI Transaction ID: 115192428565
+        Paid by Bank Of Maharashtra 7616
+    """
+
+    name = "google_pay"
+
+    _ROW_RE = re.compile(
+        r"^(?P<date>\d{1,2} [A-Za-z]{3}, \d{4}) "
+        r"(?P<details>.+?) ₹(?P<amount>[\d,]+(?:\.\d+)?)$"
+    )
+
+    def matches(self, first_page: str) -> bool:
+        return (
+            first_page.startswith("Transaction statement")
+            and "Google Pay" in first_page
+        )
+
+    def parse(self, pages: list) -> list:
+        rows = []
+        for text in pages:
+            for line in text.splitlines():
+                m = self._ROW_RE.match(line.strip())
+                if not m:
+                    continue
+
+                details = m.group("details")
+                rows.append({
+                    "date": pd.to_datetime(m.group("date"), format="%d %b, %Y").strftime("%Y-%m-%d"),
+                    "description": details,
+                    "amount": _parse_amount(m.group("amount")),
+                    "transaction_type": "Credit" if details.startswith("Received from") else "Debit"
+                })
+        return rows
+
+
+TEMPLATES = [
+    GooglePayTemplate()
+]
+
+
+def register_template(template: StatementTemplate):
+    """Add a bank layout; later registrations are tried first."""
+    TEMPLATES.insert(0, template)
+
+
+# ----------------------------
+# Local Parse (fast path)
+# ----------------------------
+
+def parse_pdf_locally(pdf_path: str):
+    """
+    Parse a statement with the first matching template.
+    Returns None when no template matches (or nothing was extracted),
+    so the caller can fall back to Unstract.
+    """
+    if not LOCAL_PDF_PARSER_ENABLED:
+        return None
+
+    try:
+        pages = extract_pdf_pages(pdf_path)
+    except Exception as e:
+        print("Local PDF extraction error:", e)
+        return None
+
+    if not pages or not pages[0].strip():
+        return None
+
+    for template in TEMPLATES:
+        if not template.matches(pages[0]):
+            continue
+
+        rows = template.parse(pages)
+        if rows:
+            print(f"Parsed {len(rows)} transactions locally ({template.name})")
+            return pd.DataFrame(rows, columns=STATEMENT_COLUMNS)
+
+    return None
@@ -0,0 +1,221 @@
+# agents/query_engine.py
+
+import re
+import numpy as np
+import pandas as pd
+
+from agents.retrieval import TransactionIndex, STOPWORDS, MONTH_NAMES
+from agents.rollup import TRANSFER_CATEGORIES
+from agents.tracing import traced
+
+
+# ----------------------------
+# Intent Parsing
+# ----------------------------
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Checked in order; the first metric with a matching word wins
+_METRIC_WORDS = [
+    ("avg", {"average", "avg", "mean"}),
+    ("count", {"many", "count", "number"}),
+    ("max", {"largest", "biggest", "highest", "maximum", "max", "costliest", "expensive"}),
+    ("min", {"smallest", "lowest", "minimum", "min", "cheapest"}),
+    ("sum", {"much", "total", "sum", "spent", "spend", "earned", "received"})
+]
+
+_INCOME_WORDS = {"earn", "earned", "income", "received", "credited", "credit", "credits", "salary", "refund", "refunds"}
+_EXPENSE_WORDS = {"spend", "spent", "spending", "paid", "pay", "payment", "payments", "expense", "expenses", "debit", "debits", "debited", "cost"}
+
+# Opinion / advice questions need the model even when they mention numbers
+_OPEN_ENDED_WORDS = {"why", "should", "advice", "advise", "suggest", "recommend", "tips", "improve", "reduce", "save", "compare", "trend", "budget", "plan"}
+
+# Words that carry no filter; anything else left unrecognized means
+# the question names something the index could not resolve
+_FILLER_WORDS = STOPWORDS | set(MONTH_NAMES) | {
+    "have", "had", "has", "made", "make", "ever", "till", "until", "since",
+    "before", "after", "during", "between", "above", "over", "under", "below",
+    "more", "less", "than", "greater", "past", "today", "yesterday", "are",
+    "there", "you", "can", "tell", "give", "get", "value", "amount", "money",
+    "rupees", "inr", "single", "one", "most", "far", "out", "into", "per",
+    "category", "merchant", "to", "at", "on", "in", "of"
+}
+
+
+def parse_intent(question: str):
+    """
+    The aggregation a question asks for, e.g.
+    "how much did I spend on Fuel in March?" -> {"metric": "sum", "nature": "Expense"}.
+    None for open-ended questions the engine should not answer.
+    """
+    words = set(_WORD_RE.findall(question.lower()))
+    if words & _OPEN_ENDED_WORDS:
+        return None
+
+    metric = next((name for name, triggers in _METRIC_WORDS if words & triggers), None)
+    if metric is None:
+        return None
+
+    nature = None
+    if words & _INCOME_WORDS:
+        nature = "Income"
+    elif words & _EXPENSE_WORDS:
+        nature = "Expense"
+
+    return {"metric": metric, "nature": nature}
+
+
+# ----------------------------
+# Answer Phrasing
+# ----------------------------
+
+def _rupees(value: float) -> str:
+    return f"₹{value:,.2f}"
+
+
+def _describe_scope(filters: dict) -> str:
+    parts = []
+
+    names = filters["categories"] + [m.upper() for m in filters["merchants"]]
+    if names:
+        parts.append("on " + " / ".join(names))
+    if filters.get("broad_merchants"):
+        parts.append("via " + " / ".join(m.upper() for m in filters["broad_merchants"]))
+
+    start, end = filters["start"], filters["end"]
+    if start is not None and end is not None:
+        if start.day == 1 and end == start + pd.DateOffset(months=1):
+            parts.append("in " + start.strftime("%B %Y"))
+        elif start.day == 1 and start.month == 1 and end == start + pd.DateOffset(years=1):
+            parts.append(f"in {start.year}")
+        else:
+            last = end - pd.Timedelta(days=1)
+            if last == start:
+                parts.append("on " + start.strftime("%d %b %Y"))
+            else:
+                parts.append(f"between {start.strftime('%d %b %Y')} and {last.strftime('%d %b %Y')}")
+    elif start is not None:
+        parts.append("since " + start.strftime("%d %b %Y"))
+    elif end is not None:
+        parts.append("before " + end.strftime("%d %b %Y"))
+
+    if filters["min_amount"] is not None and filters["max_amount"] is not None:
+        parts.append(f"between {_rupees(filters['min_amount'])} and {_rupees(filters['max_amount'])}")
+    elif filters["min_amount"] is not None:
+        parts.append("above " + _rupees(filters["min_amount"]))
+    elif filters["max_amount"] is not None:
+        parts.append("below " + _rupees(filters["max_amount"]))
+
+    return (" " + " ".join(parts)) if parts else ""
+
+
+def _phrase(result: dict) -> str:
+    scope = result["scope"]
+    noun = "income" if result["nature"] == "Income" else "spending"
+    n = result["count"]
+
+    if n == 0:
+        return f"I found no matching transactions{scope}."
+
+    if result["metric"] == "sum":
+        verb = "received" if result["nature"] == "Income" else "spent"
+        return f"You {verb} {_rupees(result['value'])}{scope} across {n} transaction{'s' if n != 1 else ''}."
+    if result["metric"] == "count":
+        return f"You have {n} transaction{'s' if n != 1 else ''}{scope}, totalling {_rupees(result['total'])}."
+    if result["metric"] == "avg":
+        return f"Your average {noun} transaction{scope} was {_rupees(result['value'])} over {n} transactions."
+
+    t = result["transaction"]
+    which = "largest" if result["metric"] == "max" else "smallest"
+    kind = "credit" if result["nature"] == "Income" else "payment"
+    return (
+        f"Your {which} {kind}{scope} was {_rupees(t['amount'])} "
+        f"({t['description']}, {t['category']}) on {t['date']}."
+    )
+
+
+def _unresolved_words(index: TransactionIndex, question: str, filters: dict) -> set:
+    known = set(_FILLER_WORDS) | set(filters["merchants"]) | set(filters["broad_merchants"])
+    for _, triggers in _METRIC_WORDS:
+        known |= triggers
+    known |= _INCOME_WORDS | _EXPENSE_WORDS
+    known |= index.category_words(filters["categories"])
+    known |= {w for name in filters["categories"] for w in _WORD_RE.findall(name.lower())}
+
+    return {
+        w for w in _WORD_RE.findall(question.lower())
+        if len(w) >= 3 and w not in known
+    }
+
+
+# =====================================
+# Aggregation Engine
+# =====================================
+
+@traced("chat.query_engine")
+def answer_question(index: TransactionIndex, question: str):
+    """
+    Answer a purely numeric question (sum / count / average / largest /
+    smallest over a filtered set) straight from the session index.
+
+    Returns a result dict with the computed figures and a ready-to-send
+    `answer`, or None when the question is not a plain aggregation.
+    """
+    intent = parse_intent(question)
+    if intent is None:
+        return None
+
+    filters = index.parse_filters(question)
+    if _unresolved_words(index, question, filters):
+        return None
+    # Exact answers need every named token, however common
+    selected = index.select(filters, include_broad=True)
+
+    # "how much did I spend" needs a direction or a filter to be answerable
+    if selected is None and intent["nature"] is None:
+        return None
+    if selected is None:
+        selected = np.arange(index.size)
+
+    # Counts cover every transaction unless a direction was named
+    nature = intent["nature"] or (None if intent["metric"] == "count" else "Expense")
+    if nature:
+        selected = np.intersect1d(selected, index.rows_for_nature(nature))
+    if nature == "Expense" and not filters["categories"]:
+        transfers = index.rows_for_categories(TRANSFER_CATEGORIES)
+        selected = np.setdiff1d(selected, transfers)
+
+    amounts = index.amounts(selected)
+    keep = ~np.isnan(amounts)
+    selected, amounts = selected[keep], amounts[keep]
+
+    result = {
+        "metric": intent["metric"],
+        "nature": nature,
+        "scope": _describe_scope(filters),
+        "count": int(len(selected)),
+        "total": round(float(amounts.sum()), 2),
+        "value": None,
+        "transaction": None
+    }
+
+    if len(selected):
+        if intent["metric"] == "sum":
+            result["value"] = result["total"]
+        elif intent["metric"] == "count":
+            result["value"] = result["count"]
+        elif intent["metric"] == "avg":
+            result["value"] = round(float(amounts.mean()), 2)
+        else:
+            pick = amounts.argmax() if intent["metric"] == "max" else amounts.argmin()
+            row = index.df.iloc[int(selected[pick])]
+            result["value"] = round(float(amounts[pick]), 2)
+            result["transaction"] = {
+                "date": pd.Timestamp(row["date"]).strftime("%Y-%m-%d") if pd.notna(row["date"]) else None,
+                "description": str(row["description"]),
+                "amount": result["value"],
+                "category": str(row["category"])
+            }
+
+    result["answer"] = _phrase(result)
+    return result
@@ -0,0 +1,152 @@
+# agents/response_cache.py
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "1") == "1"
+LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+LLM_RESPONSE_CACHE_MAX_BYTES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+LLM_RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("LLM_RESPONSE_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Optional SQLite file backing the in-memory LRU; empty = memory only
+LLM_RESPONSE_CACHE_PATH = os.getenv("LLM_RESPONSE_CACHE_PATH", "")
+
+
+def prompt_key(model_name: str, prompt, kwargs: dict) -> str:
+    """
+    Content address of a call: model, prompt and any generation
+    settings. Transport options (timeouts) are not part of the key.
+    """
+    settings = {k: v for k, v in kwargs.items() if k != "request_options"}
+    payload = f"{model_name}\x00{prompt}\x00{sorted(settings.items(), key=lambda kv: kv[0])!r}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """Minimal stand-in for a Gemini response served from cache."""
+
+    usage_metadata = None
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+# =====================================
+# Prompt-hash Response Cache
+# =====================================
+
+class ResponseCache:
+    """
+    LRU of response text keyed by prompt hash, bounded by entry
+    count and total bytes, with a TTL. When `path` is set, entries
+    are also written to SQLite so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = LLM_RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes: int = LLM_RESPONSE_CACHE_MAX_BYTES,
+        ttl_seconds: int = LLM_RESPONSE_CACHE_TTL_SECONDS,
+        path: str = LLM_RESPONSE_CACHE_PATH
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if path:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    prompt_key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, stored_at FROM llm_response_cache WHERE prompt_key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = row
+                    self._insert(key, row[0], row[1])
+
+            if entry is None or now - entry[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, text: str):
+        now = time.time()
+        with self._lock:
+            self._insert(key, text, now)
+            if self._db is not None:
+                self._db.execute(
+                    """
+                    INSERT OR REPLACE INTO llm_response_cache (prompt_key, response, stored_at)
+                    VALUES (?, ?, ?)
+                    """,
+                    (key, text, now)
+                )
+                self._db.execute(
+                    "DELETE FROM llm_response_cache WHERE stored_at < ?",
+                    (now - self.ttl_seconds,)
+                )
+                self._db.commit()
+
+    def _insert(self, key: str, text: str, stored_at: float):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old[0])
+
+        self._entries[key] = (text, stored_at)
+        self._bytes += len(text)
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
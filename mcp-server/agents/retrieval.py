@@ -0,0 +1,493 @@
+# agents/retrieval.py
+
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+from agents.category_cache import normalize_description
+from agents.ingestion import ensure_transaction_nature
+from agents.rollup import TRANSFER_CATEGORIES
+from agents.tracing import traced
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+# Rough prompt budget for the chat context block (4 chars ≈ 1 token)
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "2000"))
+
+# Months of per-month totals always included in the context
+CHAT_SUMMARY_MONTHS = int(os.getenv("CHAT_SUMMARY_MONTHS", "12"))
+
+# Merchant tokens found in more than this share of rows are not selective
+MERCHANT_TOKEN_MAX_SHARE = 0.5
+
+CHAT_ROW_COLUMNS = ["date", "description", "amount", "category"]
+
+# Question words that never name a merchant
+STOPWORDS = {
+    "how", "much", "many", "did", "does", "do", "spend", "spent", "spending",
+    "the", "and", "for", "from", "with", "what", "when", "which", "was", "were",
+    "last", "this", "month", "week", "year", "day", "days", "my", "all", "any",
+    "total", "paid", "pay", "payment", "payments", "largest", "biggest",
+    "smallest", "highest", "lowest", "transaction", "transactions", "show", "list"
+}
+
+# Month name or abbreviation -> month number
+MONTH_NAMES = {
+    name: number
+    for number, names in enumerate([
+        ("january", "jan"), ("february", "feb"), ("march", "mar"),
+        ("april", "apr"), ("may",), ("june", "jun"), ("july", "jul"),
+        ("august", "aug"), ("september", "sep", "sept"), ("october", "oct"),
+        ("november", "nov"), ("december", "dec")
+    ], start=1)
+    for name in names
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+_MONTH_RE = re.compile(r"\b(" + "|".join(sorted(MONTH_NAMES, key=len, reverse=True)) + r")\b(?:\s+(\d{4}))?")
+_YEAR_RE = re.compile(r"\b(20\d{2})\b")
+_LAST_N_DAYS_RE = re.compile(r"\b(?:last|past)\s+(\d+)\s+days?\b")
+_AMOUNT = r"(?:rs\.?|inr|₹)?\s*([\d,]+(?:\.\d+)?)"
+_BETWEEN_RE = re.compile(r"\bbetween\s+" + _AMOUNT + r"\s+and\s+" + _AMOUNT)
+_ABOVE_RE = re.compile(r"(?:\babove|\bover|\bmore than|\bgreater than|>)\s*" + _AMOUNT)
+_BELOW_RE = re.compile(r"(?:\bbelow|\bunder|\bless than|<)\s*" + _AMOUNT)
+
+
+def _to_amount(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def estimate_tokens(value) -> int:
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return len(text) // 4 + 1
+
+
+# =====================================
+# Per-session Transaction Index
+# =====================================
+
+class TransactionIndex:
+    """
+    Read-only lookup structures over one transaction frame:
+
+    - inverted index from merchant tokens to description codes
+    - date and amount sort orders for range lookups
+    - row positions per category
+    - precomputed totals (overall, per category, per month)
+
+    Built once per frame and reused for every chat question.
+    """
+
+    @traced("retrieval.build_index")
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.size = len(df)
+
+        ensure_transaction_nature(df)
+        self._dates = pd.to_datetime(df["date"], errors="coerce").to_numpy()
+        self._amounts = pd.to_numeric(df["amount"], errors="coerce").to_numpy(dtype=float)
+
+        # Descriptions repeat heavily; tokenize each distinct one once
+        codes, uniques = pd.factorize(df["description"].fillna("").astype(str))
+        self._description_codes = codes
+        self.tokens = {}
+        for code, description in enumerate(uniques):
+            for token in set(normalize_description(description).split()):
+                if len(token) >= 3:
+                    self.tokens.setdefault(token, []).append(code)
+        self.tokens = {t: np.asarray(c) for t, c in self.tokens.items()}
+        self._code_counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+        self._date_order = np.argsort(self._dates, kind="stable")
+        self._sorted_dates = self._dates[self._date_order]
+        self._valid_dates = int(np.count_nonzero(~np.isnat(self._sorted_dates)))
+
+        self._amount_order = np.argsort(self._amounts, kind="stable")
+        self._sorted_amounts = self._amounts[self._amount_order]
+
+        categories = df["category"].astype(object).fillna("Others")
+        self.categories = {
+            str(name): np.asarray(rows)
+            for name, rows in categories.groupby(categories).indices.items()
+        }
+        self._category_words = self._unique_category_words()
+
+        natures = df["transaction_nature"].astype(object).fillna("Expense")
+        self.natures = {
+            str(name): np.asarray(rows)
+            for name, rows in natures.groupby(natures).indices.items()
+        }
+
+        self.aggregates = self._aggregates()
+
+    # ----------------------------
+    # Precomputed Aggregates
+    # ----------------------------
+
+    def _aggregates(self) -> dict:
+        df = self.df
+        amounts = pd.Series(self._amounts, index=df.index)
+        is_income = df["transaction_nature"] == "Income"
+        is_expense = ~is_income & ~df["category"].isin(TRANSFER_CATEGORIES)
+
+        expense_by_category = (
+            amounts[is_expense].groupby(df["category"][is_expense], observed=True).sum()
+            .sort_values(ascending=False)
+        )
+
+        months = pd.Series(self._dates, index=df.index).dt.to_period("M")
+        monthly = pd.DataFrame({
+            "month": months,
+            "expense": amounts.where(is_expense, 0.0),
+            "income": amounts.where(is_income, 0.0)
+        }).dropna(subset=["month"]).groupby("month").sum().sort_index()
+
+        return {
+            "total_transactions": self.size,
+            "date_range": self._date_span(),
+            "total_expense": round(float(amounts[is_expense].sum()), 2),
+            "total_income": round(float(amounts[is_income].sum()), 2),
+            "expense_by_category": {str(k): round(float(v), 2) for k, v in expense_by_category.items()},
+            "monthly_totals": {
+                str(month): {"expense": round(float(r.expense), 2), "income": round(float(r.income), 2)}
+                for month, r in monthly.tail(CHAT_SUMMARY_MONTHS).iterrows()
+            }
+        }
+
+    def _date_span(self):
+        if not self._valid_dates:
+            return None
+        return [
+            pd.Timestamp(self._sorted_dates[0]).strftime("%Y-%m-%d"),
+            pd.Timestamp(self._sorted_dates[self._valid_dates - 1]).strftime("%Y-%m-%d")
+        ]
+
+    @property
+    def latest_date(self):
+        if not self._valid_dates:
+            return None
+        return pd.Timestamp(self._sorted_dates[self._valid_dates - 1])
+
+    # ----------------------------
+    # Lookups
+    # ----------------------------
+
+    def rows_for_tokens(self, tokens) -> np.ndarray:
+        codes = [self.tokens[t] for t in tokens if t in self.tokens]
+        if not codes:
+            return np.array([], dtype=int)
+        return np.flatnonzero(np.isin(self._description_codes, np.concatenate(codes)))
+
+    def token_share(self, token: str) -> float:
+        codes = self.tokens.get(token)
+        if codes is None or not self.size:
+            return 0.0
+        return float(self._code_counts[codes].sum()) / self.size
+
+    def rows_for_categories(self, categories) -> np.ndarray:
+        parts = [self.categories[c] for c in categories if c in self.categories]
+        return np.concatenate(parts) if parts else np.array([], dtype=int)
+
+    def rows_for_nature(self, nature: str) -> np.ndarray:
+        return self.natures.get(nature, np.array([], dtype=int))
+
+    def rows_in_date_range(self, start=None, end=None) -> np.ndarray:
+        """Rows with start <= date < end."""
+        dates = self._sorted_dates[: self._valid_dates]
+        lo = np.searchsorted(dates, np.datetime64(start, "ns")) if start is not None else 0
+        hi = np.searchsorted(dates, np.datetime64(end, "ns")) if end is not None else self._valid_dates
+        return self._date_order[lo:hi]
+
+    def amounts(self, positions=None) -> np.ndarray:
+        """float amounts (NaN where missing), for all rows or `positions`."""
+        if positions is None:
+            return self._amounts
+        return self._amounts[positions]
+
+    def category_words(self, categories=None) -> set:
+        """Single words that name one of `categories` (default: any)."""
+        return {
+            word for word, name in self._category_words.items()
+            if categories is None or name in categories
+        }
+
+    def rows_in_amount_range(self, low=None, high=None) -> np.ndarray:
+        """Rows with low <= amount <= high."""
+        lo = np.searchsorted(self._sorted_amounts, low, side="left") if low is not None else 0
+        hi = (
+            np.searchsorted(self._sorted_amounts, high, side="right")
+            if high is not None
+            else np.count_nonzero(~np.isnan(self._sorted_amounts))
+        )
+        return self._amount_order[lo:hi]
+
+    # ----------------------------
+    # Question Parsing
+    # ----------------------------
+
+    def _unique_category_words(self) -> dict:
+        """Single words that name exactly one category, e.g. "fuel", "rent"."""
+        owners = {}
+        for name in self.categories:
+            for word in _WORD_RE.findall(name.lower()):
+                if len(word) < 4:
+                    continue
+                # Also accept the singular: "groceries" -> "grocery"
+                forms = {word}
+                if word.endswith("ies"):
+                    forms.add(word[:-3] + "y")
+                elif word.endswith("s") and not word.endswith("ss"):
+                    forms.add(word[:-1])
+                for form in forms:
+                    owners.setdefault(form, set()).add(name)
+        return {word: names.pop() for word, names in owners.items() if len(names) == 1}
+
+    def parse_filters(self, question: str) -> dict:
+        """
+        Categories, merchant tokens, date window and amount range
+        mentioned in `question`. Relative periods ("last week") are
+        anchored on the latest transaction date, not today.
+        """
+        text = question.lower()
+        words = set(_WORD_RE.findall(text))
+
+        categories = [name for name in self.categories if name.lower() in text]
+        categories += [
+            name for word, name in self._category_words.items()
+            if word in words and name not in categories
+        ]
+
+        category_words = {w for name in categories for w in _WORD_RE.findall(name.lower())}
+        mentioned = sorted(
+            token for token in set(normalize_description(text).split())
+            if token in self.tokens
+            and token not in STOPWORDS
+            and token not in MONTH_NAMES
+            and token not in category_words
+        )
+        # Tokens on most rows ("upi", "neft") narrow little; kept apart
+        # so callers that need exact answers can still apply them
+        merchants = [t for t in mentioned if self.token_share(t) <= MERCHANT_TOKEN_MAX_SHARE]
+        broad = [t for t in mentioned if t not in merchants]
+
+        start, end = self._date_window(text)
+        low, high = self._amount_range(text)
+
+        return {
+            "categories": categories,
+            "merchants": merchants,
+            "broad_merchants": broad,
+            "start": start,
+            "end": end,
+            "min_amount": low,
+            "max_amount": high
+        }
+
+    def _date_window(self, text: str):
+        anchor = self.latest_date
+        if anchor is None:
+            return None, None
+        today = anchor.normalize()
+
+        m = _LAST_N_DAYS_RE.search(text)
+        if m:
+            return today - pd.Timedelta(days=int(m.group(1)) - 1), today + pd.Timedelta(days=1)
+        if "yesterday" in text:
+            return today - pd.Timedelta(days=1), today
+        if "today" in text:
+            return today, today + pd.Timedelta(days=1)
+        if "last week" in text or "past week" in text:
+            return today - pd.Timedelta(days=6), today + pd.Timedelta(days=1)
+        if "this week" in text:
+            monday = today - pd.Timedelta(days=today.weekday())
+            return monday, today + pd.Timedelta(days=1)
+        if "this month" in text:
+            return today.replace(day=1), today + pd.Timedelta(days=1)
+        if "last month" in text:
+            first = today.replace(day=1)
+            return first - pd.DateOffset(months=1), first
+
+        for m in _MONTH_RE.finditer(text):
+            # "May I ..." is a question, not a month
+            if m.group(1) == "may" and m.start() == 0 and not m.group(2):
+                continue
+            month = MONTH_NAMES[m.group(1)]
+            year = int(m.group(2)) if m.group(2) else self._latest_year_with(month)
+            start = pd.Timestamp(year=year, month=month, day=1)
+            return start, start + pd.DateOffset(months=1)
+
+        m = _YEAR_RE.search(text)
+        if m:
+            year = int(m.group(1))
+            return pd.Timestamp(year=year, month=1, day=1), pd.Timestamp(year=year + 1, month=1, day=1)
+
+        return None, None
+
+    def _latest_year_with(self, month: int) -> int:
+        dates = pd.DatetimeIndex(self._sorted_dates[: self._valid_dates])
+        years = dates.year[dates.month == month]
+        return int(years.max()) if len(years) else self.latest_date.year
+
+    @staticmethod
+    def _amount_range(text: str):
+        m = _BETWEEN_RE.search(text)
+        if m:
+            a, b = sorted((_to_amount(m.group(1)), _to_amount(m.group(2))))
+            return a, b
+
+        above = _ABOVE_RE.search(text)
+        below = _BELOW_RE.search(text)
+        return (
+            _to_amount(above.group(1)) if above else None,
+            _to_amount(below.group(1)) if below else None
+        )
+
+    # ----------------------------
+    # Selection
+    # ----------------------------
+
+    def select(self, filters: dict, include_broad: bool = False) -> np.ndarray:
+        """
+        Row positions matching the filters: any named category or
+        merchant, within the date window and amount range. With
+        `include_broad`, rows must also contain every broad token
+        (e.g. "upi"). None when no filter applies.
+        """
+        selected = None
+
+        if filters["categories"] or filters["merchants"]:
+            selected = np.union1d(
+                self.rows_for_categories(filters["categories"]),
+                self.rows_for_tokens(filters["merchants"])
+            )
+
+        if include_broad:
+            for token in filters["broad_merchants"]:
+                rows = self.rows_for_tokens([token])
+                selected = rows if selected is None else np.intersect1d(selected, rows)
+
+        if filters["start"] is not None or filters["end"] is not None:
+            rows = self.rows_in_date_range(filters["start"], filters["end"])
+            selected = rows if selected is None else np.intersect1d(selected, rows)
+
+        if filters["min_amount"] is not None or filters["max_amount"] is not None:
+            rows = self.rows_in_amount_range(filters["min_amount"], filters["max_amount"])
+            selected = rows if selected is None else np.intersect1d(selected, rows)
+
+        return selected
+
+
+# ----------------------------
+# Session Cache
+# ----------------------------
+
+def get_transaction_index(state: dict, df: pd.DataFrame) -> TransactionIndex:
+    """The session's index for `df`, rebuilt only when the frame changes."""
+    index = state.get("chat_index")
+    if index is None or index.df is not df:
+        index = TransactionIndex(df)
+        state["chat_index"] = index
+    return index
+
+
+# ----------------------------
+# Budgeted Context
+# ----------------------------
+
+def _describe_filters(filters: dict) -> dict:
+    described = {}
+    for key in ("categories", "merchants"):
+        if filters[key]:
+            described[key] = filters[key]
+    if filters["start"] is not None:
+        described["from"] = filters["start"].strftime("%Y-%m-%d")
+    if filters["end"] is not None:
+        described["before"] = filters["end"].strftime("%Y-%m-%d")
+    for key in ("min_amount", "max_amount"):
+        if filters[key] is not None:
+            described[key] = filters[key]
+    return described
+
+
+def _row_records(df: pd.DataFrame, positions) -> list:
+    rows = df.iloc[positions][CHAT_ROW_COLUMNS]
+    if pd.api.types.is_datetime64_any_dtype(rows["date"]):
+        rows = rows.assign(date=rows["date"].dt.strftime("%Y-%m-%d"))
+    return rows.astype(object).where(rows.notna(), None).to_dict(orient="records")
+
+
+def _matched_summary(index: TransactionIndex, positions) -> dict:
+    amounts = index.amounts(positions)
+    dates = index._dates[positions]
+    dates = dates[~np.isnat(dates)]
+    if not len(positions):
+        return {"count": 0}
+
+    return {
+        "count": int(len(positions)),
+        "total_amount": round(float(np.nansum(amounts)), 2),
+        "max_amount": round(float(np.nanmax(amounts)), 2) if not np.isnan(amounts).all() else None,
+        "min_amount": round(float(np.nanmin(amounts)), 2) if not np.isnan(amounts).all() else None,
+        "first_date": pd.Timestamp(dates.min()).strftime("%Y-%m-%d") if len(dates) else None,
+        "last_date": pd.Timestamp(dates.max()).strftime("%Y-%m-%d") if len(dates) else None
+    }
+
+
+@traced("retrieval.context")
+def build_chat_context(
+    index: TransactionIndex,
+    question: str,
+    token_budget: int = CHAT_CONTEXT_TOKEN_BUDGET
+) -> dict:
+    """
+    Aggregates plus the transaction rows most relevant to `question`,
+    trimmed so the whole block fits in roughly `token_budget` tokens.
+
+    Rows matching the question's filters are ranked by amount when it
+    asks for the largest/smallest, otherwise most recent first; with no
+    filters the most recent rows are used.
+    """
+    filters = index.parse_filters(question)
+    selected = index.select(filters)
+    words = set(_WORD_RE.findall(question.lower()))
+
+    context = {"summary": index.aggregates}
+
+    if selected is None:
+        # Newest first
+        candidates = index._date_order[: index._valid_dates][::-1]
+    else:
+        context["filters"] = _describe_filters(filters)
+        context["matched"] = _matched_summary(index, selected)
+        candidates = selected[np.argsort(index._dates[selected], kind="stable")[::-1]]
+
+    if words & {"largest", "biggest", "highest", "expensive", "top"}:
+        candidates = candidates[np.argsort(-np.nan_to_num(index.amounts(candidates), nan=-np.inf), kind="stable")]
+    elif words & {"smallest", "lowest", "cheapest"}:
+        candidates = candidates[np.argsort(np.nan_to_num(index.amounts(candidates), nan=np.inf), kind="stable")]
+
+    # Per-category / per-month totals cost a fixed share of the budget;
+    # drop the monthly detail first if they alone overflow it
+    remaining = token_budget - estimate_tokens(context)
+    if remaining < 0:
+        context["summary"] = {k: v for k, v in index.aggregates.items() if k != "monthly_totals"}
+        remaining = token_budget - estimate_tokens(context)
+
+    rows = []
+    # A row is ~25 tokens; serialize a bounded candidate window only
+    window = _row_records(index.df, candidates[: max(remaining // 20, 0)])
+    for record in window:
+        cost = estimate_tokens(record)
+        if cost > remaining:
+            break
+        rows.append(record)
+        remaining -= cost
+
+    context["rows"] = rows
+    context["rows_omitted"] = int(len(candidates) - len(rows))
+    return context
@@ -0,0 +1,88 @@
+# agents/rollup.py
+
+import os
+import pandas as pd
+
+from agents.ingestion import parse_statement_dates, ensure_transaction_nature
+from agents.tracing import traced
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+ROLLUP_COLUMNS = ["month", "category", "nature", "total_amount", "txn_count", "max_amount"]
+
+TRANSFER_CATEGORIES = ["Peer Transfer", "Self Transfer"]
+
+# Months of history used for "monthly" estimates in goal planning
+ROLLUP_LOOKBACK_MONTHS = int(os.getenv("ROLLUP_LOOKBACK_MONTHS", "6"))
+
+
+# ----------------------------
+# Build Rollup from Transactions
+# ----------------------------
+
+@traced("rollup.compute")
+def compute_monthly_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate transactions into (month, category, nature) rows with
+    sum, count and max of amount. Rows without a parseable date are
+    left out.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    ensure_transaction_nature(df)
+
+    frame = pd.DataFrame({
+        "month": parse_statement_dates(df["date"]).dt.to_period("M").dt.to_timestamp(),
+        "category": df["category"].fillna("Others"),
+        "nature": df["transaction_nature"],
+        "amount": pd.to_numeric(df["amount"], errors="coerce")
+    }).dropna(subset=["month", "amount"])
+
+    rollup = (
+        frame.groupby(["month", "category", "nature"], observed=True)["amount"]
+        .agg(total_amount="sum", txn_count="count", max_amount="max")
+        .reset_index()
+    )
+    return rollup[ROLLUP_COLUMNS]
+
+
+# ----------------------------
+# Read Paths
+# ----------------------------
+
+def monthly_totals(rollup: pd.DataFrame, lookback_months: int = None) -> pd.DataFrame:
+    """
+    Per-month expense (excluding transfers) and income, indexed by
+    month, optionally limited to the most recent `lookback_months`.
+    """
+    if rollup is None or rollup.empty:
+        return pd.DataFrame(columns=["expense", "income"])
+
+    is_expense = (rollup["nature"] == "Expense") & (~rollup["category"].isin(TRANSFER_CATEGORIES))
+    is_income = rollup["nature"] == "Income"
+
+    totals = pd.DataFrame({
+        "month": rollup["month"],
+        "expense": rollup["total_amount"].where(is_expense, 0.0),
+        "income": rollup["total_amount"].where(is_income, 0.0)
+    }).groupby("month").sum().sort_index()
+
+    if lookback_months:
+        totals = totals.tail(lookback_months)
+    return totals
+
+
+def monthly_averages(rollup: pd.DataFrame, lookback_months: int = ROLLUP_LOOKBACK_MONTHS) -> dict:
+    totals = monthly_totals(rollup, lookback_months)
+    if totals.empty:
+        return {"months": 0, "monthly_expense": 0.0, "monthly_income": 0.0}
+
+    return {
+        "months": int(len(totals)),
+        "monthly_expense": round(float(totals["expense"].mean()), 2),
+        "monthly_income": round(float(totals["income"].mean()), 2)
+    }
@@ -0,0 +1,267 @@
+# agents/tracing.py
+
+import os
+import json
+import atexit
+import time
+import uuid
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+
+# JSON-lines file finished spans are appended to; empty = keep in memory only
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+
+# Finished spans kept in memory for the metrics tool
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "1000"))
+
+# Metrics snapshot written here on exit; empty = no file
+METRICS_EXPORT_PATH = os.getenv("METRICS_EXPORT_PATH", "")
+
+
+# =====================================
+# Spans
+# =====================================
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed operation. Serialized in the OpenTelemetry span shape
+    (trace_id / span_id / parent_span_id, start / end in unix nanos,
+    attributes, status) so exported files can be loaded by OTel tooling.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id",
+                 "start_ns", "end_ns", "attributes", "status", "_started")
+
+    def __init__(self, name: str, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_span_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "attributes": self.attributes,
+            "status": self.status
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class SpanRecorder:
+    """Ring buffer of finished spans, optionally appended to a JSON-lines file."""
+
+    def __init__(self, path: str = TRACE_EXPORT_PATH, buffer_size: int = TRACE_BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._spans = []
+        self._lock = threading.Lock()
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def record(self, span: Span):
+        line = span.to_dict()
+        with self._lock:
+            self._spans.append(line)
+            if len(self._spans) > self.buffer_size:
+                del self._spans[: len(self._spans) - self.buffer_size]
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(line, default=str) + "\n")
+
+    def recent(self, limit: int = 100) -> list:
+        with self._lock:
+            return list(self._spans[-limit:])
+
+
+_recorder = SpanRecorder()
+
+
+def set_recorder(recorder: SpanRecorder):
+    """Swap the process-wide recorder (e.g. to export to another file)."""
+    global _recorder
+    _recorder = recorder
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a child of the current span. Also records the
+    duration in the `span_duration_ms` summary for `name`.
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+
+    current = Span(name, parent=_current_span.get(), attributes=attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "ERROR"
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        observe("span_duration_ms", current.duration_ms, span=name)
+        if current.status == "ERROR":
+            increment("span_errors_total", span=name)
+        _recorder.record(current)
+
+
+def current_span():
+    """The innermost open span (a no-op stand-in outside any span)."""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def traced(name: str = None):
+    """Decorator form of span() for sync and async functions."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def recent_spans(limit: int = 100) -> list:
+    return _recorder.recent(limit)
+
+
+# =====================================
+# Metrics (Prometheus-style)
+# =====================================
+
+_counters = {}
+_summaries = {}
+_metrics_lock = threading.Lock()
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def increment(name: str, value: float = 1, **labels):
+    key = _key(name, labels)
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels):
+    key = _key(name, labels)
+    with _metrics_lock:
+        s = _summaries.get(key)
+        if s is None:
+            s = _summaries[key] = {"count": 0, "sum": 0.0, "max": 0.0}
+        s["count"] += 1
+        s["sum"] += value
+        s["max"] = max(s["max"], value)
+
+
+def metrics_snapshot() -> dict:
+    """Counters and summaries as JSON-safe lists."""
+    with _metrics_lock:
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(_counters.items())
+            ],
+            "summaries": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": s["count"],
+                    "sum": round(s["sum"], 3),
+                    "max": round(s["max"], 3),
+                    "avg": round(s["sum"] / s["count"], 3) if s["count"] else 0.0
+                }
+                for (name, labels), s in sorted(_summaries.items())
+            ]
+        }
+
+
+def _label_text(labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{v}"' for k, v in labels)
+    return "{" + pairs + "}"
+
+
+def render_prometheus() -> str:
+    """Metrics in the Prometheus text exposition format."""
+    lines = []
+    with _metrics_lock:
+        for (name, labels), value in sorted(_counters.items()):
+            lines.append(f"hisaab_{name}{_label_text(labels)} {value}")
+        for (name, labels), s in sorted(_summaries.items()):
+            lines.append(f"hisaab_{name}_count{_label_text(labels)} {s['count']}")
+            lines.append(f"hisaab_{name}_sum{_label_text(labels)} {round(s['sum'], 3)}")
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(path: str, fmt: str = "json"):
+    """Write the current metrics to a local file for offline analysis."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if fmt == "prometheus":
+            f.write(render_prometheus())
+        else:
+            json.dump(metrics_snapshot(), f, indent=2)
+
+
+if METRICS_EXPORT_PATH:
+    atexit.register(
+        export_metrics,
+        METRICS_EXPORT_PATH,
+        "prometheus" if METRICS_EXPORT_PATH.endswith(".prom") else "json"
+    )
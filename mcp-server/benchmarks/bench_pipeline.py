@@ -0,0 +1,260 @@
+# benchmarks/bench_pipeline.py
+"""
+Offline benchmark of the agent pipeline.
+
+Runs ingestion → persist → expense → alerts → goal → CFO summary on
+synthetic statements with a stub Gemini model, a local stub Unstract
+endpoint and SQLite standing in for Postgres, and reports per-stage
+wall time, LLM calls / tokens and peak traced memory.
+
+    cd mcp-server
+    python -m benchmarks.bench_pipeline --sizes 100,10000
+    python -m benchmarks.bench_pipeline --sizes 1000000 --mode async --llm-latency 0.2
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+# Offline defaults; must be set before the agents read their config
+os.environ.setdefault("LLM_RATE_LIMIT_RPM", "0")
+os.environ.setdefault("LLM_RESPONSE_CACHE_ENABLED", "0")
+os.environ.setdefault("CATEGORY_CACHE_PATH", ":memory:")
+os.environ.setdefault("LOCAL_PDF_PARSER_ENABLED", "0")
+
+from agents import category_cache, ingestion
+from agents.llm import LLMGateway, set_gateway
+from agents.ingestion import run_ingestion, arun_ingestion
+from agents.expense import run_expense_analysis, arun_expense_analysis
+from agents.alerts import run_alerts, arun_alerts
+from agents.goal import run_goal_planner, arun_goal_planner
+from agents.cfo import run_cfo_summary, arun_cfo_summary
+from agents.rollup import compute_monthly_rollup
+from session import new_session
+from server import _copy_rows
+
+from benchmarks.stubs import StubGenerativeModel, StubUnstractServer
+from benchmarks.synthetic import generate_statement
+
+
+# ----------------------------
+# SQLite Stand-in for Postgres
+# ----------------------------
+
+class SQLiteStore:
+    """
+    `transactions` and `monthly_category_rollup` with the same keys and
+    conflict rules as database.sql, fed by the server's COPY row builder.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                upload_id TEXT,
+                date TEXT,
+                description TEXT,
+                amount REAL,
+                transaction_type TEXT,
+                category TEXT,
+                raw_json TEXT,
+                fingerprint TEXT,
+                UNIQUE (user_id, fingerprint)
+            );
+
+            CREATE TABLE IF NOT EXISTS monthly_category_rollup (
+                user_id TEXT NOT NULL,
+                month TEXT NOT NULL,
+                category TEXT NOT NULL,
+                nature TEXT NOT NULL,
+                total_amount REAL NOT NULL,
+                txn_count INTEGER NOT NULL,
+                max_amount REAL,
+                PRIMARY KEY (user_id, month, category, nature)
+            );
+            """
+        )
+
+    def insert_transactions(self, user_id, upload_id, df) -> int:
+        rows = (
+            (*row[:2], row[2] and row[2].isoformat(), *row[3:])
+            for row in _copy_rows(user_id, upload_id, df)
+        )
+        before = self.conn.total_changes
+        self.conn.executemany(
+            """
+            INSERT OR IGNORE INTO transactions
+            (user_id, upload_id, date, description, amount,
+             transaction_type, category, raw_json, fingerprint)
+            VALUES (?,?,?,?,?,?,?,?,?)
+            """,
+            rows
+        )
+        return self.conn.total_changes - before
+
+    def upsert_rollup(self, user_id, rollup):
+        self.conn.executemany(
+            """
+            INSERT INTO monthly_category_rollup
+            (user_id, month, category, nature, total_amount, txn_count, max_amount)
+            VALUES (?,?,?,?,?,?,?)
+            ON CONFLICT (user_id, month, category, nature) DO UPDATE SET
+                total_amount = total_amount + excluded.total_amount,
+                txn_count = txn_count + excluded.txn_count,
+                max_amount = MAX(max_amount, excluded.max_amount)
+            """,
+            [
+                (user_id, r.month.strftime("%Y-%m-%d"), r.category, r.nature,
+                 float(r.total_amount), int(r.txn_count), float(r.max_amount))
+                for r in rollup.itertuples(index=False)
+            ]
+        )
+        self.conn.commit()
+
+
+# ----------------------------
+# Stage Measurement
+# ----------------------------
+
+def measure(stage: str, model: StubGenerativeModel, gateway: LLMGateway, fn):
+    calls_before = model.calls
+    tokens_before = _total_tokens(gateway)
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    started = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - started
+
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    return result, {
+        "stage": stage,
+        "wall_s": round(wall, 4),
+        "llm_calls": model.calls - calls_before,
+        "llm_tokens": _total_tokens(gateway) - tokens_before,
+        "peak_mb": round(max(peak, 0) / 2**20, 2)
+    }
+
+
+def _total_tokens(gateway: LLMGateway) -> int:
+    return sum(
+        s["prompt_tokens"] + s["output_tokens"]
+        for s in gateway.stats().values()
+    )
+
+
+# ----------------------------
+# One Pipeline Run
+# ----------------------------
+
+def run_pipeline(rows: int, args, unstract: StubUnstractServer, pdf_path: str) -> list:
+    model = StubGenerativeModel(latency=args.llm_latency)
+    gateway = LLMGateway(model=model, model_name="stub", response_cache=None)
+    set_gateway(gateway)
+
+    # Fresh merchant cache per run so sizes are comparable
+    category_cache._cache = None
+
+    statement = generate_statement(rows, seed=args.seed)
+    unstract.set_transactions(statement.to_dict(orient="records"))
+    del statement
+
+    store = SQLiteStore(args.sqlite)
+    state = new_session("bench-user")
+    use_async = args.mode == "async"
+
+    def call(sync_fn, async_fn, *a):
+        if use_async:
+            return lambda: asyncio.run(async_fn(state, *a))
+        return lambda: sync_fn(state, *a)
+
+    def persist():
+        inserted = store.insert_transactions("bench-user", "bench-upload", df)
+        store.upsert_rollup("bench-user", compute_monthly_rollup(df))
+        return inserted
+
+    report = []
+
+    df, r = measure("ingestion", model, gateway, call(run_ingestion, arun_ingestion, pdf_path))
+    report.append(r)
+    state["current_transactions"] = df
+
+    _, r = measure("persist", model, gateway, persist)
+    report.append(r)
+    state["monthly_rollup"] = compute_monthly_rollup(df)
+
+    for stage, sync_fn, async_fn, extra in [
+        ("expense", run_expense_analysis, arun_expense_analysis, ()),
+        ("alerts", run_alerts, arun_alerts, ()),
+        ("goal", run_goal_planner, arun_goal_planner, (500000, "Emergency fund", 12)),
+        ("cfo", run_cfo_summary, arun_cfo_summary, ())
+    ]:
+        _, r = measure(stage, model, gateway, call(sync_fn, async_fn, *extra))
+        report.append(r)
+
+    for r in report:
+        r["rows"] = rows
+        r["mode"] = args.mode
+    return report
+
+
+def print_report(report: list):
+    header = f"{'rows':>9} {'stage':<10} {'wall_s':>9} {'llm_calls':>10} {'llm_tokens':>11} {'peak_mb':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in report:
+        print(
+            f"{r['rows']:>9} {r['stage']:<10} {r['wall_s']:>9.4f} "
+            f"{r['llm_calls']:>10} {r['llm_tokens']:>11} {r['peak_mb']:>9.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,10000", help="comma-separated statement sizes (e.g. 100,10000,1000000)")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per stub LLM call")
+    parser.add_argument("--unstract-latency", type=float, default=0.0, help="seconds per stub Unstract call")
+    parser.add_argument("--sqlite", default=":memory:", help="SQLite file for the DB stand-in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    # Ingestion only needs a readable file; the stub ignores its contents
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(b"%PDF-1.4 benchmark placeholder\n")
+        pdf_path = f.name
+
+    tracemalloc.start()
+    report = []
+    try:
+        # Agents log progress with print(); keep the report readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            with StubUnstractServer(latency=args.unstract_latency) as unstract:
+                ingestion.UNSTRACT_URL = unstract.url
+                for rows in sizes:
+                    report.extend(run_pipeline(rows, args, unstract, pdf_path))
+    finally:
+        tracemalloc.stop()
+        os.unlink(pdf_path)
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
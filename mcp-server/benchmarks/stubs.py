@@ -0,0 +1,193 @@
+# benchmarks/stubs.py
+
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from agents.ingestion import CATEGORIES
+
+
+# ----------------------------
+# Fake Gemini Responses
+# ----------------------------
+
+class StubUsage:
+    def __init__(self, prompt: str, text: str):
+        # Rough 4-characters-per-token estimate
+        self.prompt_token_count = len(prompt) // 4
+        self.candidates_token_count = len(text) // 4
+
+
+class StubResponse:
+    """
+    Looks like a GenerateContentResponse: `.text`, `.usage_metadata`,
+    and iterable (sync or async) as stream chunks.
+    """
+
+    def __init__(self, text: str, prompt: str = "", usage=True):
+        self.text = text
+        self.usage_metadata = StubUsage(prompt, text) if usage else None
+
+    def _chunks(self):
+        lines = self.text.splitlines(keepends=True) or [self.text]
+        return [StubResponse(line, usage=False) for line in lines]
+
+    def __iter__(self):
+        return iter(self._chunks())
+
+    async def __aiter__(self):
+        for chunk in self._chunks():
+            yield chunk
+
+
+def _stable_category(description: str) -> str:
+    digest = hashlib.md5(description.encode("utf-8")).digest()
+    return CATEGORIES[digest[0] % len(CATEGORIES)]
+
+
+_JSON_BLOCK_RE = re.compile(r"Transactions \(JSON\):\s*(\[.*?\])\s*\n", re.S)
+_ALERTS_BLOCK_RE = re.compile(r"Alerts \(JSON\):\s*(\[.*?\])\s*\n", re.S)
+
+
+def default_responder(prompt: str) -> str:
+    """
+    Well-formed canned output for each agent prompt: batch
+    categorization, single categorization, batched alert
+    recommendations, the structured CFO summary, and line-per-item
+    text for everything else.
+    """
+    batch = _JSON_BLOCK_RE.search(prompt)
+    if batch and "transaction classifier" in prompt:
+        items = json.loads(batch.group(1))
+        return json.dumps([
+            {"index": item["index"], "category": _stable_category(item["description"])}
+            for item in items
+        ])
+
+    if "Transaction description:" in prompt:
+        return _stable_category(prompt)
+
+    alerts = _ALERTS_BLOCK_RE.search(prompt)
+    if alerts:
+        return json.dumps({
+            alert["alert_id"]: [
+                f"Cap {alert['type']} spending next month.",
+                f"Review the transactions behind {alert['alert_id']} weekly."
+            ]
+            for alert in json.loads(alerts.group(1))
+        })
+
+    if '"next_month_action_plan"' in prompt:
+        return json.dumps({
+            "executive_summary": "Stub summary: spending is steady and the goal is on track.",
+            "next_month_action_plan": [
+                f"Move Rupees {i * 500} into savings on payday." for i in range(1, 6)
+            ]
+        })
+
+    return "\n".join(
+        f"Stub line {i}: move Rupees {i * 500} into savings this month."
+        for i in range(1, 6)
+    )
+
+
+# =====================================
+# Stub GenerativeModel
+# =====================================
+
+class StubGenerativeModel:
+    """
+    Drop-in for genai.GenerativeModel. Every call sleeps `latency`
+    seconds and answers from `responses` — a list of
+    (substring, text-or-callable) pairs checked in order — falling
+    back to `default_responder`. Extra kwargs (request_options,
+    generation_config, stream, ...) are accepted and ignored.
+    """
+
+    def __init__(self, latency: float = 0.0, responses=None):
+        self.latency = latency
+        self.responses = list(responses or [])
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, prompt) -> StubResponse:
+        prompt = str(prompt)
+        with self._lock:
+            self.calls += 1
+
+        for needle, reply in self.responses:
+            if needle in prompt:
+                text = reply(prompt) if callable(reply) else reply
+                return StubResponse(text, prompt)
+        return StubResponse(default_responder(prompt), prompt)
+
+    def generate_content(self, prompt, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+
+# =====================================
+# Stub Unstract Endpoint
+# =====================================
+
+class StubUnstractServer:
+    """
+    Local HTTP server answering any POST with the Unstract response
+    envelope around `transactions` (a list of row dicts).
+    Point agents.ingestion.UNSTRACT_URL at `.url`.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self._body = b"{}"
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(stub._body)))
+                self.end_headers()
+                self.wfile.write(stub._body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    def set_transactions(self, transactions: list):
+        output = "```json\n" + json.dumps(transactions) + "\n```"
+        self._body = json.dumps({
+            "message": {"result": [{"result": {"output": {"Hisaab_1": output}}}]}
+        }).encode("utf-8")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
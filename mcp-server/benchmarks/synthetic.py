@@ -0,0 +1,69 @@
+# benchmarks/synthetic.py
+
+import numpy as np
+import pandas as pd
+
+
+# ----------------------------
+# Merchant Vocabulary
+# ----------------------------
+
+# Mix of names the rule tier knows and names only the LLM can place
+KNOWN_MERCHANTS = [
+    "SWIGGY", "ZOMATO", "BLINKIT", "ZEPTO", "BIGBASKET", "AMAZON", "FLIPKART",
+    "MYNTRA", "UBER", "OLA CABS", "RAPIDO", "IRCTC", "INDIGO", "NETFLIX",
+    "SPOTIFY", "BOOKMYSHOW", "JIO PREPAID", "AIRTEL", "BESCOM", "TATA POWER",
+    "INDIAN OIL", "HPCL", "APOLLO PHARMACY", "PHARMEASY", "ZERODHA", "GROWW",
+    "LIC OF INDIA", "NOBROKER", "UDEMY", "ATM CASH WDL"
+]
+
+UNKNOWN_MERCHANTS = [
+    f"{first} {last}"
+    for first in ["SHREE", "NEW", "OM", "SAI", "RAJ", "GANESH", "LAXMI", "JAI"]
+    for last in ["STORES", "TRADERS", "ENTERPRISES", "KIRANA", "MEDICAL", "CAFE", "BAZAR", "AGENCY"]
+]
+
+NARRATION_FORMATS = [
+    "UPI/{merchant}/{ref}/{handle}@ybl",
+    "POS {ref} {merchant}",
+    "Paid to {merchant}",
+    "NEFT-{ref}-{merchant}"
+]
+
+
+def generate_statement(rows: int, seed: int = 0, months: int = 6) -> pd.DataFrame:
+    """
+    Synthetic statement with the Unstract columns (date, description,
+    amount, transaction_type). Narrations carry reference numbers,
+    so most descriptions are unique, as in real bank exports.
+    """
+    rng = np.random.default_rng(seed)
+
+    merchants = np.array(KNOWN_MERCHANTS + UNKNOWN_MERCHANTS)
+    merchant = merchants[rng.integers(0, len(merchants), rows)]
+    fmt = np.array(NARRATION_FORMATS)[rng.integers(0, len(NARRATION_FORMATS), rows)]
+    refs = rng.integers(10**11, 10**12, rows)
+
+    descriptions = [
+        f.format(merchant=m, ref=r, handle=m.split()[0].lower())
+        for f, m, r in zip(fmt, merchant, refs)
+    ]
+
+    start = pd.Timestamp("2025-01-01")
+    days = rng.integers(0, months * 30, rows)
+    dates = (start + pd.to_timedelta(days, unit="D")).strftime("%d/%m/%Y")
+
+    is_credit = rng.random(rows) < 0.1
+    amounts = np.where(
+        is_credit,
+        rng.lognormal(9.5, 0.8, rows),
+        rng.lognormal(5.5, 1.2, rows)
+    ).round(2)
+
+    df = pd.DataFrame({
+        "date": dates,
+        "description": descriptions,
+        "amount": amounts,
+        "transaction_type": np.where(is_credit, "Credit", "Debit")
+    })
+    return df.sort_values("date", kind="stable").reset_index(drop=True)
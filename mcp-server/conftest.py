@@ -0,0 +1,10 @@
+# conftest.py
+
+import os
+
+# Offline defaults; must be set before the agents read their config
+os.environ.setdefault("LLM_RATE_LIMIT_RPM", "0")
+os.environ.setdefault("LLM_RESPONSE_CACHE_ENABLED", "0")
+os.environ.setdefault("CATEGORY_CACHE_PATH", ":memory:")
+os.environ.setdefault("LOCAL_PDF_PARSER_ENABLED", "0")
+os.environ.setdefault("TRACING_ENABLED", "0")
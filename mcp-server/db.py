@@ -0,0 +1,161 @@
+# db.py
+
+import os
+import time
+import atexit
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+from dotenv import load_dotenv
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
+
+from agents.tracing import span, observe
+
+load_dotenv()
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+
+
+def _connection_kwargs():
+    return {
+        "host": os.getenv("DB_HOST"),
+        "port": os.getenv("DB_PORT"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "dbname": os.getenv("DB_DATABASE")
+    }
+
+
+# ----------------------------
+# Pool Wait-time Metrics
+# ----------------------------
+
+POOL_METRICS = {
+    "checkouts": 0,
+    "wait_ms_total": 0.0,
+    "wait_ms_max": 0.0
+}
+_metrics_lock = threading.Lock()
+
+
+def _record_wait(started: float, db_span=None):
+    waited_ms = (time.perf_counter() - started) * 1000
+    with _metrics_lock:
+        POOL_METRICS["checkouts"] += 1
+        POOL_METRICS["wait_ms_total"] += waited_ms
+        POOL_METRICS["wait_ms_max"] = max(POOL_METRICS["wait_ms_max"], waited_ms)
+
+    observe("db_pool_wait_ms", waited_ms)
+    if db_span is not None:
+        db_span.set(pool_wait_ms=round(waited_ms, 3))
+
+
+def pool_stats() -> dict:
+    checkouts = POOL_METRICS["checkouts"]
+    stats = {
+        "checkouts": checkouts,
+        "wait_ms_avg": round(POOL_METRICS["wait_ms_total"] / checkouts, 3) if checkouts else 0.0,
+        "wait_ms_max": round(POOL_METRICS["wait_ms_max"], 3)
+    }
+    if _pool is not None:
+        stats["sync_pool"] = _pool.get_stats()
+    if _async_pool is not None:
+        stats["async_pool"] = _async_pool.get_stats()
+    return stats
+
+
+# ----------------------------
+# Sync Pool
+# ----------------------------
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    kwargs=_connection_kwargs(),
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_idle=DB_POOL_MAX_IDLE,
+                    check=ConnectionPool.check_connection,
+                    name="hisaab-sync",
+                    open=True
+                )
+                atexit.register(_pool.close)
+    return _pool
+
+
+@contextmanager
+def get_conn():
+    """
+    Borrow a pooled connection. Like psycopg.connect() used as a
+    context manager, the transaction commits on success and rolls
+    back on error.
+    """
+    started = time.perf_counter()
+    with span("db.connection") as db_span:
+        with get_pool().connection() as conn:
+            _record_wait(started, db_span)
+            yield conn
+
+
+# ----------------------------
+# Async Pool
+# ----------------------------
+
+_async_pool = None
+_async_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    global _async_pool
+    if _async_pool is not None:
+        return _async_pool
+
+    async with _async_pool_lock:
+        if _async_pool is None:
+            pool = AsyncConnectionPool(
+                kwargs=_connection_kwargs(),
+                min_size=DB_POOL_MIN_SIZE,
+                max_size=DB_POOL_MAX_SIZE,
+                timeout=DB_POOL_TIMEOUT,
+                max_idle=DB_POOL_MAX_IDLE,
+                check=AsyncConnectionPool.check_connection,
+                name="hisaab-async",
+                open=False
+            )
+            await pool.open()
+            _async_pool = pool
+    return _async_pool
+
+
+@asynccontextmanager
+async def get_async_conn():
+    started = time.perf_counter()
+    with span("db.connection") as db_span:
+        pool = await get_async_pool()
+        async with pool.connection() as conn:
+            _record_wait(started, db_span)
+            yield conn
+
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
@@ -0,0 +1,105 @@
+# scheduler.py
+
+import time
+import asyncio
+
+from agents.tracing import span
+
+
+class SkippedTask(Exception):
+    """A task did not run because one of its dependencies failed."""
+
+
+# =====================================
+# Dependency-aware Task Graph
+# =====================================
+
+class TaskGraph:
+    """
+    Small DAG of async tasks. Each task starts as soon as all of its
+    dependencies have finished, so independent branches (e.g. several
+    LLM calls) overlap. A failed task skips its dependents but leaves
+    unrelated branches running.
+
+        graph = TaskGraph()
+        graph.add("expense", compute_expense)
+        graph.add("insights", generate_insights, deps=["expense"])
+        results, errors = await graph.run()
+
+    Tasks read their dependencies' outputs from `graph.results`.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.results = {}
+        self.errors = {}
+        self.timings_ms = {}
+
+    def add(self, name: str, fn, deps=()):
+        """`fn` is an async callable taking no arguments."""
+        if name in self._tasks:
+            raise ValueError(f"Task {name!r} already added")
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"Task {name!r} depends on unknown task {dep!r}")
+        self._tasks[name] = (fn, tuple(deps))
+
+    def __contains__(self, name):
+        return name in self._tasks
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def run(self, on_done=None):
+        """
+        Run every task. Returns (results, errors): results maps task
+        name to return value, errors maps name to a message for tasks
+        that failed or were skipped. `await on_done(name, result, error)`
+        is called as each task settles.
+        """
+        results = self.results
+        errors = self.errors
+        futures = {}
+
+        async def run_task(name):
+            fn, deps = self._tasks[name]
+            for dep in deps:
+                try:
+                    await futures[dep]
+                except Exception:
+                    raise SkippedTask(f"skipped: {dep} failed")
+
+            started = time.perf_counter()
+            with span(f"pipeline.{name}"):
+                result = await fn()
+            self.timings_ms[name] = round((time.perf_counter() - started) * 1000, 3)
+            results[name] = result
+            return result
+
+        async def settle(name):
+            error = None
+            try:
+                await futures[name]
+            except SkippedTask as e:
+                error = str(e)
+            except Exception as e:
+                print(f"Pipeline task {name} failed:", e)
+                error = f"{type(e).__name__}: {e}"
+
+            if error is not None:
+                errors[name] = error
+            if on_done is not None:
+                await on_done(name, results.get(name), error)
+
+        # Tasks were added in dependency order, so every future a task
+        # awaits already exists when it starts
+        for name in self._tasks:
+            futures[name] = asyncio.ensure_future(run_task(name))
+
+        try:
+            await asyncio.gather(*(settle(name) for name in self._tasks))
+        finally:
+            for future in futures.values():
+                future.cancel()
+
+        return results, errors
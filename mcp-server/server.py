@@ -1,117 +1,592 @@
 # server.py
 
-import os
 import uuid
+import asyncio
 import json
 import pandas as pd
-import psycopg
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
+
+load_dotenv()
+
+from mcp.server.fastmcp import FastMCP, Context
 from agents.milestone import MilestoneAdjustmentAgent
 from agents.chatbot import FinanceChatAgent
-import google.generativeai as genai
+from agents.llm import get_llm, get_gateway
+from agents.tracing import (
+    traced,
+    metrics_snapshot,
+    render_prometheus,
+    recent_spans
+)
 
-from agents.ingestion import run_ingestion
-from agents.expense import run_expense_analysis
-from agents.goal import run_goal_planner
-from agents.alerts import run_alerts
-from agents.cfo import run_cfo_summary
-
-load_dotenv()
+from agents.ingestion import (
+    arun_ingestion,
+    aparse_statement_pdf,
+    statement_hash,
+    drop_known_transactions,
+    aiter_categorized_chunks,
+    INGESTION_CHUNK_SIZE,
+    INGESTION_QUEUE_CHUNKS,
+    ensure_transaction_nature,
+    normalize_transactions,
+    CATEGORIES
+)
+from agents.category_cache import get_category_cache
+from agents.expense import arun_expense_analysis, ExpenseAnalysisAgent
+from agents.goal import arun_goal_planner, GoalPlanningAgent
+from agents.alerts import arun_alerts, AlertRecommendationAgent
+from agents.cfo import arun_cfo_summary, CFOSummaryAgent
+from agents.rollup import compute_monthly_rollup, ROLLUP_COLUMNS
+from db import get_conn, get_async_conn, pool_stats
+from session import SessionStore, new_session
+from scheduler import TaskGraph
 
 mcp = FastMCP("Autonomous CFO")
 
 # ----------------------------
-# Shared MCP State (Session)
+# DB Helpers
 # ----------------------------
-STATE = {
-    "user_id": None,
-    "current_upload_id": None,
 
-    "current_transactions": None,
-    "current_expense_analysis": None,
-    "current_alerts": None,
+@traced("db.upsert_monthly_rollup")
+async def aupsert_monthly_rollup(conn, user_id, rollup):
+    """
+    Fold an upload's (month, category, nature) aggregates into
+    monthly_category_rollup.
+    """
+    if rollup.empty:
+        return
 
-    "all_transactions": None,
-    "goal_plan": None
-}
+    async with conn.cursor() as cur:
+        await cur.executemany(
+            """
+            INSERT INTO monthly_category_rollup
+            (user_id, month, category, nature, total_amount, txn_count, max_amount)
+            VALUES (%s,%s,%s,%s,%s,%s,%s)
+            ON CONFLICT (user_id, month, category, nature) DO UPDATE SET
+                total_amount = monthly_category_rollup.total_amount + EXCLUDED.total_amount,
+                txn_count = monthly_category_rollup.txn_count + EXCLUDED.txn_count,
+                max_amount = GREATEST(monthly_category_rollup.max_amount, EXCLUDED.max_amount),
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            [
+                (
+                    user_id,
+                    r.month.date(),
+                    r.category,
+                    r.nature,
+                    float(r.total_amount),
+                    int(r.txn_count),
+                    float(r.max_amount)
+                )
+                for r in rollup.itertuples(index=False)
+            ]
+        )
+
+@traced("db.get_monthly_rollup")
+async def aget_monthly_rollup(state, user_id):
+    """
+    The user's monthly rollup, cached on the session until the
+    next ingest invalidates it.
+    """
+    if state.get("monthly_rollup") is None:
+        async with get_async_conn() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    SELECT month, category, nature, total_amount::float8,
+                           txn_count, max_amount::float8
+                    FROM monthly_category_rollup
+                    WHERE user_id = %s
+                    ORDER BY month
+                    """,
+                    (user_id,)
+                )
+                rows = await cur.fetchall()
+
+        rollup = pd.DataFrame(rows, columns=ROLLUP_COLUMNS)
+        rollup["month"] = pd.to_datetime(rollup["month"])
+        state["monthly_rollup"] = rollup
+    return state["monthly_rollup"]
+
+TRANSACTION_COLUMNS = ["date", "description", "amount", "transaction_type", "category"]
+
+# COPY lands in a per-connection staging table; the insert into
+# `transactions` then skips rows whose (user_id, fingerprint) exists
+STAGE_TRANSACTIONS_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS transactions_stage (
+    user_id UUID,
+    upload_id UUID,
+    date DATE,
+    description TEXT,
+    amount NUMERIC,
+    transaction_type TEXT,
+    category TEXT,
+    raw_json JSONB,
+    fingerprint TEXT
+) ON COMMIT DELETE ROWS
+"""
+
+COPY_STAGE_SQL = """
+COPY transactions_stage
+(user_id, upload_id, date, description, amount,
+ transaction_type, category, raw_json, fingerprint)
+FROM STDIN
+"""
+
+MERGE_STAGE_SQL = """
+INSERT INTO transactions
+(user_id, upload_id, date, description, amount,
+ transaction_type, category, raw_json, fingerprint)
+SELECT user_id, upload_id, date, description, amount,
+       transaction_type, category, raw_json, fingerprint
+FROM transactions_stage
+ON CONFLICT (user_id, fingerprint) DO NOTHING
+RETURNING fingerprint
+"""
+
+def _column_values(df, column):
+    """Column as a list of native Python values with NaN → None."""
+    if column not in df.columns:
+        return [None] * len(df)
+    series = df[column]
+    if pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.date
+    series = series.astype(object)
+    return series.where(series.notna(), None).tolist()
+
+def _copy_rows(user_id, upload_id, df):
+    """
+    Rows for COPY. Columns are extracted once and raw_json is
+    serialized for the whole frame in a single pass.
+    """
+    columns = [_column_values(df, c) for c in TRANSACTION_COLUMNS + ["fingerprint"]]
+    raw_json = df.to_json(
+        orient="records", lines=True, date_format="iso", force_ascii=False
+    ).splitlines()
+
+    for *values, fingerprint, raw in zip(*columns, raw_json):
+        yield (user_id, upload_id, *values, raw, fingerprint)
+
+@traced("db.insert_transactions")
+def insert_transactions(conn, user_id, upload_id, df):
+    """
+    Bulk-load an ingested DataFrame into `transactions` via COPY into
+    a staging table and INSERT ... ON CONFLICT DO NOTHING.
+    Returns the set of fingerprints actually inserted.
+    """
+    if df.empty:
+        return set()
+
+    with conn.cursor() as cur:
+        cur.execute(STAGE_TRANSACTIONS_SQL)
+        with cur.copy(COPY_STAGE_SQL) as copy:
+            for row in _copy_rows(user_id, upload_id, df):
+                copy.write_row(row)
+        cur.execute(MERGE_STAGE_SQL)
+        inserted = {r[0] for r in cur.fetchall()}
+        cur.execute("DELETE FROM transactions_stage")
+
+    return inserted
+
+@traced("db.insert_transactions")
+async def ainsert_transactions(conn, user_id, upload_id, df):
+    if df.empty:
+        return set()
+
+    async with conn.cursor() as cur:
+        await cur.execute(STAGE_TRANSACTIONS_SQL)
+        async with cur.copy(COPY_STAGE_SQL) as copy:
+            for row in _copy_rows(user_id, upload_id, df):
+                await copy.write_row(row)
+        await cur.execute(MERGE_STAGE_SQL)
+        inserted = {r[0] for r in await cur.fetchall()}
+        await cur.execute("DELETE FROM transactions_stage")
+
+    return inserted
+
+@traced("db.get_fingerprints")
+async def aget_fingerprints(state, user_id):
+    """
+    In-memory set of the user's stored transaction fingerprints, used
+    to drop already-ingested rows before categorization.
+    """
+    if state.get("fingerprints") is None:
+        async with get_async_conn() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    SELECT fingerprint FROM transactions
+                    WHERE user_id = %s AND fingerprint IS NOT NULL
+                    """,
+                    (user_id,)
+                )
+                state["fingerprints"] = {r[0] for r in await cur.fetchall()}
+    return state["fingerprints"]
+
+@traced("db.fetch_upload_frame")
+async def afetch_upload_frame(conn, user_id, upload_id):
+    """Rows already stored for one upload, in insert order."""
+    async with conn.cursor() as cur:
+        await cur.execute(
+            """
+            SELECT date, description, amount::float8, transaction_type, category
+            FROM transactions
+            WHERE user_id = %s AND upload_id = %s
+            ORDER BY id
+            """,
+            (user_id, upload_id)
+        )
+        rows = await cur.fetchall()
+    return normalize_transactions(pd.DataFrame(rows, columns=TRANSACTION_COLUMNS))
 
 # ----------------------------
-# DB Helpers
+# Ingestion Checkpoints
 # ----------------------------
 
-def get_conn():
-    return psycopg.connect(
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        dbname=os.getenv("DB_DATABASE")
-    )
+@traced("db.load_checkpoint")
+async def aload_checkpoint(user_id, upload_id):
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT parsed_rows, total_rows, rows_done, status
+                FROM ingestion_checkpoints
+                WHERE upload_id = %s AND user_id = %s
+                """,
+                (upload_id, user_id)
+            )
+            row = await cur.fetchone()
+
+    if row is None:
+        return None
+    return {
+        "parsed": normalize_transactions(pd.DataFrame(row[0])),
+        "total_rows": row[1],
+        "rows_done": row[2],
+        "status": row[3]
+    }
+
+async def afind_checkpoint_by_hash(user_id, content_hash):
+    """upload_id of an unfinished streaming upload of the same file."""
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT upload_id FROM ingestion_checkpoints
+                WHERE user_id = %s AND content_hash = %s AND status = 'running'
+                ORDER BY updated_at DESC
+                LIMIT 1
+                """,
+                (user_id, content_hash)
+            )
+            row = await cur.fetchone()
+    return str(row[0]) if row else None
+
+@traced("db.create_checkpoint")
+async def acreate_checkpoint(user_id, upload_id, pdf_path, df, content_hash=None):
+    """
+    Persist the parsed statement before any row is inserted, so a
+    resumed upload does not go back to Unstract.
+    """
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO ingestion_checkpoints
+                (upload_id, user_id, pdf_path, content_hash, parsed_rows, total_rows)
+                VALUES (%s,%s,%s,%s,%s,%s)
+                """,
+                (
+                    upload_id,
+                    user_id,
+                    pdf_path,
+                    content_hash,
+                    df.to_json(orient="records", date_format="iso", force_ascii=False),
+                    len(df)
+                )
+            )
+
+async def aadvance_checkpoint(conn, upload_id, rows_done, status="running"):
+    async with conn.cursor() as cur:
+        await cur.execute(
+            """
+            UPDATE ingestion_checkpoints
+            SET rows_done = %s, status = %s, updated_at = CURRENT_TIMESTAMP
+            WHERE upload_id = %s
+            """,
+            (rows_done, status, upload_id)
+        )
+
+# ----------------------------
+# Parsed-statement Cache
+# ----------------------------
+
+@traced("db.find_statement_upload")
+async def afind_statement_upload(user_id, content_hash):
+    """
+    The earlier upload of the same PDF bytes, if any:
+    {"upload_id", "transactions"} with the stored categorized rows.
+    """
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT upload_id, parsed_rows FROM statement_uploads
+                WHERE user_id = %s AND content_hash = %s
+                """,
+                (user_id, content_hash)
+            )
+            row = await cur.fetchone()
+
+    if row is None:
+        return None
+    return {
+        "upload_id": str(row[0]),
+        "transactions": ensure_transaction_nature(normalize_transactions(pd.DataFrame(row[1])))
+    }
+
+@traced("db.prune_statement_upload")
+async def aprune_statement_upload(user_id, content_hash):
+    """
+    Forget the earlier upload of this file if none of its transactions
+    are left (e.g. deleted through the API), so it is ingested again.
+    Returns True when an entry was removed.
+    """
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                DELETE FROM statement_uploads s
+                WHERE s.user_id = %s AND s.content_hash = %s
+                  AND NOT EXISTS (
+                      SELECT 1 FROM transactions t
+                      WHERE t.user_id = s.user_id AND t.upload_id = s.upload_id
+                  )
+                RETURNING upload_id
+                """,
+                (user_id, content_hash)
+            )
+            return await cur.fetchone() is not None
+
+def forget_deleted_rows(state):
+    """Drop session caches built from rows that have since been deleted."""
+    state["fingerprints"] = None
+    state["monthly_rollup"] = None
+
+@traced("db.claim_statement_upload")
+async def aclaim_statement_upload(conn, user_id, content_hash, upload_id, df):
+    """
+    Record `df` as the parsed output of this file. Returns False when
+    the file was already recorded (e.g. a concurrent duplicate upload),
+    in which case the caller must not insert its rows.
+    """
+    async with conn.cursor() as cur:
+        await cur.execute(
+            """
+            INSERT INTO statement_uploads
+            (user_id, content_hash, upload_id, parsed_rows, row_count)
+            VALUES (%s,%s,%s,%s,%s)
+            ON CONFLICT (user_id, content_hash) DO NOTHING
+            RETURNING upload_id
+            """,
+            (
+                user_id,
+                content_hash,
+                upload_id,
+                df.to_json(orient="records", date_format="iso", force_ascii=False),
+                len(df)
+            )
+        )
+        return await cur.fetchone() is not None
+
+def use_existing_upload(state, existing):
+    """Point the session at an already-ingested upload instead of re-inserting it."""
+    df = existing["transactions"]
+    state["current_upload_id"] = existing["upload_id"]
+    state["current_transactions"] = df
+    state["raw_transactions"] = df
+    state["categorized_transactions"] = df
+
+    print(f"Duplicate upload of {existing['upload_id']}; skipping ingest")
+    return {
+        "status": "ok",
+        "upload_id": existing["upload_id"],
+        "rows": len(df),
+        "duplicate": True
+    }
+
+@traced("db.seed_category_cache")
+def seed_category_cache(state, user_id):
+    """
+    Warm the merchant → category cache from the categories on the
+    user's stored transactions, once per session. Corrections saved
+    to transaction_corrections are not written back to transactions,
+    so they are not part of the seed. Entries are scoped to the user
+    so one user's labels never categorize another user's rows.
+    """
+    if state["category_cache_seeded"]:
+        return
 
-def fetch_all_transactions(user_id):
     with get_conn() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
-                SELECT date, description, amount, transaction_type, category
+                SELECT DISTINCT ON (description) description, category
                 FROM transactions
+                WHERE user_id = %s AND category = ANY(%s)
+                ORDER BY description, created_at DESC
+                """,
+                (user_id, CATEGORIES)
+            )
+            rows = cur.fetchall()
+
+    get_category_cache().put_many(rows, user_id=user_id)
+    state["category_cache_seeded"] = True
+
+# ----------------------------
+# Per-user MCP State (Sessions)
+# ----------------------------
+
+@traced("db.load_session")
+def load_session(user_id):
+    """
+    Rebuild a user's session from Postgres: the latest upload's
+    transactions, its expense analysis and alerts, and the latest goal.
+    """
+    session = new_session(user_id)
+
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT upload_id FROM transactions
+                WHERE user_id = %s AND upload_id IS NOT NULL
+                ORDER BY created_at DESC
+                LIMIT 1
+                """,
+                (user_id,)
+            )
+            row = cur.fetchone()
+            upload_id = str(row[0]) if row else None
+
+            if upload_id:
+                cur.execute(
+                    """
+                    SELECT date, description, amount, transaction_type, category
+                    FROM transactions
+                    WHERE user_id = %s AND upload_id = %s
+                    ORDER BY id
+                    """,
+                    (user_id, upload_id)
+                )
+                df = pd.DataFrame(
+                    cur.fetchall(),
+                    columns=["date", "description", "amount", "transaction_type", "category"]
+                )
+                normalize_transactions(df)
+                ensure_transaction_nature(df)
+
+                session["current_upload_id"] = upload_id
+                session["current_transactions"] = df
+                session["categorized_transactions"] = df
+
+                cur.execute(
+                    """
+                    SELECT summary FROM expense_analyses
+                    WHERE user_id = %s AND upload_id = %s
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                    """,
+                    (user_id, upload_id)
+                )
+                row = cur.fetchone()
+                if row:
+                    session["current_expense_analysis"] = row[0]
+                    session["expense_analysis"] = row[0]
+
+                cur.execute(
+                    """
+                    SELECT alert_type, severity, message, recommendations
+                    FROM alerts
+                    WHERE user_id = %s AND upload_id = %s
+                    ORDER BY id
+                    """,
+                    (user_id, upload_id)
+                )
+                alert_rows = cur.fetchall()
+                if alert_rows:
+                    result = {
+                        "alerts": [
+                            {
+                                "alert_id": f"A{i}",
+                                "type": r[0],
+                                "severity": r[1],
+                                "message": r[2],
+                                "recommendations": r[3]
+                            }
+                            for i, r in enumerate(alert_rows, start=1)
+                        ]
+                    }
+                    session["current_alerts"] = result
+                    session["alerts_and_recommendations"] = result
+
+            cur.execute(
+                """
+                SELECT plan FROM goals
                 WHERE user_id = %s
-                ORDER BY created_at
+                ORDER BY created_at DESC
+                LIMIT 1
                 """,
                 (user_id,)
             )
-            rows = cur.fetchall()
+            row = cur.fetchone()
+            if row:
+                session["goal_plan"] = row[0]
+
+    return session
 
-    # Convert to list of dicts for agents
-    return [
-        {
-            "date": r[0],
-            "description": r[1],
-            "amount": r[2],
-            "transaction_type": r[3],
-            "category": r[4]
-        }
-        for r in rows
-    ]
+SESSIONS = SessionStore(loader=load_session)
 
 # -------------------------------------------------
 # Tool 1: Upload & Ingest Statement
 # -------------------------------------------------
 
 @mcp.tool()
-def upload_statement(user_id: str, pdf_path: str):
+@traced("tool.upload_statement")
+async def upload_statement(user_id: str, pdf_path: str):
     upload_id = str(uuid.uuid4())
 
-    STATE["user_id"] = user_id
-    STATE["current_upload_id"] = upload_id
+    state = await asyncio.to_thread(SESSIONS.get, user_id)
 
-    df = run_ingestion(STATE, pdf_path)
+    content_hash = await asyncio.to_thread(statement_hash, pdf_path)
+    if await aprune_statement_upload(user_id, content_hash):
+        forget_deleted_rows(state)
+    existing = await afind_statement_upload(user_id, content_hash)
+    if existing is not None:
+        return use_existing_upload(state, existing)
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            for _, row in df.iterrows():
-                cur.execute(
-                    """
-                    INSERT INTO transactions
-                    (user_id, upload_id, date, description, amount,
-                     transaction_type, category, raw_json)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-                    """,
-                    (
-                        user_id,
-                        upload_id,
-                        row.get("date"),
-                        row.get("description"),
-                        row.get("amount"),
-                        row.get("transaction_type"),
-                        row.get("category"),
-                        json.dumps(row.to_dict())
-                    )
-                )
+    state["current_upload_id"] = upload_id
+
+    await asyncio.to_thread(seed_category_cache, state, user_id)
+    known = await aget_fingerprints(state, user_id)
+    df = await arun_ingestion(state, pdf_path, known_fingerprints=known)
+
+    async with get_async_conn() as conn:
+        if not await aclaim_statement_upload(conn, user_id, content_hash, upload_id, df):
+            # Same file finished ingesting while this one was parsing
+            existing = await afind_statement_upload(user_id, content_hash)
+            return use_existing_upload(state, existing)
+
+        inserted = await ainsert_transactions(conn, user_id, upload_id, df)
+        # Rows from an overlapping statement that raced past the pre-check
+        df = df[df["fingerprint"].isin(inserted)].reset_index(drop=True)
+        await aupsert_monthly_rollup(conn, user_id, compute_monthly_rollup(df))
 
-    STATE["current_transactions"] = df
-    STATE["all_transactions"] = fetch_all_transactions(user_id)
+    known.update(inserted)
+    state["current_transactions"] = df
+    state["raw_transactions"] = df
+    state["categorized_transactions"] = df
+    state["monthly_rollup"] = None
 
     return {
         "status": "ok",
@@ -119,77 +594,218 @@ def upload_statement(user_id: str, pdf_path: str):
         "rows": len(df)
     }
 
+@mcp.tool()
+@traced("tool.upload_statement_streaming")
+async def upload_statement_streaming(
+    user_id: str,
+    pdf_path: str,
+    upload_id: str = None,
+    chunk_size: int = INGESTION_CHUNK_SIZE,
+    ctx: Context = None
+):
+    """
+    Chunked variant of upload_statement for large statements.
+
+    Rows are categorized and inserted `chunk_size` at a time; each
+    chunk commits together with its checkpoint and is reported as an
+    MCP progress notification. Calling again with the same
+    `upload_id` after a failure resumes at the first uncommitted row.
+    """
+    state = await asyncio.to_thread(SESSIONS.get, user_id)
+    await asyncio.to_thread(seed_category_cache, state, user_id)
+
+    content_hash = await asyncio.to_thread(statement_hash, pdf_path)
+    if upload_id is None:
+        if await aprune_statement_upload(user_id, content_hash):
+            forget_deleted_rows(state)
+        existing = await afind_statement_upload(user_id, content_hash)
+        if existing is not None:
+            return use_existing_upload(state, existing)
+
+        # Re-uploading a file whose streaming ingest failed resumes it
+        upload_id = await afind_checkpoint_by_hash(user_id, content_hash)
+
+    checkpoint = await aload_checkpoint(user_id, upload_id) if upload_id else None
+    upload_id = upload_id or str(uuid.uuid4())
+
+    known = await aget_fingerprints(state, user_id)
+    if checkpoint is None:
+        df = drop_known_transactions(await aparse_statement_pdf(pdf_path), known)
+        await acreate_checkpoint(user_id, upload_id, pdf_path, df, content_hash)
+        rows_done = 0
+    else:
+        df = checkpoint["parsed"]
+        rows_done = checkpoint["rows_done"]
+        print(f"Resuming upload {upload_id} at row {rows_done}/{checkpoint['total_rows']}")
+
+    total = len(df)
+    state["current_upload_id"] = upload_id
+
+    # Rows committed by an earlier, interrupted call
+    parts = []
+    if rows_done:
+        async with get_async_conn() as conn:
+            prior = await afetch_upload_frame(conn, user_id, upload_id)
+        parts.append(ensure_transaction_nature(prior))
+
+    # Categorizer runs ahead of the writer by at most
+    # INGESTION_QUEUE_CHUNKS chunks
+    queue = asyncio.Queue(maxsize=INGESTION_QUEUE_CHUNKS)
+
+    async def categorize():
+        try:
+            async for item in aiter_categorized_chunks(
+                df, get_llm("ingestion"), chunk_size,
+                start_row=rows_done, user_id=user_id
+            ):
+                await queue.put(item)
+        except asyncio.CancelledError:
+            # The writer stopped and cancelled us; nobody will drain
+            # the queue, so a sentinel could block forever
+            raise
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    producer = asyncio.create_task(categorize())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            end_row, chunk = item
+            async with get_async_conn() as conn:
+                inserted = await ainsert_transactions(conn, user_id, upload_id, chunk)
+                chunk = chunk[chunk["fingerprint"].isin(inserted)].reset_index(drop=True)
+                await aupsert_monthly_rollup(conn, user_id, compute_monthly_rollup(chunk))
+                await aadvance_checkpoint(
+                    conn, upload_id, end_row,
+                    status="done" if end_row >= total else "running"
+                )
+
+            known.update(inserted)
+            parts.append(chunk)
+            state["monthly_rollup"] = None
+
+            if ctx is not None:
+                await ctx.report_progress(
+                    end_row, total, f"Ingested {end_row}/{total} transactions"
+                )
+        await producer
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+    df = pd.concat(parts, ignore_index=True) if parts else df
+
+    async with get_async_conn() as conn:
+        if total == 0:
+            await aadvance_checkpoint(conn, upload_id, 0, status="done")
+        await aclaim_statement_upload(conn, user_id, content_hash, upload_id, df)
+    state["current_transactions"] = df
+    state["raw_transactions"] = df
+    state["categorized_transactions"] = df
+
+    return {
+        "status": "ok",
+        "upload_id": upload_id,
+        "rows": total,
+        "resumed_from": rows_done
+    }
+
 # -------------------------------------------------
 # Tool 2: Expense Analysis (Current Upload Only)
 # -------------------------------------------------
 
 @mcp.tool()
-def expense_analysis(user_id: str):
-    if STATE["current_transactions"] is None:
+@traced("tool.expense_analysis")
+async def expense_analysis(user_id: str):
+    state = await asyncio.to_thread(SESSIONS.get, user_id)
+    if state["current_transactions"] is None:
         raise ValueError("No active upload")
 
-    result = run_expense_analysis(STATE)
+    await aget_monthly_rollup(state, user_id)
+    result = await arun_expense_analysis(state)
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    await asave_expense_analysis(state, user_id, result)
+    return result
+
+@traced("db.save_expense_analysis")
+async def asave_expense_analysis(state, user_id, result):
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 """
                 INSERT INTO expense_analyses (user_id, upload_id, summary)
                 VALUES (%s,%s,%s)
                 """,
-                (user_id, STATE["current_upload_id"], json.dumps(result))
+                (user_id, state["current_upload_id"], json.dumps(result))
             )
 
-    STATE["current_expense_analysis"] = result
-    return result
+    state["current_expense_analysis"] = result
 
 # -------------------------------------------------
 # Tool 3: Alerts (Current Upload Only)
 # -------------------------------------------------
 
 @mcp.tool()
-def alerts(user_id: str):
-    if STATE["current_expense_analysis"] is None:
+@traced("tool.alerts")
+async def alerts(user_id: str):
+    state = await asyncio.to_thread(SESSIONS.get, user_id)
+    if state["current_expense_analysis"] is None:
         raise ValueError("Run expense_analysis first")
 
-    result = run_alerts(STATE)
+    result = await arun_alerts(state)
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            for alert in result["alerts"]:
-                cur.execute(
-                    """
-                    INSERT INTO alerts
-                    (user_id, upload_id, alert_type, severity, message, recommendations)
-                    VALUES (%s,%s,%s,%s,%s,%s)
-                    """,
+    await asave_alerts(state, user_id, result)
+    return result
+
+@traced("db.save_alerts")
+async def asave_alerts(state, user_id, result):
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.executemany(
+                """
+                INSERT INTO alerts
+                (user_id, upload_id, alert_type, severity, message, recommendations)
+                VALUES (%s,%s,%s,%s,%s,%s)
+                """,
+                [
                     (
                         user_id,
-                        STATE["current_upload_id"],
+                        state["current_upload_id"],
                         alert["type"],
                         alert["severity"],
                         alert["message"],
                         json.dumps(alert["recommendations"])
                     )
-                )
+                    for alert in result["alerts"]
+                ]
+            )
 
-    STATE["current_alerts"] = result
-    return result
+    state["current_alerts"] = result
 
 # -------------------------------------------------
 # Tool 4: Goal Planning (Uses All History)
 # -------------------------------------------------
 
 @mcp.tool()
-def set_goal(user_id: str, amount: float, months: int, purpose: str):
-    if STATE["all_transactions"] is None:
-        STATE["all_transactions"] = fetch_all_transactions(user_id)
+@traced("tool.set_goal")
+async def set_goal(user_id: str, amount: float, months: int, purpose: str):
+    state = await asyncio.to_thread(SESSIONS.get, user_id)
+    await aget_monthly_rollup(state, user_id)
 
-    result = run_goal_planner(STATE, amount, purpose, months)
+    result = await arun_goal_planner(state, amount, purpose, months)
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    await asave_goal(state, user_id, amount, months, purpose, result)
+    return result
+
+@traced("db.save_goal")
+async def asave_goal(state, user_id, amount, months, purpose, result):
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 """
                 INSERT INTO goals (user_id, purpose, amount, months, plan)
                 VALUES (%s,%s,%s,%s,%s)
@@ -197,19 +813,42 @@ def set_goal(user_id: str, amount: float, months: int, purpose: str):
                 (user_id, purpose, amount, months, json.dumps(result))
             )
 
-    STATE["goal_plan"] = result
-    return result
+    state["goal_plan"] = result
 
 # -------------------------------------------------
 # Tool 5: CFO Summary
 # -------------------------------------------------
 
+def progress_streamer(ctx: Context):
+    """
+    on_text(field, delta) callback that forwards streamed LLM text as
+    MCP progress notifications. Each message is JSON
+    {"field": ..., "delta": ...}; progress counts chunks sent.
+    """
+    sent = 0
+
+    async def on_text(field, delta):
+        nonlocal sent
+        sent += 1
+        await ctx.report_progress(sent, None, json.dumps({"field": field, "delta": delta}))
+
+    return on_text
+
 @mcp.tool()
-def cfo_summary(user_id: str):
-    return run_cfo_summary(STATE)
+@traced("tool.cfo_summary")
+async def cfo_summary(user_id: str, stream: bool = False, ctx: Context = None):
+    """
+    CFO summary. With stream=True the executive summary and action
+    plan text arrive as progress notifications while they generate;
+    the final result has the same shape either way.
+    """
+    state = await asyncio.to_thread(SESSIONS.get, user_id)
+    on_text = progress_streamer(ctx) if stream and ctx is not None else None
+    return await arun_cfo_summary(state, on_text)
 
 @mcp.tool()
-def update_milestone(
+@traced("tool.update_milestone")
+async def update_milestone(
     user_id: str,
     goal_id: str,
     saved_amount: float,
@@ -218,29 +857,25 @@ def update_milestone(
 ):
     goal_id = int(goal_id)  # 🔥 ensure correct type
 
-    with get_conn() as conn:
-        with conn.cursor() as cur:
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
             # Fetch goal
-            cur.execute(
+            await cur.execute(
                 """
                 SELECT plan FROM goals
                 WHERE id = %s AND user_id = %s
                 """,
                 (goal_id, user_id)
             )
-            row = cur.fetchone()
+            row = await cur.fetchone()
 
             if not row:
                 raise ValueError("Goal not found for this user")
 
             goal_plan = row[0]
-            conn.commit()
 
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    model = genai.GenerativeModel("models/gemini-2.0-flash")
-
-    agent = MilestoneAdjustmentAgent(model)
-    updated_plan = agent.run(
+    agent = MilestoneAdjustmentAgent(get_llm("milestone"))
+    updated_plan = await agent.arun(
         saved_amount,
         expected_amount,
         goal_plan,
@@ -250,14 +885,201 @@ def update_milestone(
     return updated_plan
 
 @mcp.tool()
-def finance_chat(question: str):
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    model = genai.GenerativeModel("models/gemini-2.0-flash")
+@traced("tool.finance_chat")
+async def finance_chat(user_id: str, question: str, stream: bool = False, ctx: Context = None):
+    """
+    Answer a question about the user's transactions. With stream=True
+    the answer text also arrives as progress notifications
+    (field "answer") while it generates.
+    """
+    state = await asyncio.to_thread(SESSIONS.get, user_id)
+    agent = FinanceChatAgent(state, get_llm("chat"))
+
+    on_text = None
+    if stream and ctx is not None:
+        streamer = progress_streamer(ctx)
 
-    agent = FinanceChatAgent(STATE, model)
-    answer = agent.run(question)
+        async def on_text(delta):
+            await streamer("answer", delta)
+
+    answer = await agent.arun(question, on_text)
 
     return {"answer": answer}
 
+# -------------------------------------------------
+# Tool 6: Dashboard Pipeline
+# -------------------------------------------------
+
+# Stages whose results are sent as progress notifications when streaming
+DASHBOARD_OUTPUTS = {
+    "ingest": "upload",
+    "expense_insights": "expense_analysis",
+    "alert_recommendations": "alerts",
+    "goal_advice": "goal_plan",
+    "cfo": "cfo_summary"
+}
+
+def build_dashboard_graph(state, user_id, pdf_path=None, goal=None) -> TaskGraph:
+    """
+    upload → expense / alerts / goal / CFO as one task graph. Numeric
+    steps run as soon as their inputs exist; the expense insights,
+    alert recommendations and goal advice LLM calls fan out in
+    parallel, and the CFO summary waits only for the pieces it reads.
+    `goal` is (amount, months, purpose) or None to reuse the saved plan.
+    """
+    graph = TaskGraph()
+    expense_agent = ExpenseAnalysisAgent(state, get_llm("expense"))
+    alerts_agent = AlertRecommendationAgent(state, get_llm("alerts"))
+    goal_agent = GoalPlanningAgent(state, get_llm("goal"))
+
+    async def ingest():
+        if pdf_path is None:
+            return None
+        return await upload_statement(user_id, pdf_path)
+
+    async def rollup():
+        if state["current_transactions"] is None:
+            raise ValueError("No active upload")
+        await aget_monthly_rollup(state, user_id)
+
+    async def expense():
+        analysis, insight_inputs = expense_agent.compute()
+        state["expense_analysis"] = analysis
+        return analysis, insight_inputs
+
+    async def expense_insights():
+        analysis, insight_inputs = graph.results["expense"]
+        if insight_inputs is not None:
+            analysis["ai_insights"] = await expense_agent.agenerate_ai_insights(*insight_inputs)
+        await asave_expense_analysis(state, user_id, analysis)
+        return analysis
+
+    async def alert_list():
+        analysis, _ = graph.results["expense"]
+        output = {"alerts": alerts_agent.generate_alerts(analysis)}
+        state["alerts_and_recommendations"] = output
+        return output
+
+    async def alert_recommendations():
+        analysis, _ = graph.results["expense"]
+        output = graph.results["alerts"]
+        recommendations = await alerts_agent.agenerate_all_recommendations(output["alerts"], analysis)
+        for alert in output["alerts"]:
+            alert["recommendations"] = recommendations[alert["alert_id"]]
+        await asave_alerts(state, user_id, output)
+        return output
+
+    async def goal_plan():
+        if goal is None:
+            if state["goal_plan"] is None:
+                raise ValueError("No goal set; pass goal_amount, goal_months and goal_purpose")
+            return state["goal_plan"], None
+        amount, months, purpose = goal
+        plan, goal_summary = goal_agent.compute(amount, purpose, months)
+        state["goal_plan"] = plan
+        return plan, goal_summary
+
+    async def goal_advice():
+        plan, goal_summary = graph.results["goal"]
+        if goal_summary is not None:
+            plan["recommendations"] = await goal_agent.agenerate_ai_advice(goal_summary)
+            amount, months, purpose = goal
+            await asave_goal(state, user_id, amount, months, purpose, plan)
+        return plan
+
+    async def cfo():
+        return await CFOSummaryAgent(state, get_llm("cfo")).arun()
+
+    graph.add("ingest", ingest)
+    graph.add("rollup", rollup, deps=["ingest"])
+    graph.add("expense", expense, deps=["rollup"])
+    graph.add("expense_insights", expense_insights, deps=["expense"])
+    graph.add("alerts", alert_list, deps=["expense"])
+    graph.add("alert_recommendations", alert_recommendations, deps=["alerts"])
+
+    graph.add("goal", goal_plan, deps=["expense"])
+    graph.add("goal_advice", goal_advice, deps=["goal"])
+
+    # The summary prompt uses the insights, alert messages and goal numbers
+    graph.add("cfo", cfo, deps=["expense_insights", "alerts", "goal"])
+    return graph
+
+@mcp.tool()
+@traced("tool.dashboard")
+async def dashboard(
+    user_id: str,
+    pdf_path: str = None,
+    goal_amount: float = None,
+    goal_months: int = None,
+    goal_purpose: str = None,
+    stream: bool = False,
+    ctx: Context = None
+):
+    """
+    Whole dashboard in one call: optional statement upload, expense
+    analysis, alerts, goal plan and CFO summary. Independent LLM calls
+    run concurrently. With stream=True each section is sent as a
+    progress notification ({"stage", "status", "result"}) as soon as
+    it is ready. A failing section is reported under "errors" and only
+    skips the sections that depend on it.
+    """
+    state = await asyncio.to_thread(SESSIONS.get, user_id)
+
+    goal = None
+    if goal_amount is not None and goal_months is not None:
+        goal = (goal_amount, goal_months, goal_purpose or "Savings goal")
+
+    graph = build_dashboard_graph(state, user_id, pdf_path, goal)
+
+    on_done = None
+    if stream and ctx is not None:
+        done = 0
+
+        async def on_done(name, result, error):
+            nonlocal done
+            done += 1
+            if name not in DASHBOARD_OUTPUTS and error is None:
+                return
+            message = {"stage": DASHBOARD_OUTPUTS.get(name, name), "status": "error" if error else "done"}
+            if error:
+                message["error"] = error
+            else:
+                message["result"] = result
+            await ctx.report_progress(done, len(graph), json.dumps(message, default=str))
+
+    results, errors = await graph.run(on_done)
+
+    return {
+        **{
+            output: results.get(stage)
+            for stage, output in DASHBOARD_OUTPUTS.items()
+        },
+        "errors": errors,
+        "timings_ms": graph.timings_ms
+    }
+
+# -------------------------------------------------
+# Observability
+# -------------------------------------------------
+
+@mcp.tool()
+async def metrics(format: str = "json", recent: int = 20):
+    """
+    Process-wide counters and timings (LLM calls, tokens, cache hits,
+    retries, DB pool waits, per-span durations) plus the most recent
+    spans. format="prometheus" returns the text exposition format.
+    """
+    if format == "prometheus":
+        return render_prometheus()
+
+    return {
+        **metrics_snapshot(),
+        "llm": get_gateway().stats(),
+        "db_pool": pool_stats(),
+        "category_cache": get_category_cache().stats(),
+        "sessions": SESSIONS.stats(),
+        "recent_spans": recent_spans(recent)
+    }
+
 if __name__ == "__main__":
     mcp.run()
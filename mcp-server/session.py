@@ -0,0 +1,128 @@
+# session.py
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "200"))
+SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+
+
+def new_session(user_id) -> dict:
+    """
+    Fresh per-user MCP state. Agents read and write the same keys
+    they used on the old module-level STATE dict.
+    """
+    return {
+        "user_id": user_id,
+        "current_upload_id": None,
+
+        "current_transactions": None,
+        "current_expense_analysis": None,
+        "current_alerts": None,
+
+        "monthly_rollup": None,
+        "fingerprints": None,
+        "category_cache_seeded": False,
+        "chat_index": None,
+        "goal_plan": None
+    }
+
+
+# =====================================
+# Per-user Session Store
+# =====================================
+
+class SessionStore:
+    """
+    Keyed, bounded store of per-user session dicts.
+
+    Sessions are kept in LRU order; when more than `max_sessions` are
+    active, or a session has been idle for longer than `idle_seconds`,
+    it is dropped. On a miss, `loader(user_id)` rebuilds the session
+    (e.g. from Postgres).
+    """
+
+    def __init__(
+        self,
+        loader=None,
+        max_sessions: int = SESSION_MAX_ACTIVE,
+        idle_seconds: int = SESSION_IDLE_SECONDS
+    ):
+        self.loader = loader
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+
+        self._sessions = OrderedDict()
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id) -> dict:
+        user_id = str(user_id)
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(user_id)
+            if session is not None:
+                self._touch(user_id)
+                self.hits += 1
+                return session
+
+        # Rehydrate outside the lock; DB reads can be slow
+        self.misses += 1
+        session = self.loader(user_id) if self.loader else new_session(user_id)
+
+        with self._lock:
+            existing = self._sessions.get(user_id)
+            if existing is not None:
+                self._touch(user_id)
+                return existing
+
+            self._sessions[user_id] = session
+            self._touch(user_id)
+            self._evict_overflow()
+            return session
+
+    def drop(self, user_id):
+        with self._lock:
+            self._sessions.pop(str(user_id), None)
+            self._last_used.pop(str(user_id), None)
+
+    def _touch(self, user_id):
+        self._sessions.move_to_end(user_id)
+        self._last_used[user_id] = time.monotonic()
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if self._last_used.get(oldest, 0) >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self._last_used.pop(oldest, None)
+            self.evictions += 1
+
+    def _evict_overflow(self):
+        while len(self._sessions) > self.max_sessions:
+            oldest, _ = self._sessions.popitem(last=False)
+            self._last_used.pop(oldest, None)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            active = len(self._sessions)
+        return {
+            "active": active,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,60 @@
+# tests/test_categorization.py
+
+import asyncio
+import threading
+
+import pytest
+
+from agents import ingestion
+from agents.category_cache import CategoryCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CategoryCache(":memory:")
+    monkeypatch.setattr(ingestion, "get_category_cache", lambda: cache)
+    return cache
+
+
+def test_rules_apply_on_cache_miss(cache):
+    result = ingestion._pre_classify_many(["POS SWIGGY BANGALORE"])[0]
+    assert result["tier"] == "rules"
+    assert result["category"] == "Food & Dining"
+
+
+def test_cached_correction_beats_rules(cache):
+    cache.put("POS SWIGGY BANGALORE", "Groceries")
+
+    result = ingestion._pre_classify_many(["POS SWIGGY BANGALORE"])[0]
+    assert result["tier"] == "cache"
+    assert result["category"] == "Groceries"
+
+
+def test_unknown_description_needs_llm(cache):
+    assert ingestion._pre_classify_many(["NEFT ACME TRADERS"])[0] is None
+
+
+def test_batch_keeps_order(cache):
+    cache.put("UPI/9876543210@paytm/Payment", "Rent", user_id="u1")
+    results = ingestion._pre_classify_many(
+        ["NEFT ACME TRADERS", "UPI/9876543210@paytm/Payment", "POS SWIGGY BANGALORE"], "u1"
+    )
+
+    assert results[0] is None
+    assert (results[1]["tier"], results[1]["category"]) == ("cache", "Rent")
+    assert (results[2]["tier"], results[2]["category"]) == ("rules", "Food & Dining")
+
+
+def test_async_pre_classify_runs_off_the_loop(cache, monkeypatch):
+    loop_thread = threading.get_ident()
+    seen = []
+
+    def get_many(descriptions, user_id=None):
+        seen.append(threading.get_ident())
+        return [None] * len(descriptions)
+
+    monkeypatch.setattr(cache, "get_many", get_many)
+    results = asyncio.run(ingestion.acategorize_descriptions(["POS SWIGGY BANGALORE"], gemini_model=None))
+
+    assert results[0]["tier"] == "rules"
+    assert seen and seen[0] != loop_thread
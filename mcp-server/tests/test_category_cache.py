@@ -0,0 +1,88 @@
+# tests/test_category_cache.py
+
+import time
+
+from agents.category_cache import CategoryCache, normalize_description
+
+
+# ----------------------------
+# Normalization
+# ----------------------------
+
+def test_strips_dates_and_reference_numbers():
+    assert normalize_description("POS 412345678901 SWIGGY 03-01-2025") == "pos swiggy"
+    assert normalize_description("POS 998877665544 SWIGGY 04/02/2025") == "pos swiggy"
+
+
+def test_keeps_upi_vpa():
+    assert (
+        normalize_description("UPI/SWIGGY/412345678901/swiggy@ybl 03-01-2025")
+        == "upi swiggy swiggy swiggy@ybl"
+    )
+
+
+def test_p2p_payees_stay_distinct():
+    first = normalize_description("UPI/412345678901/9876543210@paytm/Payment")
+    second = normalize_description("UPI/412345678902/9123456780@ybl/Payment")
+
+    assert first == "upi payment 9876543210@paytm"
+    assert first != second
+
+
+def test_vpa_not_merged_with_separator():
+    assert normalize_description("UPI-RAHUL.K12@OKAXIS-UPI") == "upi rahul k upi rahul.k12@okaxis"
+
+
+def test_empty_description():
+    assert normalize_description(None) == ""
+    assert normalize_description("12345678 03/01/2025") == ""
+
+
+# ----------------------------
+# Per-user Entries
+# ----------------------------
+
+def test_user_entries_are_private():
+    cache = CategoryCache(":memory:")
+    cache.put("UPI/9876543210@paytm/Payment", "Rent", user_id="u1")
+
+    assert cache.get("UPI/9876543210@paytm/Payment", user_id="u1") == "Rent"
+    assert cache.get("UPI/9876543210@paytm/Payment", user_id="u2") is None
+    assert cache.get("UPI/9876543210@paytm/Payment") is None
+
+
+def test_user_entry_overrides_shared_entry():
+    cache = CategoryCache(":memory:")
+    cache.put("NEFT ACME TRADERS", "Shopping")
+    cache.put("NEFT ACME TRADERS", "Salary", user_id="u1")
+
+    assert cache.get("NEFT ACME TRADERS", user_id="u1") == "Salary"
+    assert cache.get("NEFT ACME TRADERS", user_id="u2") == "Shopping"
+
+
+# ----------------------------
+# Batched Lookups
+# ----------------------------
+
+def test_get_many_aligns_with_input():
+    cache = CategoryCache(":memory:")
+    cache.put_many([("POS SWIGGY 1234567", "Food & Dining"), ("NEFT RENT", "Rent")])
+
+    assert cache.get_many(["NEFT RENT", "", "UNKNOWN SHOP", "POS SWIGGY 7654321"]) == [
+        "Rent", None, None, "Food & Dining"
+    ]
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_hits_defer_last_used_writes(tmp_path):
+    cache = CategoryCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("NEFT RENT", "Rent")
+    stored = cache._conn.execute("SELECT last_used FROM category_cache").fetchone()[0]
+
+    time.sleep(0.01)
+    cache.get_many(["NEFT RENT"] * 3)
+    assert cache._conn.execute("SELECT last_used FROM category_cache").fetchone()[0] == stored
+
+    cache.close()
+    reopened = CategoryCache(str(tmp_path / "cache.sqlite3"))
+    assert reopened._conn.execute("SELECT last_used FROM category_cache").fetchone()[0] > stored
@@ -0,0 +1,114 @@
+# tests/test_cfo.py
+
+import json
+
+from agents.cfo import CFOSummaryAgent
+
+
+ACTIONS = [f"Action {i}" for i in range(1, 7)]
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Replies with `replies` in order and records each call."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls.append(generation_config)
+        return FakeResponse(self.replies.pop(0))
+
+
+def _state():
+    return {
+        "expense_analysis": {
+            "total_expense": 1000.0,
+            "expense_count": 4,
+            "top_3_categories": [{"category": "Rent", "amount": 600.0}],
+            "category_breakdown": [{"category": "Rent", "amount": 600.0}] * 50,
+            "ai_insights": "Rent dominates."
+        },
+        "alerts_and_recommendations": {
+            "alerts": [{"severity": "High", "message": "Rent is 60% of spend"}]
+        },
+        "goal_plan": {
+            "goal": "Laptop",
+            "feasibility": "Feasible",
+            "required_monthly_saving": 5000,
+            "milestones": [{"month": m} for m in range(12)]
+        }
+    }
+
+
+# ----------------------------
+# Structured Reply Parsing
+# ----------------------------
+
+def test_parse_plain_json():
+    text = json.dumps({"executive_summary": " All good. ", "next_month_action_plan": ACTIONS[:5]})
+    assert CFOSummaryAgent.parse_combined(text) == ("All good.", ACTIONS[:5])
+
+
+def test_parse_fenced_json_trims_actions():
+    body = json.dumps({
+        "executive_summary": "Fine.",
+        "next_month_action_plan": ["  ", *ACTIONS]
+    })
+    summary, actions = CFOSummaryAgent.parse_combined(f"```json\n{body}\n```")
+
+    assert summary == "Fine."
+    assert actions == ACTIONS[:5]
+
+
+def test_parse_rejects_bad_replies():
+    bad = [
+        "not json",
+        json.dumps(["a list"]),
+        json.dumps({"executive_summary": "Only a summary"}),
+        json.dumps({"executive_summary": "", "next_month_action_plan": ACTIONS}),
+        json.dumps({"executive_summary": "Fine.", "next_month_action_plan": []}),
+        json.dumps({"executive_summary": None, "next_month_action_plan": ACTIONS}),
+    ]
+    for text in bad:
+        assert CFOSummaryAgent.parse_combined(text) is None, text
+
+
+def test_compact_context_drops_tables():
+    agent = CFOSummaryAgent(_state(), FakeModel())
+    compact = json.loads(agent.compact_context(agent.build_context()))
+
+    assert "category_breakdown" not in compact["expenses"]
+    assert "milestones" not in compact["goal"]
+    assert compact["alerts"] == [{"severity": "High", "message": "Rent is 60% of spend"}]
+
+
+# ----------------------------
+# One Call, With Fallback
+# ----------------------------
+
+def test_run_uses_one_structured_call():
+    model = FakeModel(json.dumps({"executive_summary": "Fine.", "next_month_action_plan": ACTIONS[:5]}))
+    state = _state()
+    output = CFOSummaryAgent(state, model).run()
+
+    assert len(model.calls) == 1
+    assert model.calls[0]["response_mime_type"] == "application/json"
+    assert output["executive_summary"] == "Fine."
+    assert output["next_month_action_plan"] == ACTIONS[:5]
+    assert output["top_risks"] == ["Rent is 60% of spend"]
+    assert state["cfo_summary"] is output
+
+
+def test_run_falls_back_to_two_calls():
+    model = FakeModel("{broken", "Plain summary.", "\n".join(ACTIONS))
+    output = CFOSummaryAgent(_state(), model).run()
+
+    assert len(model.calls) == 3
+    assert output["executive_summary"] == "Plain summary."
+    assert output["next_month_action_plan"] == ACTIONS[:5]
@@ -0,0 +1,61 @@
+# tests/test_copy_rows.py
+
+import json
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from agents.ingestion import normalize_transactions, drop_known_transactions
+from server import _copy_rows
+
+
+def _ingested(rows):
+    df = pd.DataFrame(rows, columns=["date", "description", "amount", "transaction_type", "category"])
+    return drop_known_transactions(normalize_transactions(df))
+
+
+def test_rows_follow_copy_column_order():
+    df = _ingested([["2025-01-03", "UPI SWIGGY", "250.50", "Debit", "Food & Dining"]])
+
+    (row,) = list(_copy_rows("user-1", "upload-1", df))
+    user_id, upload_id, date, description, amount, txn_type, category, raw, fingerprint = row
+
+    assert (user_id, upload_id) == ("user-1", "upload-1")
+    assert date == datetime.date(2025, 1, 3)
+    assert description == "UPI SWIGGY"
+    assert amount == 250.5
+    assert (txn_type, category) == ("Debit", "Food & Dining")
+    assert fingerprint == df["fingerprint"].iloc[0]
+    assert json.loads(raw)["description"] == "UPI SWIGGY"
+
+
+def test_missing_values_become_none():
+    df = _ingested([["not a date", "REFUND", np.nan, None, None]])
+
+    (row,) = list(_copy_rows("user-1", "upload-1", df))
+
+    assert row[2] is None
+    assert row[4] is None
+    assert row[5] is None
+
+
+def test_raw_json_is_one_record_per_row():
+    df = _ingested([
+        ["2025-01-03", "चाय 😊", 20.0, "Debit", "Food & Dining"],
+        ["2025-01-04", 'SHOP "QUOTED"\nLINE', 99.0, "Debit", "Shopping"],
+    ])
+
+    rows = list(_copy_rows("user-1", "upload-1", df))
+
+    assert len(rows) == 2
+    assert [json.loads(row[7])["description"] for row in rows] == list(df["description"])
+    assert "चाय" in rows[0][7]
+
+
+def test_absent_column_is_null():
+    df = _ingested([["2025-01-03", "UPI SWIGGY", 250.0, "Debit", "Food & Dining"]])
+    df = df.drop(columns=["category"])
+
+    (row,) = list(_copy_rows("user-1", "upload-1", df))
+    assert row[6] is None
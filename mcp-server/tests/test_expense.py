@@ -0,0 +1,55 @@
+# tests/test_expense.py
+
+import pandas as pd
+
+from agents.ingestion import normalize_transactions
+from agents.expense import analyze_expenses
+
+
+def _frame(rows):
+    df = pd.DataFrame(rows, columns=["date", "description", "amount", "transaction_type", "category"])
+    return normalize_transactions(df)
+
+
+def test_totals_exclude_transfers_and_income():
+    df = _frame([
+        ("2025-01-02", "HPCL", "1,000", "Debit", "Fuel"),
+        ("2025-01-03", "Swiggy", 500, "Debit", "Food & Dining"),
+        ("2025-01-04", "Swiggy", 250, "Debit", "Food & Dining"),
+        ("2025-01-05", "To self", 9000, "Debit", "Self Transfer"),
+        ("2025-01-06", "Salary", 50000, "Credit", "Salary"),
+    ])
+    result = analyze_expenses(df)
+
+    assert result["total_expense"] == 1750.0
+    assert result["expense_count"] == 3
+    assert result["category_wise_spending"] == {"Fuel": 1000.0, "Food & Dining": 750.0}
+    assert result["top_3_categories"][0] == {"category": "Fuel", "amount": 1000.0}
+    assert result["highest_single_expense"]["description"] == "HPCL"
+    assert result["highest_single_expense"]["date"] == "2025-01-02"
+
+
+def test_group_with_only_unparseable_amounts():
+    df = _frame([
+        ("2025-01-02", "HPCL", "N/A", "Debit", "Fuel"),
+        ("2025-01-03", "Swiggy", 500, "Debit", "Food & Dining"),
+    ])
+    result = analyze_expenses(df)
+
+    assert result["category_wise_spending"] == {"Food & Dining": 500.0}
+    assert result["highest_single_expense"]["amount"] == 500.0
+
+
+def test_single_unparseable_row_has_no_expenses():
+    df = _frame([("2025-01-02", "HPCL", "N/A", "Debit", "Fuel")])
+    result = analyze_expenses(df)
+
+    assert result["expense_count"] == 0
+    assert result["highest_single_expense"] is None
+
+
+def test_does_not_modify_input():
+    df = _frame([("2025-01-02", "HPCL", 100, "Debit", "Fuel")])
+    before = list(df.columns)
+    analyze_expenses(df)
+    assert list(df.columns) == before
@@ -0,0 +1,79 @@
+# tests/test_fingerprints.py
+
+import pandas as pd
+
+from agents.ingestion import transaction_fingerprints, drop_known_transactions
+
+
+def _statement(rows):
+    return pd.DataFrame(rows, columns=["date", "description", "amount", "transaction_type"])
+
+
+def test_same_row_collides_across_formats():
+    a = _statement([["03/01/2025", "UPI  Swiggy", "250", "Debit"]])
+    b = _statement([["2025-01-03", "upi swiggy", 250.0, "Debit"]])
+
+    assert transaction_fingerprints(a).tolist() == transaction_fingerprints(b).tolist()
+
+
+def test_fields_change_the_fingerprint():
+    base = ["2025-01-03", "UPI SWIGGY", 250.0, "Debit"]
+    variants = [
+        ["2025-01-04", "UPI SWIGGY", 250.0, "Debit"],
+        ["2025-01-03", "UPI ZOMATO", 250.0, "Debit"],
+        ["2025-01-03", "UPI SWIGGY", 251.0, "Debit"],
+        ["2025-01-03", "UPI SWIGGY", 250.0, "Credit"],
+    ]
+    prints = transaction_fingerprints(_statement([base] + variants))
+
+    assert prints.nunique() == len(variants) + 1
+
+
+def test_repeated_payments_stay_distinct():
+    row = ["2025-01-03", "UPI CHAI POINT", 20.0, "Debit"]
+    prints = transaction_fingerprints(_statement([row, row]))
+
+    assert prints.nunique() == 2
+
+
+def test_overlapping_statement_keeps_only_new_rows():
+    chai = ["2025-01-03", "UPI CHAI POINT", 20.0, "Debit"]
+    first = drop_known_transactions(_statement([
+        ["2025-01-01", "SALARY", 50000.0, "Credit"],
+        chai
+    ]))
+    # Second statement overlaps on the salary and one chai, then adds
+    # a second same-day chai and a new row
+    second = drop_known_transactions(
+        _statement([
+            ["2025-01-01", "SALARY", 50000.0, "Credit"],
+            chai,
+            chai,
+            ["2025-01-05", "UPI SWIGGY", 300.0, "Debit"]
+        ]),
+        set(first["fingerprint"])
+    )
+
+    assert second["description"].tolist() == ["UPI CHAI POINT", "UPI SWIGGY"]
+    assert second.index.tolist() == [0, 1]
+
+
+def test_empty_statement():
+    df = drop_known_transactions(_statement([]), {"abc"})
+    assert df.empty
+    assert "fingerprint" in df.columns
+
+
+def test_rows_without_date_or_amount():
+    df = _statement([[None, "REFUND", None, None], [pd.NaT, "REFUND", float("nan"), None]])
+    prints = transaction_fingerprints(df)
+
+    assert prints.notna().all()
+    assert prints.nunique() == 2
+
+
+def test_type_synonyms_collide():
+    a = _statement([["2025-01-03", "ATM", 500.0, "DR"]])
+    b = _statement([["2025-01-03", "ATM", 500.0, "Debit"]])
+
+    assert transaction_fingerprints(a).tolist() == transaction_fingerprints(b).tolist()
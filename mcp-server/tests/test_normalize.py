@@ -0,0 +1,32 @@
+# tests/test_normalize.py
+
+import pandas as pd
+
+from agents.ingestion import normalize_transactions, transaction_nature
+
+
+def _frame(types):
+    return pd.DataFrame({
+        "date": ["2025-01-03"] * len(types),
+        "description": ["ROW"] * len(types),
+        "amount": ["₹1,250.00"] * len(types),
+        "transaction_type": types
+    })
+
+
+def test_keeps_the_bank_label():
+    df = normalize_transactions(_frame([" CR ", "dr", "Withdrawal", None]))
+
+    assert df["transaction_type"].tolist()[:3] == ["CR", "dr", "Withdrawal"]
+    assert pd.isna(df["transaction_type"].iloc[3])
+    assert df["amount"].tolist() == [1250.0] * 4
+
+
+def test_nature_from_synonyms():
+    df = normalize_transactions(_frame(["Credit", "cr", "DEBIT", "Withdrawal", None]))
+
+    assert df["transaction_nature"].tolist() == ["Income", "Income", "Expense", "Expense", "Expense"]
+
+
+def test_nature_of_unnormalized_frame():
+    assert transaction_nature(_frame(["credit", "Debit"])).tolist() == ["Income", "Expense"]
@@ -0,0 +1,81 @@
+# tests/test_query_engine.py
+
+import pandas as pd
+import pytest
+
+from agents.ingestion import normalize_transactions
+from agents.retrieval import TransactionIndex
+from agents.query_engine import answer_question, parse_intent
+
+
+def _frame(rows):
+    df = pd.DataFrame(rows, columns=["date", "description", "amount", "transaction_type", "category"])
+    return normalize_transactions(df)
+
+
+@pytest.fixture
+def index():
+    rows = [
+        # UPI on most rows, so "upi" is a broad (non-selective) token
+        ("2025-06-23", "UPI/SWIGGY/412345678901/swiggy@ybl", 450.0, "Debit", "Food & Dining"),
+        ("2025-06-24", "UPI/ZOMATO/412345678902/zomato@ybl", 1200.0, "Debit", "Food & Dining"),
+        ("2025-06-26", "UPI/HPCL/412345678903/hpcl@ybl", 2500.0, "Debit", "Fuel"),
+        ("2025-06-27", "UPI/SWIGGY/412345678904/swiggy@ybl", 300.0, "Debit", "Food & Dining"),
+        ("2025-06-28", "CARD AMAZON PAY 4111", 8000.0, "Debit", "Shopping"),
+        ("2025-06-29", "CARD FLIPKART 4111", 650.0, "Debit", "Shopping"),
+        ("2025-03-05", "UPI/HPCL/412345678905/hpcl@ybl", 1000.0, "Debit", "Fuel"),
+        ("2025-03-18", "UPI/HPCL/412345678906/hpcl@ybl", 1500.0, "Debit", "Fuel"),
+        ("2025-03-20", "CARD SHELL 4111", 9000.0, "Debit", "Fuel"),
+        ("2025-03-31", "NEFT SALARY ACME", 90000.0, "Credit", "Salary"),
+    ]
+    return TransactionIndex(_frame(rows))
+
+
+def test_parse_intent_metrics():
+    assert parse_intent("How much did I spend on Fuel?") == {"metric": "sum", "nature": "Expense"}
+    assert parse_intent("largest payment last week")["metric"] == "max"
+    assert parse_intent("how many transactions in April")["metric"] == "count"
+    assert parse_intent("Why did I spend so much?") is None
+    assert parse_intent("hello") is None
+
+
+def test_sum_by_category_and_month(index):
+    result = answer_question(index, "How much did I spend on Fuel in March?")
+    assert result["value"] == 11500.0
+    assert result["count"] == 3
+    assert "March 2025" in result["answer"]
+
+
+def test_largest_upi_payment_last_week_excludes_card_rows(index):
+    result = answer_question(index, "largest UPI payment last week")
+    assert result["value"] == 2500.0
+    assert "HPCL" in result["transaction"]["description"]
+
+
+def test_largest_upi_payment_in_march(index):
+    result = answer_question(index, "largest upi payment in march")
+    assert result["value"] == 1500.0
+
+
+def test_last_week_is_anchored_on_latest_transaction(index):
+    filters = index.parse_filters("payments last week")
+    assert filters["start"] == pd.Timestamp("2025-06-23")
+    assert filters["end"] == pd.Timestamp("2025-06-30")
+
+
+def test_amount_range_and_merchant_filters(index):
+    filters = index.parse_filters("swiggy orders between 100 and 400")
+    assert filters["merchants"] == ["swiggy"]
+    assert (filters["min_amount"], filters["max_amount"]) == (100.0, 400.0)
+
+    result = answer_question(index, "how much did I spend on swiggy between 100 and 400")
+    assert result["value"] == 300.0
+
+
+def test_income_question(index):
+    result = answer_question(index, "how much did I earn in 2025")
+    assert result["value"] == 90000.0
+
+
+def test_unknown_merchant_falls_back_to_llm(index):
+    assert answer_question(index, "how much did I spend on gym?") is None
@@ -0,0 +1,80 @@
+# tests/test_rollup.py
+
+import pandas as pd
+
+from agents.ingestion import normalize_transactions
+from agents.rollup import compute_monthly_rollup, monthly_totals, monthly_averages
+
+
+def _frame(rows):
+    df = pd.DataFrame(rows, columns=["date", "description", "amount", "transaction_type", "category"])
+    return normalize_transactions(df)
+
+
+ROWS = [
+    ["2025-01-03", "SWIGGY", 200.0, "Debit", "Food & Dining"],
+    ["05/01/2025", "ZOMATO", 500.0, "Debit", "Food & Dining"],
+    ["2025-01-10", "SALARY", 50000.0, "Credit", "Salary"],
+    ["2025-01-12", "TO RAHUL", 3000.0, "Debit", "Peer Transfer"],
+    ["2025-02-01", "SWIGGY", 300.0, "Debit", "Food & Dining"],
+    ["2025-02-02", "SHOP", 1000.0, "Debit", None],
+    ["2025-02-10", "SALARY", 52000.0, "Credit", "Salary"],
+    ["not a date", "LOST", 999.0, "Debit", "Shopping"],
+    ["2025-02-11", "BROKEN", None, "Debit", "Shopping"],
+]
+
+
+def _row(rollup, month, category, nature):
+    match = rollup[
+        (rollup["month"] == pd.Timestamp(month))
+        & (rollup["category"] == category)
+        & (rollup["nature"] == nature)
+    ]
+    assert len(match) == 1
+    return match.iloc[0]
+
+
+def test_rollup_groups_by_month_category_nature():
+    rollup = compute_monthly_rollup(_frame(ROWS))
+
+    food = _row(rollup, "2025-01-01", "Food & Dining", "Expense")
+    assert (food["total_amount"], food["txn_count"], food["max_amount"]) == (700.0, 2, 500.0)
+
+    salary = _row(rollup, "2025-02-01", "Salary", "Income")
+    assert (salary["total_amount"], salary["txn_count"]) == (52000.0, 1)
+
+    assert _row(rollup, "2025-02-01", "Others", "Expense")["total_amount"] == 1000.0
+
+
+def test_rollup_skips_undated_and_missing_amounts():
+    rollup = compute_monthly_rollup(_frame(ROWS))
+
+    assert rollup["txn_count"].sum() == 7
+    assert "Shopping" not in set(rollup["category"])
+
+
+def test_rollup_of_empty_frame():
+    assert compute_monthly_rollup(_frame([])).empty
+
+
+def test_totals_exclude_transfers():
+    totals = monthly_totals(compute_monthly_rollup(_frame(ROWS)))
+
+    assert totals.loc[pd.Timestamp("2025-01-01")].tolist() == [700.0, 50000.0]
+    assert totals.loc[pd.Timestamp("2025-02-01")].tolist() == [1300.0, 52000.0]
+
+
+def test_lookback_keeps_latest_months():
+    rollup = compute_monthly_rollup(_frame(ROWS))
+
+    assert monthly_totals(rollup, 1).index.tolist() == [pd.Timestamp("2025-02-01")]
+    assert monthly_averages(rollup) == {
+        "months": 2,
+        "monthly_expense": 1000.0,
+        "monthly_income": 51000.0
+    }
+    assert monthly_averages(rollup, 1)["monthly_expense"] == 1300.0
+
+
+def test_averages_without_history():
+    assert monthly_averages(None) == {"months": 0, "monthly_expense": 0.0, "monthly_income": 0.0}
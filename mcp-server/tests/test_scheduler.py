@@ -0,0 +1,133 @@
+# tests/test_scheduler.py
+
+import asyncio
+
+import pytest
+
+from scheduler import TaskGraph
+
+
+def _run(graph, on_done=None):
+    return asyncio.run(graph.run(on_done))
+
+
+def test_dependencies_finish_first():
+    order = []
+    graph = TaskGraph()
+
+    def task(name, delay=0.0):
+        async def fn():
+            await asyncio.sleep(delay)
+            order.append(name)
+            return name.upper()
+        return fn
+
+    graph.add("a", task("a", 0.02))
+    graph.add("b", task("b"))
+    graph.add("c", task("c"), deps=["a", "b"])
+    results, errors = _run(graph)
+
+    assert errors == {}
+    assert results == {"a": "A", "b": "B", "c": "C"}
+    # b has no deps so it does not wait for the slower a
+    assert order == ["b", "a", "c"]
+    assert set(graph.timings_ms) == {"a", "b", "c"}
+
+
+def test_independent_branches_overlap():
+    graph = TaskGraph()
+    running = []
+    peak = []
+
+    async def slow():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.pop()
+
+    for name in ("x", "y", "z"):
+        graph.add(name, slow)
+    _run(graph)
+
+    assert max(peak) == 3
+
+
+def test_task_reads_dependency_result():
+    graph = TaskGraph()
+
+    async def base():
+        return 2
+
+    async def double():
+        return graph.results["base"] * 2
+
+    graph.add("base", base)
+    graph.add("double", double, deps=["base"])
+    results, _ = _run(graph)
+
+    assert results["double"] == 4
+
+
+def test_failure_skips_dependents_only():
+    graph = TaskGraph()
+    ran = []
+
+    async def boom():
+        raise RuntimeError("no rollup")
+
+    def ok(name):
+        async def fn():
+            ran.append(name)
+            return name
+        return fn
+
+    graph.add("rollup", boom)
+    graph.add("expense", ok("expense"), deps=["rollup"])
+    graph.add("insights", ok("insights"), deps=["expense"])
+    graph.add("goal", ok("goal"))
+    results, errors = _run(graph)
+
+    assert ran == ["goal"]
+    assert results == {"goal": "goal"}
+    assert errors["rollup"] == "RuntimeError: no rollup"
+    assert errors["expense"] == "skipped: rollup failed"
+    assert errors["insights"] == "skipped: expense failed"
+
+
+def test_on_done_reports_every_task():
+    graph = TaskGraph()
+    settled = []
+
+    async def ok():
+        return 1
+
+    async def boom():
+        raise ValueError("bad")
+
+    async def on_done(name, result, error):
+        settled.append((name, result, error))
+
+    graph.add("ok", ok)
+    graph.add("boom", boom)
+    graph.add("after", ok, deps=["boom"])
+    _run(graph, on_done)
+
+    assert sorted(settled) == [
+        ("after", None, "skipped: boom failed"),
+        ("boom", None, "ValueError: bad"),
+        ("ok", 1, None),
+    ]
+
+
+def test_add_validates_names():
+    graph = TaskGraph()
+
+    async def fn():
+        return None
+
+    graph.add("a", fn)
+    with pytest.raises(ValueError):
+        graph.add("a", fn)
+    with pytest.raises(ValueError):
+        graph.add("b", fn, deps=["missing"])
+    assert "a" in graph and len(graph) == 1
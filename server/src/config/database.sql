@@ -13,13 +13,14 @@ CREATE TABLE transactions (
     user_id UUID NOT NULL,
     upload_id UUID ,
 
-    date TEXT,
+    date DATE,
     description TEXT,
     amount NUMERIC,
     transaction_type TEXT,
     category TEXT,
 
     raw_json JSONB,
+    fingerprint TEXT,
 
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
 
@@ -32,6 +33,12 @@ CREATE TABLE transactions (
 CREATE INDEX idx_transactions_user_upload
 ON transactions(user_id, upload_id);
 
+CREATE UNIQUE INDEX idx_transactions_user_fingerprint
+ON transactions(user_id, fingerprint);
+
+CREATE INDEX idx_transactions_user_date
+ON transactions(user_id, date);
+
 CREATE TABLE expense_analyses (
     id SERIAL PRIMARY KEY,
     user_id UUID NOT NULL,
@@ -100,6 +107,165 @@ CREATE TABLE user_category_memory (
     UNIQUE(user_id, merchant_pattern)
 );
 
+CREATE TABLE monthly_category_rollup (
+    user_id UUID NOT NULL,
+    month DATE NOT NULL,
+    category TEXT NOT NULL,
+    nature TEXT NOT NULL,
+
+    total_amount NUMERIC NOT NULL DEFAULT 0,
+    txn_count INT NOT NULL DEFAULT 0,
+    max_amount NUMERIC,
+
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (user_id, month, category, nature),
+
+    CONSTRAINT fk_rollup_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+-- Deletes from and updates to transactions are reflected in the
+-- rollup (see migrations/006_rollup_sync_trigger.sql)
+CREATE OR REPLACE FUNCTION rollup_sync_transactions()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Take the old row versions out of their buckets
+    WITH removed AS (
+        SELECT
+            user_id,
+            date_trunc('month', date)::date AS month,
+            COALESCE(category, 'Others') AS category,
+            CASE WHEN lower(trim(transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END AS nature,
+            SUM(amount) AS total_amount,
+            COUNT(*) AS txn_count
+        FROM old_rows
+        WHERE date IS NOT NULL AND amount IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    )
+    UPDATE monthly_category_rollup r
+    SET
+        total_amount = r.total_amount - removed.total_amount,
+        txn_count = r.txn_count - removed.txn_count,
+        updated_at = CURRENT_TIMESTAMP
+    FROM removed
+    WHERE r.user_id = removed.user_id
+      AND r.month = removed.month
+      AND r.category = removed.category
+      AND r.nature = removed.nature;
+
+    -- Updated rows go back in under their new month, category and nature
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO monthly_category_rollup AS r
+            (user_id, month, category, nature, total_amount, txn_count, max_amount)
+        SELECT
+            user_id,
+            date_trunc('month', date)::date,
+            COALESCE(category, 'Others'),
+            CASE WHEN lower(trim(transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END,
+            SUM(amount),
+            COUNT(*),
+            MAX(amount)
+        FROM new_rows
+        WHERE date IS NOT NULL AND amount IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, month, category, nature) DO UPDATE SET
+            total_amount = r.total_amount + EXCLUDED.total_amount,
+            txn_count = r.txn_count + EXCLUDED.txn_count,
+            max_amount = GREATEST(r.max_amount, EXCLUDED.max_amount),
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+
+    -- A removed row may have been the bucket's largest
+    UPDATE monthly_category_rollup r
+    SET max_amount = (
+        SELECT MAX(t.amount)
+        FROM transactions t
+        WHERE t.user_id = r.user_id
+          AND t.date >= r.month
+          AND t.date < (r.month + INTERVAL '1 month')
+          AND COALESCE(t.category, 'Others') = r.category
+          AND (CASE WHEN lower(trim(t.transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END) = r.nature
+    )
+    FROM (
+        SELECT DISTINCT
+            user_id,
+            date_trunc('month', date)::date AS month,
+            COALESCE(category, 'Others') AS category,
+            CASE WHEN lower(trim(transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END AS nature
+        FROM old_rows
+        WHERE date IS NOT NULL AND amount IS NOT NULL
+    ) touched
+    WHERE r.user_id = touched.user_id
+      AND r.month = touched.month
+      AND r.category = touched.category
+      AND r.nature = touched.nature;
+
+    DELETE FROM monthly_category_rollup
+    WHERE user_id IN (SELECT DISTINCT user_id FROM old_rows)
+      AND txn_count <= 0;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger, so DELETE and UPDATE
+-- each get a trigger on the same function
+CREATE TRIGGER trg_transactions_rollup_delete
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_sync_transactions();
+
+CREATE TRIGGER trg_transactions_rollup_update
+AFTER UPDATE ON transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_sync_transactions();
+
+CREATE TABLE ingestion_checkpoints (
+    upload_id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
+
+    pdf_path TEXT,
+    content_hash TEXT,
+    parsed_rows JSONB NOT NULL,
+    total_rows INT NOT NULL,
+    rows_done INT NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running',
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT fk_checkpoint_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX idx_checkpoints_user_hash
+ON ingestion_checkpoints(user_id, content_hash);
+
+CREATE TABLE statement_uploads (
+    user_id UUID NOT NULL,
+    content_hash TEXT NOT NULL,
+    upload_id UUID NOT NULL,
+
+    parsed_rows JSONB NOT NULL,
+    row_count INT NOT NULL,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (user_id, content_hash),
+
+    CONSTRAINT fk_statement_upload_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
 
 INSERT INTO transactions (
     user_id,
@@ -3,7 +3,12 @@ import dotenv from "dotenv";
 
 dotenv.config({path: "./src//config/.env"});
 
-const { Pool } = pg;
+const { Pool, types } = pg;
+
+// Return DATE columns as 'YYYY-MM-DD' strings; the default parser builds
+// a local-midnight JS Date, which serializes to the previous day in IST.
+types.setTypeParser(1082, (value) => value); // 1082 = DATE
+
 const pool = new Pool({
   user: process.env.DB_USER,
   host: process.env.DB_HOST,
@@ -0,0 +1,68 @@
+-- Monthly (month, category, nature) rollup maintained by the MCP
+-- server on every ingest. Run once on databases created before the
+-- table was added to database.sql.
+
+CREATE TABLE IF NOT EXISTS monthly_category_rollup (
+    user_id UUID NOT NULL,
+    month DATE NOT NULL,
+    category TEXT NOT NULL,
+    nature TEXT NOT NULL,
+
+    total_amount NUMERIC NOT NULL DEFAULT 0,
+    txn_count INT NOT NULL DEFAULT 0,
+    max_amount NUMERIC,
+
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (user_id, month, category, nature),
+
+    CONSTRAINT fk_rollup_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+-- TEXT statement date -> DATE: ISO (YYYY-MM-DD...) or day-first
+-- (DD/MM/YYYY, DD-MM-YYYY). Anything else, including values that
+-- match the shape but are not real dates (03/25/2025, 30-02-2025),
+-- gives NULL instead of aborting the migration.
+CREATE OR REPLACE FUNCTION parse_statement_date(value TEXT)
+RETURNS DATE AS $$
+BEGIN
+    IF value ~ '^\d{4}-\d{2}-\d{2}' THEN
+        RETURN to_date(substr(value, 1, 10), 'YYYY-MM-DD');
+    ELSIF value ~ '^\d{2}[/-]\d{2}[/-]\d{4}' THEN
+        RETURN to_date(replace(substr(value, 1, 10), '/', '-'), 'DD-MM-YYYY');
+    END IF;
+    RETURN NULL;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Backfill from existing rows. Dates are TEXT; rows whose date
+-- parse_statement_date() cannot read are left out. The nature rule
+-- matches ensure_transaction_nature().
+INSERT INTO monthly_category_rollup
+    (user_id, month, category, nature, total_amount, txn_count, max_amount)
+SELECT
+    user_id,
+    date_trunc('month', txn_date)::date,
+    category,
+    nature,
+    SUM(amount),
+    COUNT(*),
+    MAX(amount)
+FROM (
+    SELECT
+        user_id,
+        COALESCE(category, 'Others') AS category,
+        amount,
+        parse_statement_date(date) AS txn_date,
+        CASE WHEN lower(trim(transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END AS nature
+    FROM transactions
+    WHERE amount IS NOT NULL
+) t
+WHERE txn_date IS NOT NULL
+GROUP BY user_id, date_trunc('month', txn_date), category, nature
+ON CONFLICT (user_id, month, category, nature) DO NOTHING;
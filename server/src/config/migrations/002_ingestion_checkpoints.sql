@@ -0,0 +1,23 @@
+-- Per-upload progress of the chunked (streaming) ingest path. Holds
+-- the parsed statement and how many rows are already committed, so a
+-- failed upload can be resumed by upload_id. Run once on databases
+-- created before the table was added to database.sql.
+
+CREATE TABLE IF NOT EXISTS ingestion_checkpoints (
+    upload_id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
+
+    pdf_path TEXT,
+    parsed_rows JSONB NOT NULL,
+    total_rows INT NOT NULL,
+    rows_done INT NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running',
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT fk_checkpoint_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
@@ -0,0 +1,28 @@
+-- Parsed-statement cache keyed by SHA-256 of the uploaded PDF, used
+-- by the MCP server to skip re-parsing and re-inserting duplicate
+-- uploads. Run once on databases created before the table was added
+-- to database.sql.
+
+CREATE TABLE IF NOT EXISTS statement_uploads (
+    user_id UUID NOT NULL,
+    content_hash TEXT NOT NULL,
+    upload_id UUID NOT NULL,
+
+    parsed_rows JSONB NOT NULL,
+    row_count INT NOT NULL,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (user_id, content_hash),
+
+    CONSTRAINT fk_statement_upload_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+ALTER TABLE ingestion_checkpoints
+    ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_checkpoints_user_hash
+ON ingestion_checkpoints(user_id, content_hash);
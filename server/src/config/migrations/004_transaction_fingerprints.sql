@@ -0,0 +1,11 @@
+-- Per-row fingerprint (normalized date, amount, description, type and
+-- occurrence) computed by the MCP server at ingest. Rows from
+-- overlapping statements collide on the unique index and are skipped
+-- with ON CONFLICT DO NOTHING. Rows stored before this migration keep
+-- a NULL fingerprint and are not deduplicated against.
+
+ALTER TABLE transactions
+    ADD COLUMN IF NOT EXISTS fingerprint TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_user_fingerprint
+ON transactions(user_id, fingerprint);
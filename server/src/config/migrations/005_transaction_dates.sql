@@ -0,0 +1,25 @@
+-- Store transaction dates as DATE so date-range filters can use an
+-- index. The MCP server now writes parsed dates; existing TEXT values
+-- are converted with parse_statement_date() (same rules as the 001
+-- rollup backfill). Anything else becomes NULL and stays available
+-- in raw_json.
+
+CREATE OR REPLACE FUNCTION parse_statement_date(value TEXT)
+RETURNS DATE AS $$
+BEGIN
+    IF value ~ '^\d{4}-\d{2}-\d{2}' THEN
+        RETURN to_date(substr(value, 1, 10), 'YYYY-MM-DD');
+    ELSIF value ~ '^\d{2}[/-]\d{2}[/-]\d{4}' THEN
+        RETURN to_date(replace(substr(value, 1, 10), '/', '-'), 'DD-MM-YYYY');
+    END IF;
+    RETURN NULL;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+ALTER TABLE transactions
+    ALTER COLUMN date TYPE DATE USING parse_statement_date(date);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date
+ON transactions(user_id, date);
@@ -0,0 +1,107 @@
+-- Keep monthly_category_rollup in step with deletes from and updates
+-- to transactions (the Node DELETE /transactions/:id routes, category
+-- fixes, manual cleanup). The MCP server only adds to the rollup on
+-- ingest, so here the old row versions are taken back out (totals and
+-- counts decremented, max_amount recomputed from the remaining rows,
+-- emptied groups dropped) and updated rows are added to their new
+-- groups. Month, category and nature follow the 001 backfill rules.
+
+DROP TRIGGER IF EXISTS trg_transactions_rollup_delete ON transactions;
+DROP TRIGGER IF EXISTS trg_transactions_rollup_update ON transactions;
+DROP FUNCTION IF EXISTS rollup_remove_transactions();
+
+CREATE OR REPLACE FUNCTION rollup_sync_transactions()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Take the old row versions out of their buckets
+    WITH removed AS (
+        SELECT
+            user_id,
+            date_trunc('month', date)::date AS month,
+            COALESCE(category, 'Others') AS category,
+            CASE WHEN lower(trim(transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END AS nature,
+            SUM(amount) AS total_amount,
+            COUNT(*) AS txn_count
+        FROM old_rows
+        WHERE date IS NOT NULL AND amount IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    )
+    UPDATE monthly_category_rollup r
+    SET
+        total_amount = r.total_amount - removed.total_amount,
+        txn_count = r.txn_count - removed.txn_count,
+        updated_at = CURRENT_TIMESTAMP
+    FROM removed
+    WHERE r.user_id = removed.user_id
+      AND r.month = removed.month
+      AND r.category = removed.category
+      AND r.nature = removed.nature;
+
+    -- Updated rows go back in under their new month, category and nature
+    IF TG_OP = 'UPDATE' THEN
+        INSERT INTO monthly_category_rollup AS r
+            (user_id, month, category, nature, total_amount, txn_count, max_amount)
+        SELECT
+            user_id,
+            date_trunc('month', date)::date,
+            COALESCE(category, 'Others'),
+            CASE WHEN lower(trim(transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END,
+            SUM(amount),
+            COUNT(*),
+            MAX(amount)
+        FROM new_rows
+        WHERE date IS NOT NULL AND amount IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (user_id, month, category, nature) DO UPDATE SET
+            total_amount = r.total_amount + EXCLUDED.total_amount,
+            txn_count = r.txn_count + EXCLUDED.txn_count,
+            max_amount = GREATEST(r.max_amount, EXCLUDED.max_amount),
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+
+    -- A removed row may have been the bucket's largest
+    UPDATE monthly_category_rollup r
+    SET max_amount = (
+        SELECT MAX(t.amount)
+        FROM transactions t
+        WHERE t.user_id = r.user_id
+          AND t.date >= r.month
+          AND t.date < (r.month + INTERVAL '1 month')
+          AND COALESCE(t.category, 'Others') = r.category
+          AND (CASE WHEN lower(trim(t.transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END) = r.nature
+    )
+    FROM (
+        SELECT DISTINCT
+            user_id,
+            date_trunc('month', date)::date AS month,
+            COALESCE(category, 'Others') AS category,
+            CASE WHEN lower(trim(transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END AS nature
+        FROM old_rows
+        WHERE date IS NOT NULL AND amount IS NOT NULL
+    ) touched
+    WHERE r.user_id = touched.user_id
+      AND r.month = touched.month
+      AND r.category = touched.category
+      AND r.nature = touched.nature;
+
+    DELETE FROM monthly_category_rollup
+    WHERE user_id IN (SELECT DISTINCT user_id FROM old_rows)
+      AND txn_count <= 0;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger, so DELETE and UPDATE
+-- each get a trigger on the same function
+CREATE TRIGGER trg_transactions_rollup_delete
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_sync_transactions();
+
+CREATE TRIGGER trg_transactions_rollup_update
+AFTER UPDATE ON transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION rollup_sync_transactions();
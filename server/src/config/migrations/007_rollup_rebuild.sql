@@ -0,0 +1,24 @@
+-- Rebuild monthly_category_rollup from transactions. The 001 backfill
+-- matched transaction_type = 'Credit' case-sensitively, so legacy
+-- lowercase 'credit' rows were booked as Expense. Nature now follows
+-- normalize_transactions(): 'credit' / 'cr' in any case is Income.
+
+BEGIN;
+
+DELETE FROM monthly_category_rollup;
+
+INSERT INTO monthly_category_rollup
+    (user_id, month, category, nature, total_amount, txn_count, max_amount)
+SELECT
+    user_id,
+    date_trunc('month', date)::date,
+    COALESCE(category, 'Others'),
+    CASE WHEN lower(trim(transaction_type)) IN ('credit', 'cr') THEN 'Income' ELSE 'Expense' END,
+    SUM(amount),
+    COUNT(*),
+    MAX(amount)
+FROM transactions
+WHERE date IS NOT NULL AND amount IS NOT NULL
+GROUP BY 1, 2, 3, 4;
+
+COMMIT;
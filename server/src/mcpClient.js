@@ -28,3 +28,31 @@ export async function getMCPClient() {
   console.log("MCP connected from Express");
   return client;
 }
+
+/**
+ * Call a tool with stream=true and forward its streamed text.
+ * The MCP server sends each chunk as a progress notification whose
+ * message is JSON { field, delta }; onDelta(field, delta) gets them
+ * in order. Resolves with the final tool result as usual.
+ */
+export async function callToolStreaming(name, args, onDelta, timeout = 300000) {
+  const mcp = await getMCPClient();
+
+  return mcp.callTool(
+    { name, arguments: { ...args, stream: true } },
+    undefined,
+    {
+      timeout,
+      resetTimeoutOnProgress: true,
+      onprogress: ({ message }) => {
+        if (!message) return;
+        try {
+          const { field, delta } = JSON.parse(message);
+          onDelta(field, delta);
+        } catch {
+          // Not a streamed-text notification
+        }
+      },
+    }
+  );
+}
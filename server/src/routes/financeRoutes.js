@@ -1,7 +1,7 @@
 import express from "express";
 import fs from "fs";
 import path from "path";
-import { getMCPClient } from "../mcpClient.js";
+import { getMCPClient, callToolStreaming } from "../mcpClient.js";
 import db from "../config/db.js";
 import crypto from "crypto";
 
@@ -402,4 +402,51 @@ router.post("/chat", async (req, res) => {
   }
 });
 
+/* ================================
+   CHAT (STREAMING, SSE)
+   event: delta -> { field: "answer", delta }
+   event: done  -> { answer }
+================================ */
+
+router.post("/chat/stream", async (req, res) => {
+  req.setTimeout(300000);
+
+  const userId = req.user?.id;
+  const { question } = req.body;
+
+  if (!userId) {
+    return res.status(401).json({ error: "Unauthorized" });
+  }
+
+  if (!question) {
+    return res.status(400).json({ error: "question is required" });
+  }
+
+  res.set({
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache",
+    Connection: "keep-alive",
+  });
+  res.flushHeaders();
+
+  const send = (event, data) => {
+    res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+  };
+
+  try {
+    const result = await callToolStreaming(
+      "finance_chat",
+      { user_id: userId, question },
+      (field, delta) => send("delta", { field, delta })
+    );
+
+    send("done", JSON.parse(result.content?.[0]?.text || "{}"));
+  } catch (err) {
+    console.error("Chat stream error:", err);
+    send("error", { error: err.message });
+  } finally {
+    res.end();
+  }
+});
+
 export default router;
@@ -1,5 +1,5 @@
 import express from "express";
-import { getMCPClient } from "../mcpClient.js";
+import { getMCPClient, callToolStreaming } from "../mcpClient.js";
 import db from "../config/db.js";
 import fs from "fs";
 import path from "path";
@@ -511,6 +511,86 @@ router.get("/summary", async (req, res) => {
     res.status(500).json({ error: err.message });
   }
 });
+
+/* ================================
+   DASHBOARD (ONE MCP CALL)
+   expense + alerts + goal + CFO summary
+================================ */
+
+router.post("/dashboard", async (req, res) => {
+  req.setTimeout(300000);
+
+  try {
+    const userId = req.user?.id;
+
+    if (!userId) {
+      return res.status(401).json({ error: "Unauthorized" });
+    }
+
+    const { amount, months, purpose } = req.body || {};
+    const mcp = await getMCPClient();
+
+    const result = await mcp.callTool(
+      {
+        name: "dashboard",
+        arguments: {
+          user_id: userId,
+          ...(amount && months
+            ? { goal_amount: Number(amount), goal_months: Number(months), goal_purpose: purpose }
+            : {}),
+        },
+      },
+      undefined,
+      { timeout: 300000 }
+    );
+
+    res.json(JSON.parse(result.content[0].text));
+  } catch (err) {
+    console.error("Dashboard error:", err);
+    res.status(500).json({ error: err.message });
+  }
+});
+
+/* ================================
+   CFO SUMMARY (STREAMING, SSE)
+   event: delta -> { field, delta }
+   event: done  -> final summary object
+================================ */
+
+router.get("/summary/stream", async (req, res) => {
+  req.setTimeout(300000);
+
+  const userId = req.user?.id;
+  if (!userId) {
+    return res.status(401).json({ error: "Unauthorized" });
+  }
+
+  res.set({
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache",
+    Connection: "keep-alive",
+  });
+  res.flushHeaders();
+
+  const send = (event, data) => {
+    res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+  };
+
+  try {
+    const result = await callToolStreaming(
+      "cfo_summary",
+      { user_id: userId },
+      (field, delta) => send("delta", { field, delta })
+    );
+
+    send("done", JSON.parse(result.content[0].text));
+  } catch (err) {
+    console.error("CFO Summary stream error:", err);
+    send("error", { error: err.message });
+  } finally {
+    res.end();
+  }
+});
 /* ================================
    DELETE TRANSACTION (POSTGRES)
 ================================ */